@@ -0,0 +1,141 @@
+"""
+Pytest configuration for the local hot-path micro-benchmarks.
+
+Benchmarks are skipped unless --benchmark is given:
+
+    python -m pytest benchmarks --benchmark
+    python -m pytest benchmarks --benchmark --benchmark-sizes=1000,10000,100000,1000000
+    python -m pytest benchmarks --benchmark --benchmark-update
+    python -m pytest benchmarks/test_import_time.py --benchmark --import-budget-scale=2
+"""
+
+import os
+import sys
+from typing import Dict, Tuple
+
+import pytest
+
+# Add the repository root to the Python path so we can import the utils modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.utils.benchmarking import find_regressions, load_baselines, save_baselines
+
+DEFAULT_SIZES = "1000,10000,100000"
+DEFAULT_BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("benchmark", "local hot-path micro-benchmarks")
+    group.addoption("--benchmark", action="store_true", default=False,
+                    help="Run the micro-benchmarks")
+    group.addoption("--benchmark-sizes", default=DEFAULT_SIZES,
+                    help=f"Comma-separated dataset sizes in records (default {DEFAULT_SIZES})")
+    group.addoption("--benchmark-threshold", type=float, default=0.25,
+                    help="Allowed regression versus the baseline (default 0.25 = 25%%)")
+    group.addoption("--benchmark-baseline", default=DEFAULT_BASELINE_PATH,
+                    help="Baseline JSON file")
+    group.addoption("--benchmark-update", action="store_true", default=False,
+                    help="Overwrite the baselines with this run's results")
+    group.addoption("--import-budget-scale", type=float, default=1.0,
+                    help="Multiply the import-time budgets, e.g. 2 on slow machines (default 1)")
+    group.addoption("--import-repeat", type=int, default=5,
+                    help="Fresh interpreters per import-time measurement (default 5)")
+
+
+def _option(config, name, default=None):
+    # Options are only registered when this conftest is loaded at startup
+    # (e.g. `pytest benchmarks`); fall back to defaults otherwise.
+    try:
+        return config.getoption(name)
+    except ValueError:
+        return default
+
+
+def pytest_generate_tests(metafunc):
+    if "size" in metafunc.fixturenames:
+        sizes = [int(s) for s in str(_option(metafunc.config, "benchmark_sizes", DEFAULT_SIZES)).split(",") if s]
+        metafunc.parametrize("size", sizes, ids=[f"{s:,}".replace(",", "_") for s in sizes])
+
+
+def pytest_collection_modifyitems(config, items):
+    if _option(config, "benchmark", False):
+        # Run every stage for one size before moving to the next, so each
+        # synthetic dataset is generated once
+        items.sort(key=lambda item: getattr(item, "callspec", None) and item.callspec.params.get("size") or 0)
+        return
+    skip = pytest.mark.skip(reason="benchmarks only run with --benchmark")
+    for item in items:
+        fixtures = getattr(item, "fixturenames", ())
+        if "size" in fixtures or "benchmark_session" in fixtures:
+            item.add_marker(skip)
+
+
+class BenchmarkSession:
+    def __init__(self, config):
+        self.path = _option(config, "benchmark_baseline", DEFAULT_BASELINE_PATH)
+        self.threshold = _option(config, "benchmark_threshold", 0.25)
+        self.update = _option(config, "benchmark_update", False)
+        self.import_budget_scale = _option(config, "import_budget_scale", 1.0)
+        self.import_repeat = _option(config, "import_repeat", 5)
+        self.baselines = load_baselines(self.path)
+        self.results: Dict[str, Dict] = {}
+        self.comparisons: Dict[str, Dict] = {}
+        self.budgets: Dict[str, Tuple[float, float]] = {}
+
+    def check(self, name: str, result: Dict) -> None:
+        """Record a result and fail the test if it regressed past the threshold."""
+        self.results[name] = result
+        baseline = self.baselines.get(name)
+        self.comparisons[name] = baseline or {}
+        if baseline is None or self.update:
+            return
+        regressions = find_regressions(result, baseline, self.threshold)
+        if regressions:
+            pytest.fail(f"{name}: " + "; ".join(regressions))
+
+    def check_budget(self, name: str, seconds: float, budget: float, detail: str = "") -> None:
+        """Record a timing and fail the test if it exceeds its (scaled) budget."""
+        budget *= self.import_budget_scale
+        self.budgets[name] = (seconds, budget)
+        if seconds > budget:
+            pytest.fail(f"{name}: {seconds * 1000:.0f} ms exceeds the {budget * 1000:.0f} ms budget" + detail)
+
+    def save(self) -> None:
+        if not self.results:
+            return
+        merged = dict(self.baselines)
+        for name, result in self.results.items():
+            if self.update or name not in merged:
+                merged[name] = result
+        save_baselines(self.path, merged)
+
+
+@pytest.fixture(scope="session")
+def benchmark_session(request):
+    session = BenchmarkSession(request.config)
+    request.config._benchmark_session = session
+    yield session
+    session.save()
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    session = getattr(config, "_benchmark_session", None)
+    if session is None:
+        return
+    if session.budgets:
+        terminalreporter.section("import times")
+        terminalreporter.write_line(f"{'entry point':<60}{'ms':>12}{'budget ms':>12}")
+        for name, (seconds, budget) in session.budgets.items():
+            terminalreporter.write_line(f"{name:<60}{seconds * 1000:>12.1f}{budget * 1000:>12.0f}")
+    if not session.results:
+        return
+    terminalreporter.section("benchmark results")
+    terminalreporter.write_line(f"{'benchmark':<45}{'seconds':>12}{'peak MB':>12}{'vs baseline':>14}")
+    for name, result in session.results.items():
+        baseline = session.comparisons.get(name) or {}
+        change = "new"
+        if baseline.get("seconds"):
+            change = f"{result['seconds'] / baseline['seconds'] - 1:+.1%}"
+        terminalreporter.write_line(
+            f"{name:<45}{result['seconds']:>12.4f}{result['peak_bytes'] / 1024 ** 2:>12.1f}{change:>14}"
+        )
+    terminalreporter.write_line(f"baselines: {session.path}")
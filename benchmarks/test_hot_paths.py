@@ -0,0 +1,83 @@
+"""
+Micro-benchmarks for the local hot paths of AzureOpenAIHelper.
+
+Each stage is timed against synthetic datasets of increasing size; see
+conftest.py for how to run them and manage baselines.
+"""
+
+import os
+import json
+
+import pytest
+
+from src.utils.azure_openai_utils import AzureOpenAIHelper
+from src.utils.benchmarking import generate_sales_data, measure
+
+_datasets = {}
+
+
+def sales_data(size: int):
+    # Generating a million records is itself slow, so datasets are shared across stages
+    if size not in _datasets:
+        _datasets.clear()
+        _datasets[size] = generate_sales_data(size)
+    return _datasets[size]
+
+
+@pytest.fixture
+def helper(monkeypatch):
+    # Keep the benchmark offline and free of cross-run state
+    for name in ("AZURE_OPENAI_CACHE_PATH", "AZURE_OPENAI_RPM", "AZURE_OPENAI_TPM"):
+        monkeypatch.delenv(name, raising=False)
+    return AzureOpenAIHelper(endpoint="http://localhost", api_key="benchmark", model="benchmark")
+
+
+def test_format_prompt_with_examples(benchmark_session, helper, size):
+    examples = [
+        {
+            "input": f"{r['customer']['company']} bought {r['quantity']} x {r['product']['name']}",
+            "output": f"Revenue: ${r['total_amount']:,.2f}"
+        }
+        for r in sales_data(size)["sales_records"]
+    ]
+    result = measure(lambda: helper.format_prompt_with_examples("Analyze these sales.", examples))
+    benchmark_session.check(f"format_prompt_with_examples[{size}]", result)
+
+
+def test_json_dumps_indent(benchmark_session, size):
+    data = sales_data(size)
+    result = measure(lambda: json.dumps(data, indent=2))
+    benchmark_session.check(f"json_dumps_indent[{size}]", result)
+
+
+def test_load_sales_data(benchmark_session, helper, size, tmp_path):
+    path = str(tmp_path / "sales.json")
+    with open(path, "w") as f:
+        json.dump(sales_data(size), f)
+    result = measure(lambda: helper.load_sales_data(path))
+    benchmark_session.check(f"load_sales_data[{size}]", result)
+
+
+def test_log_completion(benchmark_session, helper, size, tmp_path, monkeypatch):
+    # One log entry per record, including the time to get them onto disk
+    monkeypatch.chdir(tmp_path)
+
+    def log_all():
+        for i in range(size):
+            helper.log_completion(f"prompt {i}", f"completion {i}", {"tokens": i})
+        helper.flush_logs()
+
+    result = measure(log_all, repeat=3)
+    benchmark_session.check(f"log_completion[{size}]", result)
+    assert os.path.exists(tmp_path / "logs" / "completions.jsonl")
+
+
+def test_create_system_message(benchmark_session, helper, size):
+    roles = ["sales analyst", "sales manager", "customer success", "unknown"]
+
+    def create_all():
+        for i in range(size):
+            helper.create_system_message(roles[i % len(roles)])
+
+    result = measure(create_all)
+    benchmark_session.check(f"create_system_message[{size}]", result)
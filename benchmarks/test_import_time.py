@@ -0,0 +1,37 @@
+"""
+Cold-start import budgets for the command-line entry points.
+
+Each entry point is imported in fresh interpreters and must stay under its
+budget. Heavy SDKs are expected to load on first use, not at import; if a
+budget is exceeded, the failure lists the ones that were imported.
+"""
+
+import os
+
+import pytest
+
+from src.utils.benchmarking import measure_import
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Packages that take tens to hundreds of milliseconds to import
+HEAVY_MODULES = ("openai", "httpx", "pandas", "numpy", "tiktoken", "dotenv", "colorama", "azure")
+
+# Entry point -> budget in seconds
+IMPORT_BUDGETS = {
+    "src.utils.azure_openai_utils": 0.25,
+    "src.utils.batch_runner": 0.25,
+    "src.utils.validate_setup": 0.2,
+    "src.utils.mock_openai_server": 0.2,
+    "exercises/02_environment_setup/01_azure_setup.py": 0.1,
+    "exercises/02_environment_setup/02_security_config.py": 0.1,
+    "exercises/02_environment_setup/03_deployment_validation.py": 0.3,
+}
+
+
+@pytest.mark.parametrize("entry_point", list(IMPORT_BUDGETS))
+def test_import_time(benchmark_session, entry_point):
+    target = os.path.join(ROOT, entry_point) if entry_point.endswith(".py") else entry_point
+    result = measure_import(target, ROOT, repeat=benchmark_session.import_repeat, watch=HEAVY_MODULES)
+    detail = f"; heavy modules imported: {', '.join(result['loaded'])}" if result["loaded"] else ""
+    benchmark_session.check_budget(entry_point, result["seconds"], IMPORT_BUDGETS[entry_point], detail)
@@ -4,18 +4,19 @@ This script demonstrates basic prompt engineering for extracting sales metrics.
 """
 
 import asyncio
-import json
-from typing import Dict
+from typing import Dict, Optional
 import sys
 import os
 
 # Add the parent directory to the Python path so we can import the utils module
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
-from src.utils.azure_openai_utils import AzureOpenAIHelper
+from src.utils.azure_openai_utils import AzureOpenAIHelper, format_stream_stats
+from src.utils.sales_metrics import compute_basic_metrics
 
-async def analyze_basic_metrics(sales_data: Dict) -> None:
+async def analyze_basic_metrics(sales_data: Dict, helper: Optional[AzureOpenAIHelper] = None) -> None:
     """Analyze basic sales metrics using Azure OpenAI."""
-    helper = AzureOpenAIHelper()
+    # Reuse the caller's helper (and its pooled client) when one is passed in
+    helper = helper or AzureOpenAIHelper()
 
     # TODO: Complete these prompt templates
     prompts = {
@@ -64,19 +65,36 @@ async def analyze_basic_metrics(sales_data: Dict) -> None:
     """
 
     try:
-        # Generate completion for the example prompt
+        # Exact figures are computed locally; the model doesn't need to do arithmetic
+        metrics = compute_basic_metrics(sales_data)
+        print("\n🧮 Exact Metrics:")
+        print(f"Total Sales: ${metrics['total_sales']:,.2f}")
+        print(f"Number of Transactions: {metrics['transaction_count']}")
+        print(f"Average Deal Size: ${metrics['average_deal']:,.2f}")
+
+        # Generate completion for the example prompt, grounded on the precomputed metrics
         print("\n🔍 Generating sales summary...")
-        summary_response = await helper.generate_completion(
-            sales_summary_prompt.format(sales_data=json.dumps(sales_data, indent=2)),
-            system_message=helper.create_system_message("sales analyst")
-        )
         print("\n📊 Sales Summary:")
-        print(summary_response)
+        stream_stats = {}
+        async for delta in helper.generate_completion_stream(
+            helper.format_sales_prompt(sales_summary_prompt, sales_data, mode="hybrid"),
+            system_message=helper.create_system_message("sales analyst"),
+            stats=stream_stats
+        ):
+            print(delta, end="", flush=True)
+        print(f"\n\n⏱️ {format_stream_stats(stream_stats)}")
 
         # TODO: Implement your own prompts and analyze the results
         # Example structure:
         # total_sales_response = await helper.generate_completion(
-        #     prompts["total_sales"].format(sales_data=json.dumps(sales_data, indent=2))
+        #     helper.format_sales_prompt(prompts["total_sales"], sales_data, mode="auto")
+        # )
+        #
+        # Or run every template at once (results come back in the same order):
+        # batch_results = await helper.generate_completions_batch(
+        #     [helper.format_sales_prompt(template, sales_data, mode="auto")
+        #      for template in prompts.values()],
+        #     max_concurrency=3
         # )
         
     except Exception as e:
@@ -89,7 +107,12 @@ def main():
     sales_data = helper.load_sales_data()
     
     print("\n🚀 Starting basic sales metrics analysis...")
-    asyncio.run(analyze_basic_metrics(sales_data))
+    async def run() -> None:
+        # Closing the helper closes its pooled connections before the loop ends
+        async with helper:
+            await analyze_basic_metrics(sales_data, helper)
+
+    asyncio.run(run())
 
 if __name__ == "__main__":
     main()
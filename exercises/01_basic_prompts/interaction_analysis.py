@@ -4,18 +4,18 @@ This script demonstrates prompt engineering for analyzing customer interactions
 """
 
 import asyncio
-import json
-from typing import Dict
+from typing import Dict, Optional
 import sys
 import os
 
 # Add the parent directory to the Python path so we can import the utils module
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
-from src.utils.azure_openai_utils import AzureOpenAIHelper
+from src.utils.azure_openai_utils import AzureOpenAIHelper, format_stream_stats
 
-async def analyze_interactions(sales_data: Dict) -> None:
+async def analyze_interactions(sales_data: Dict, helper: Optional[AzureOpenAIHelper] = None) -> None:
     """Analyze customer interactions and sales cycles using Azure OpenAI."""
-    helper = AzureOpenAIHelper()
+    # Reuse the caller's helper (and its pooled client) when one is passed in
+    helper = helper or AzureOpenAIHelper()
 
     # Example of few-shot learning with interaction patterns
     interaction_examples = [
@@ -101,17 +101,27 @@ async def analyze_interactions(sales_data: Dict) -> None:
     try:
         # Generate completion for the example prompt
         print("\n🔍 Analyzing customer interactions...")
-        analysis_response = await helper.generate_completion(
-            interaction_analysis_prompt.format(sales_data=json.dumps(sales_data, indent=2)),
-            system_message=helper.create_system_message("customer success")
-        )
         print("\n📊 Interaction Analysis:")
-        print(analysis_response)
+        stream_stats = {}
+        async for delta in helper.generate_completion_stream(
+            helper.format_sales_prompt(interaction_analysis_prompt, sales_data, mode="auto"),
+            system_message=helper.create_system_message("customer success"),
+            stats=stream_stats
+        ):
+            print(delta, end="", flush=True)
+        print(f"\n\n⏱️ {format_stream_stats(stream_stats)}")
 
         # TODO: Implement your own prompts and analyze the results
         # Example structure:
         # pattern_response = await helper.generate_completion(
-        #     prompts["communication_pattern"].format(sales_data=json.dumps(sales_data, indent=2))
+        #     helper.format_sales_prompt(prompts["communication_pattern"], sales_data, mode="auto")
+        # )
+        #
+        # Or run every template at once (results come back in the same order):
+        # batch_results = await helper.generate_completions_batch(
+        #     [helper.format_sales_prompt(template, sales_data, mode="auto")
+        #      for template in prompts.values()],
+        #     max_concurrency=3
         # )
 
     except Exception as e:
@@ -124,7 +134,12 @@ def main():
     sales_data = helper.load_sales_data()
     
     print("\n🚀 Starting customer interaction analysis...")
-    asyncio.run(analyze_interactions(sales_data))
+    async def run() -> None:
+        # Closing the helper closes its pooled connections before the loop ends
+        async with helper:
+            await analyze_interactions(sales_data, helper)
+
+    asyncio.run(run())
 
 if __name__ == "__main__":
     main()
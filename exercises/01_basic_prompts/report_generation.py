@@ -4,18 +4,18 @@ This script demonstrates prompt engineering for generating structured sales repo
 """
 
 import asyncio
-import json
-from typing import Dict
+from typing import Dict, Optional
 import sys
 import os
 
 # Add the parent directory to the Python path so we can import the utils module
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
-from src.utils.azure_openai_utils import AzureOpenAIHelper
+from src.utils.azure_openai_utils import AzureOpenAIHelper, format_stream_stats
 
-async def generate_reports(sales_data: Dict) -> None:
+async def generate_reports(sales_data: Dict, helper: Optional[AzureOpenAIHelper] = None) -> None:
     """Generate various sales reports using Azure OpenAI."""
-    helper = AzureOpenAIHelper()
+    # Reuse the caller's helper (and its pooled client) when one is passed in
+    helper = helper or AzureOpenAIHelper()
 
     # Example report structure for few-shot learning
     report_examples = [
@@ -129,18 +129,28 @@ Executive Summary: Q1 2024
     try:
         # Generate completion for the example prompt
         print("\n📝 Generating comprehensive sales report...")
-        report_response = await helper.generate_completion(
-            full_report_prompt.format(sales_data=json.dumps(sales_data, indent=2)),
-            system_message=helper.create_system_message("sales manager"),
-            temperature=0.7  # Slightly higher temperature for more creative report writing
-        )
         print("\n📊 Sales Report:")
-        print(report_response)
+        stream_stats = {}
+        async for delta in helper.generate_completion_stream(
+            helper.format_sales_prompt(full_report_prompt, sales_data, mode="auto"),
+            system_message=helper.create_system_message("sales manager"),
+            temperature=0.7,  # Slightly higher temperature for more creative report writing
+            stats=stream_stats
+        ):
+            print(delta, end="", flush=True)
+        print(f"\n\n⏱️ {format_stream_stats(stream_stats)}")
 
         # TODO: Implement your own prompts and analyze the results
         # Example structure:
         # summary_response = await helper.generate_completion(
-        #     prompts["executive_summary"].format(sales_data=json.dumps(sales_data, indent=2))
+        #     helper.format_sales_prompt(prompts["executive_summary"], sales_data, mode="auto")
+        # )
+        #
+        # Or run every template at once (results come back in the same order):
+        # batch_results = await helper.generate_completions_batch(
+        #     [helper.format_sales_prompt(template, sales_data, mode="auto")
+        #      for template in prompts.values()],
+        #     max_concurrency=3
         # )
 
     except Exception as e:
@@ -153,7 +163,12 @@ def main():
     sales_data = helper.load_sales_data()
     
     print("\n🚀 Starting sales report generation...")
-    asyncio.run(generate_reports(sales_data))
+    async def run() -> None:
+        # Closing the helper closes its pooled connections before the loop ends
+        async with helper:
+            await generate_reports(sales_data, helper)
+
+    asyncio.run(run())
 
 if __name__ == "__main__":
     main()
@@ -1,35 +1,102 @@
 """
 Exercise 1: Azure Environment Setup
 This script helps validate and configure your Azure OpenAI environment.
+
+Provisioning uses the async Azure management clients, so several services
+(e.g. one per region), their model deployments and monitoring are set up
+concurrently on one event loop, with progress logged while each
+long-running operation is pending.
 """
 
 import os
 import sys
 import json
+import time
 import logging
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 import asyncio
-from azure.identity import DefaultAzureCredential
-from azure.keyvault.secrets import SecretClient
-from azure.mgmt.cognitiveservices import CognitiveServicesManagementClient
-from azure.core.exceptions import AzureError
+
+# Add parent directory to path to import utils
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from src.utils.azure_credentials import CredentialProvider, get_credential_provider
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+DEFAULT_SERVICE_NAME = "workshop-openai-service"
+DIAGNOSTIC_SETTING_NAME = "workshop-diagnostics"
+
 class AzureEnvironmentSetup:
-    def __init__(self):
-        """Initialize Azure environment setup utilities."""
-        self.credential = DefaultAzureCredential()
+    def __init__(self, credential_provider: Optional[CredentialProvider] = None, progress_interval: float = 15.0):
+        """
+        Initialize Azure environment setup utilities.
+
+        Args:
+            credential_provider: Token source; defaults to the process-wide provider
+            progress_interval: Seconds between progress messages while waiting
+                on a long-running Azure operation
+        """
+        self.credential_provider = credential_provider or get_credential_provider()
+        # The Azure SDKs are slow to import, so they are loaded on first use
+        self._credential = None
+        self._cognitive_client = None
+        self._monitor_client = None
         self.subscription_id = os.getenv("AZURE_SUBSCRIPTION_ID")
         self.resource_group = os.getenv("AZURE_RESOURCE_GROUP")
         self.location = os.getenv("AZURE_LOCATION", "eastus")
+        self.log_analytics_workspace_id = os.getenv("AZURE_LOG_ANALYTICS_WORKSPACE_ID")
+        self.progress_interval = progress_interval
+
+    @property
+    def credential(self):
+        """Async Azure credential backed by the provider's shared token cache."""
+        if self._credential is None:
+            self._credential = self.credential_provider.async_credential()
+        return self._credential
+
+    @property
+    def cognitive_client(self):
+        """Async Cognitive Services management client, shared by all operations."""
+        if self._cognitive_client is None:
+            from azure.mgmt.cognitiveservices.aio import CognitiveServicesManagementClient
+            self._cognitive_client = CognitiveServicesManagementClient(
+                credential=self.credential,
+                subscription_id=self.subscription_id
+            )
+        return self._cognitive_client
+
+    @property
+    def monitor_client(self):
+        """Async Azure Monitor management client, shared by all operations."""
+        if self._monitor_client is None:
+            from azure.mgmt.monitor.aio import MonitorManagementClient
+            self._monitor_client = MonitorManagementClient(
+                credential=self.credential,
+                subscription_id=self.subscription_id
+            )
+        return self._monitor_client
+
+    async def close(self) -> None:
+        """Close the management clients and their HTTP sessions; the shared credential stays open."""
+        if self._cognitive_client is not None:
+            await self._cognitive_client.close()
+            self._cognitive_client = None
+        if self._monitor_client is not None:
+            await self._monitor_client.close()
+            self._monitor_client = None
+        self._credential = None
+
+    async def __aenter__(self) -> "AzureEnvironmentSetup":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
 
     async def validate_prerequisites(self) -> bool:
         """
         Validate all prerequisites are met.
-        
+
         Returns:
             bool: True if all prerequisites are met, False otherwise
         """
@@ -40,7 +107,7 @@ class AzureEnvironmentSetup:
                 "AZURE_RESOURCE_GROUP",
                 "AZURE_LOCATION"
             ]
-            
+
             missing_vars = [var for var in required_vars if not os.getenv(var)]
             if missing_vars:
                 logger.error(f"Missing required environment variables: {', '.join(missing_vars)}")
@@ -64,33 +131,53 @@ class AzureEnvironmentSetup:
             token = await self.credential.get_token("https://management.azure.com/.default")
             if not token:
                 raise ValueError("Could not obtain Azure token")
-            
+
             logger.info("✅ Azure credentials validated")
         except Exception as e:
             logger.error(f"Credential validation failed: {str(e)}")
             raise
 
-    async def setup_openai_service(self, service_name: str) -> Dict:
+    async def _wait_for(self, poller, description: str):
+        """
+        Wait for a long-running operation, logging its status periodically.
+
+        Args:
+            poller: AsyncLROPoller returned by a begin_* call
+            description: What the operation does, for the progress messages
+
+        Returns:
+            The operation's final resource
+        """
+        start = time.monotonic()
+        result = asyncio.ensure_future(poller.result())
+        try:
+            while True:
+                done, _ = await asyncio.wait({result}, timeout=self.progress_interval)
+                if done:
+                    return result.result()
+                logger.info(f"⏳ {description}: {poller.status()} ({time.monotonic() - start:.0f}s elapsed)")
+        finally:
+            result.cancel()
+
+    async def setup_openai_service(self, service_name: str, location: Optional[str] = None) -> Dict:
         """
         Set up Azure OpenAI service.
-        
+
         Args:
             service_name: Name for the OpenAI service
+            location: Azure region; defaults to AZURE_LOCATION
 
         Returns:
             Dict containing service information
         """
-        try:
-            # Initialize the Cognitive Services Management Client
-            cognitive_client = CognitiveServicesManagementClient(
-                credential=self.credential,
-                subscription_id=self.subscription_id
-            )
+        from azure.core.exceptions import ResourceNotFoundError
 
+        location = location or self.location
+        try:
             # Check if service exists
             logger.info(f"Checking if OpenAI service {service_name} exists...")
             try:
-                existing_service = cognitive_client.accounts.get(
+                existing_service = await self.cognitive_client.accounts.get(
                     self.resource_group,
                     service_name
                 )
@@ -100,18 +187,18 @@ class AzureEnvironmentSetup:
                     "endpoint": existing_service.properties.endpoint,
                     "location": existing_service.location
                 }
-            except Exception:
-                logger.info(f"Creating new OpenAI service {service_name}...")
+            except ResourceNotFoundError:
+                logger.info(f"Creating new OpenAI service {service_name} in {location}...")
 
             # Create service
-            poller = cognitive_client.accounts.begin_create(
+            poller = await self.cognitive_client.accounts.begin_create(
                 self.resource_group,
                 service_name,
                 {
                     "sku": {
                         "name": "S0"
                     },
-                    "location": self.location,
+                    "location": location,
                     "kind": "OpenAI",
                     "properties": {
                         "custom_sub_domain_name": service_name,
@@ -130,7 +217,7 @@ class AzureEnvironmentSetup:
             )
 
             # Wait for completion
-            service = poller.result()
+            service = await self._wait_for(poller, f"Creating {service_name}")
             logger.info(f"✅ OpenAI service {service_name} created successfully")
 
             return {
@@ -140,56 +227,205 @@ class AzureEnvironmentSetup:
             }
 
         except Exception as e:
-            logger.error(f"Failed to set up OpenAI service: {str(e)}")
+            logger.error(f"Failed to set up OpenAI service {service_name}: {str(e)}")
             raise
 
-    async def setup_monitoring(self, service_name: str) -> None:
+    async def setup_model_deployment(self, service_name: str, deployment: Dict) -> Dict:
         """
-        Set up monitoring for the OpenAI service.
-        
+        Create or update a model deployment on an OpenAI service.
+
         Args:
             service_name: Name of the OpenAI service
+            deployment: "name", "model" and optional "version", "sku" (default
+                "Standard") and "capacity" (thousands of tokens per minute, default 10)
+
+        Returns:
+            Dict containing deployment information
         """
+        name = deployment["name"]
         try:
-            logger.info(f"Setting up monitoring for {service_name}...")
-            
-            # TODO: Implement monitoring setup
-            # This is a placeholder for the monitoring setup code
-            # In a real implementation, you would:
-            # 1. Set up Azure Monitor
-            # 2. Configure diagnostic settings
-            # 3. Set up alerts
-            # 4. Configure logging
+            logger.info(f"Deploying {deployment['model']} as {name} on {service_name}...")
+            model = {"format": "OpenAI", "name": deployment["model"]}
+            if deployment.get("version"):
+                model["version"] = deployment["version"]
+            poller = await self.cognitive_client.deployments.begin_create_or_update(
+                self.resource_group,
+                service_name,
+                name,
+                {
+                    "sku": {
+                        "name": deployment.get("sku", "Standard"),
+                        "capacity": deployment.get("capacity", 10)
+                    },
+                    "properties": {"model": model}
+                }
+            )
+            result = await self._wait_for(poller, f"Deploying {name} on {service_name}")
+            logger.info(f"✅ Deployment {name} on {service_name} is ready")
+            return {
+                "name": name,
+                "model": deployment["model"],
+                "provisioning_state": result.properties.provisioning_state
+            }
 
-            logger.info("✅ Monitoring setup completed")
+        except Exception as e:
+            logger.error(f"Failed to deploy {name} on {service_name}: {str(e)}")
+            raise
+
+    async def setup_monitoring(self, service_name: str) -> Optional[str]:
+        """
+        Send the OpenAI service's logs and metrics to a Log Analytics workspace.
+
+        Creates (or updates) a diagnostic setting on the service that exports all
+        log categories and all metrics to AZURE_LOG_ANALYTICS_WORKSPACE_ID.
+
+        Args:
+            service_name: Name of the OpenAI service
+
+        Returns:
+            Optional[str]: Resource ID of the diagnostic setting, or None if no
+                workspace is configured
+        """
+        if not self.log_analytics_workspace_id:
+            logger.warning(
+                f"AZURE_LOG_ANALYTICS_WORKSPACE_ID is not set; skipping monitoring for {service_name}"
+            )
+            return None
+        try:
+            logger.info(f"Setting up monitoring for {service_name}...")
+            account = await self.cognitive_client.accounts.get(self.resource_group, service_name)
+            setting = await self.monitor_client.diagnostic_settings.create_or_update(
+                account.id,
+                DIAGNOSTIC_SETTING_NAME,
+                {
+                    "workspace_id": self.log_analytics_workspace_id,
+                    "logs": [{"category_group": "allLogs", "enabled": True}],
+                    "metrics": [{"category": "AllMetrics", "enabled": True}]
+                }
+            )
+            logger.info(f"✅ Monitoring setup completed for {service_name}")
+            return setting.id
 
         except Exception as e:
-            logger.error(f"Failed to set up monitoring: {str(e)}")
+            logger.error(f"Failed to set up monitoring for {service_name}: {str(e)}")
             raise
 
+    async def provision_service(self, service: Dict) -> Dict:
+        """
+        Provision one service with its deployments and monitoring.
+
+        The service is created first. Its deployments are then created one at a
+        time, since Azure rejects concurrent deployment changes on one account.
+        Monitoring (a diagnostic setting, see setup_monitoring) is configured
+        alongside them.
+
+        Args:
+            service: "name", optional "location" and optional "deployments" (see
+                setup_model_deployment)
+
+        Returns:
+            Dict containing service information, its deployments and its
+                "diagnostic_setting" ID (None if monitoring was skipped)
+        """
+        service_info = await self.setup_openai_service(service["name"], service.get("location"))
+
+        async def deploy_all() -> List[Dict]:
+            return [
+                await self.setup_model_deployment(service["name"], deployment)
+                for deployment in service.get("deployments", [])
+            ]
+
+        deployments, diagnostic_setting = await asyncio.gather(
+            deploy_all(), self.setup_monitoring(service["name"])
+        )
+        service_info["deployments"] = deployments
+        service_info["diagnostic_setting"] = diagnostic_setting
+        return service_info
+
+    async def provision_environment(self, services: List[Dict]) -> List[Dict]:
+        """
+        Provision several services concurrently.
+
+        A failure in one service does not stop the others.
+
+        Args:
+            services: Service descriptions (see provision_service)
+
+        Returns:
+            List[Dict]: One entry per service, in order: its information, or its
+                "name" and "error" if provisioning failed
+        """
+        logger.info(f"Provisioning {len(services)} service(s) concurrently...")
+        start = time.monotonic()
+        results = await asyncio.gather(
+            *(self.provision_service(service) for service in services),
+            return_exceptions=True
+        )
+        logger.info(f"Provisioning finished in {time.monotonic() - start:.0f}s")
+        return [
+            {"name": service["name"], "error": str(result)} if isinstance(result, BaseException) else result
+            for service, result in zip(services, results)
+        ]
+
+def services_from_env() -> List[Dict]:
+    """
+    Read the services to provision from AZURE_OPENAI_SERVICES.
+
+    AZURE_OPENAI_SERVICES is a JSON list of objects with "name" and optional
+    "location" and "deployments", e.g.
+    [{"name": "ws-eastus", "location": "eastus", "deployments": [{"name": "gpt-4", "model": "gpt-4", "version": "0613"}]}]
+
+    Returns:
+        List[Dict]: Services; a single DEFAULT_SERVICE_NAME service in
+            AZURE_LOCATION if the variable is not set
+    """
+    value = os.getenv("AZURE_OPENAI_SERVICES")
+    if not value:
+        return [{"name": DEFAULT_SERVICE_NAME}]
+    try:
+        services = json.loads(value)
+        if not all(isinstance(service, dict) and service.get("name") for service in services):
+            raise ValueError("every service needs a name")
+    except (ValueError, TypeError) as e:
+        raise EnvironmentError(f"Invalid AZURE_OPENAI_SERVICES: {str(e)}")
+    return services
+
+async def run_setup(services: List[Dict]) -> List[Dict]:
+    """
+    Validate prerequisites and provision the services on one event loop.
+
+    Args:
+        services: Service descriptions (see AzureEnvironmentSetup.provision_service)
+
+    Returns:
+        List[Dict]: Provisioning results, or an empty list if prerequisites failed
+    """
+    async with AzureEnvironmentSetup() as setup:
+        if not await setup.validate_prerequisites():
+            return []
+        return await setup.provision_environment(services)
+
 def main():
     """Main function to run the environment setup."""
-    setup = AzureEnvironmentSetup()
-    
     print("\n🚀 Starting Azure environment setup...")
-    
-    # Run setup tasks
-    asyncio.run(setup.validate_prerequisites())
-    
-    # Example service name - in practice, this should be configurable
-    service_name = "workshop-openai-service"
-    
+
     try:
-        # Set up OpenAI service
-        service_info = asyncio.run(setup.setup_openai_service(service_name))
+        services = services_from_env()
+        results = asyncio.run(run_setup(services))
+        if not results:
+            print("\n❌ Setup failed: prerequisites not met")
+            sys.exit(1)
+
         print(f"\n📊 Service Information:")
-        print(json.dumps(service_info, indent=2))
-        
-        # Set up monitoring
-        asyncio.run(setup.setup_monitoring(service_name))
-        
+        print(json.dumps(results, indent=2))
+
+        failed = [result["name"] for result in results if "error" in result]
+        if failed:
+            print(f"\n❌ Setup failed for: {', '.join(failed)}")
+            sys.exit(1)
+
         print("\n✅ Environment setup completed successfully!")
-        
+
     except Exception as e:
         print(f"\n❌ Setup failed: {str(e)}")
         sys.exit(1)
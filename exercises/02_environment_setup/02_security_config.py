@@ -9,24 +9,37 @@ import json
 import logging
 from typing import Dict, List, Optional
 import asyncio
-from azure.identity import DefaultAzureCredential
-from azure.mgmt.authorization import AuthorizationManagementClient
-from azure.mgmt.network import NetworkManagementClient
-from azure.core.exceptions import AzureError
+
+# Add parent directory to path to import utils
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from src.utils.azure_credentials import CredentialProvider, get_credential_provider
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class SecurityConfiguration:
-    def __init__(self):
-        """Initialize security configuration utilities."""
-        self.credential = DefaultAzureCredential()
+    def __init__(self, credential_provider: Optional[CredentialProvider] = None):
+        """
+        Initialize security configuration utilities.
+
+        Args:
+            credential_provider: Token source; defaults to the process-wide provider
+        """
+        self.credential_provider = credential_provider or get_credential_provider()
+        self._credential = None
         self.subscription_id = os.getenv("AZURE_SUBSCRIPTION_ID")
         self.resource_group = os.getenv("AZURE_RESOURCE_GROUP")
         self.location = os.getenv("AZURE_LOCATION", "eastus")
         self.service_name = os.getenv("AZURE_OPENAI_SERVICE_NAME")
 
+    @property
+    def credential(self):
+        """Azure credential backed by the provider's shared token cache."""
+        if self._credential is None:
+            self._credential = self.credential_provider.sync_credential()
+        return self._credential
+
     async def setup_rbac(self, role_assignments: List[Dict[str, str]]) -> None:
         """
         Set up RBAC roles for the OpenAI service.
@@ -36,7 +49,8 @@ class SecurityConfiguration:
         """
         try:
             logger.info("Setting up RBAC roles...")
-            
+            from azure.mgmt.authorization import AuthorizationManagementClient
+
             # Initialize the Authorization Management Client
             auth_client = AuthorizationManagementClient(
                 credential=self.credential,
@@ -82,7 +96,8 @@ class SecurityConfiguration:
         """
         try:
             logger.info("Configuring network security...")
-            
+            from azure.mgmt.network import NetworkManagementClient
+
             # Initialize the Network Management Client
             network_client = NetworkManagementClient(
                 credential=self.credential,
@@ -0,0 +1,206 @@
+"""
+Adaptive concurrency control for Azure OpenAI requests.
+
+An AIMD (additive-increase, multiplicative-decrease) window caps in-flight
+requests: it grows while calls succeed and halves when the service throttles
+with 429, converging on the highest concurrency the deployment's quota allows.
+"""
+
+import time
+import random
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Dict, List, Mapping, Optional
+
+
+class ThrottledError(Exception):
+    """Raised when a request is still throttled (HTTP 429) after all retries."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def parse_retry_after(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    """
+    Read the server's requested delay from response headers.
+
+    Args:
+        headers (Mapping, optional): Response headers
+
+    Returns:
+        float, optional: Seconds to wait, or None if no usable header was sent
+    """
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return max(0.0, float(value) / 1000)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(
+    attempt: int,
+    base_delay: float = 0.5,
+    max_delay: float = 30.0,
+    retry_after: Optional[float] = None
+) -> float:
+    """
+    Compute a jittered exponential backoff delay.
+
+    Args:
+        attempt (int): Zero-based retry attempt
+        base_delay (float): Delay scale for the first retry, in seconds
+        max_delay (float): Upper bound for the exponential part, in seconds
+        retry_after (float, optional): Server-requested delay, always honored
+
+    Returns:
+        float: Seconds to sleep before retrying
+    """
+    # "Full jitter": spread retries uniformly so clients don't retry in lockstep
+    delay = random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+    if retry_after is not None:
+        delay = retry_after + random.uniform(0, base_delay)
+    return delay
+
+
+def _release(waiter: asyncio.Future) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class AdaptiveConcurrencyLimiter:
+    def __init__(
+        self,
+        initial_limit: float = 4,
+        min_limit: float = 1,
+        max_limit: float = 64,
+        increase: float = 1.0,
+        decrease_factor: float = 0.5
+    ):
+        """
+        Initialize the AIMD concurrency window.
+
+        Args:
+            initial_limit (float): Starting number of concurrent requests
+            min_limit (float): Lowest the window may shrink to
+            max_limit (float): Highest the window may grow to
+            increase (float): Window growth per window's worth of successes
+            decrease_factor (float): Multiplier applied to the window on a 429
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+
+        self._window = float(min(max(initial_limit, min_limit), max_limit))
+        self._in_flight = 0
+        self._last_decrease = float("-inf")
+        # Futures of callers waiting for a slot, each bound to the event loop it
+        # is awaited on, so one limiter can be shared by several loops
+        self._waiters: List[asyncio.Future] = []
+        self._lock = threading.Lock()
+        self._stats = {"successes": 0, "throttles": 0, "errors": 0, "retries": 0}
+
+    @property
+    def limit(self) -> int:
+        """Current number of requests allowed in flight."""
+        return max(1, int(self._window))
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Wait for a free slot in the window and hold it for the duration of the block."""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                if self._in_flight < self.limit:
+                    self._in_flight += 1
+                    break
+                waiter = loop.create_future()
+                self._waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                with self._lock:
+                    if waiter in self._waiters:
+                        self._waiters.remove(waiter)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            self._wake_waiters()
+
+    def _wake_waiters(self) -> None:
+        # Every waiter re-checks the window. Waiters on this loop are woken
+        # directly, those on other loops through their loop's thread-safe queue.
+        with self._lock:
+            waiters, self._waiters = self._waiters, []
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        for waiter in waiters:
+            loop = waiter.get_loop()
+            if loop is running:
+                _release(waiter)
+            elif not loop.is_closed():
+                loop.call_soon_threadsafe(_release, waiter)
+
+    def on_success(self) -> None:
+        """Grow the window additively (about +increase per window of successes)."""
+        self._stats["successes"] += 1
+        previous_limit = self.limit
+        self._window = min(self.max_limit, self._window + self.increase / self._window)
+        if self.limit > previous_limit:
+            self._wake_waiters()
+
+    def on_throttle(self, sent_at: Optional[float] = None) -> None:
+        """
+        Shrink the window multiplicatively after a 429.
+
+        Args:
+            sent_at (float, optional): time.monotonic() when the throttled request
+                was sent. 429s for requests sent before the last decrease were
+                caused by the old window, so they don't shrink it again.
+        """
+        self._stats["throttles"] += 1
+        if sent_at is not None and sent_at < self._last_decrease:
+            return
+        self._window = max(self.min_limit, self._window * self.decrease_factor)
+        self._last_decrease = time.monotonic()
+
+    def on_error(self) -> None:
+        """Record a non-throttling failure; the window is left unchanged."""
+        self._stats["errors"] += 1
+
+    def on_retry(self) -> None:
+        """Record that a request is being retried."""
+        self._stats["retries"] += 1
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Get the current window and counters.
+
+        Returns:
+            Dict: 'window', 'limit', 'in_flight', 'successes', 'throttles',
+                'errors' and 'retries'
+        """
+        stats = dict(self._stats)
+        stats.update({"window": round(self._window, 2), "limit": self.limit, "in_flight": self._in_flight})
+        return stats
@@ -0,0 +1,358 @@
+"""
+Process-wide Azure credential with a per-scope token cache.
+
+DefaultAzureCredential walks a chain of sources (environment, managed
+identity, Azure CLI, ...) before it returns a token, which can take seconds.
+CredentialProvider wraps one credential for the whole process, caches a token
+per scope, refreshes tokens on a background thread before they expire, and
+can persist them to a file so the next run starts with a valid token. It
+hands out sync and async credential objects that Azure SDK clients accept.
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+import tempfile
+import threading
+from collections import namedtuple
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Same fields as azure.core.credentials.AccessToken, which SDK clients read
+AccessToken = namedtuple("AccessToken", ["token", "expires_on"])
+
+_RETRY_SECONDS = 30.0
+# With background refresh, a cached token is still served until this close to expiry
+_MIN_VALIDITY_SECONDS = 30.0
+
+
+def _default_credential():
+    from azure.identity import DefaultAzureCredential
+    return DefaultAzureCredential()
+
+
+class CredentialProvider:
+    def __init__(
+        self,
+        credential: Optional[Any] = None,
+        credential_factory: Optional[Callable[[], Any]] = None,
+        refresh_margin: float = 300.0,
+        cache_path: Optional[str] = None,
+        background_refresh: bool = True,
+        idle_timeout: float = 3600.0
+    ):
+        """
+        Initialize the provider.
+
+        Args:
+            credential (optional): Sync credential with get_token(*scopes, **kwargs),
+                e.g. a fake in tests; takes precedence over credential_factory
+            credential_factory (Callable, optional): Creates the credential on first
+                use; defaults to azure.identity.DefaultAzureCredential
+            refresh_margin (float): Seconds before expiry at which a token is refreshed
+            cache_path (str, optional): JSON file tokens are persisted to between runs;
+                None keeps them in memory only. The file holds bearer tokens and
+                is created readable by the current user only.
+            background_refresh (bool): Refresh tokens on a daemon thread before they
+                enter the refresh margin, so callers never wait on a refresh
+            idle_timeout (float): Tokens not requested for this many seconds are
+                no longer refreshed and are dropped once they expire; the thread
+                exits when no tokens are left
+        """
+        self._credential = credential
+        self._credential_factory = credential_factory or _default_credential
+        self.refresh_margin = refresh_margin
+        self.cache_path = cache_path
+        self.background_refresh = background_refresh
+        self.idle_timeout = idle_timeout
+
+        # Scope key -> token
+        self._tokens: Dict[Tuple, AccessToken] = {}
+        # Scope key -> when a caller last asked for it; tokens loaded from the
+        # cache file count as unused until then
+        self._last_used: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+        # One lock per scope key, so concurrent misses acquire a token once
+        self._key_locks: Dict[Tuple, threading.Lock] = {}
+        self._wakeup = threading.Condition(self._lock)
+        self._refresher: Optional[threading.Thread] = None
+        self._closed = False
+        self._stats = {"hits": 0, "acquired": 0, "refreshed": 0, "refresh_errors": 0, "loaded": 0}
+        self._load_cache()
+
+    @property
+    def credential(self):
+        """The underlying credential, created on first use."""
+        with self._lock:
+            if self._credential is None:
+                self._credential = self._credential_factory()
+            return self._credential
+
+    @staticmethod
+    def _key(scopes: Tuple[str, ...], tenant_id: Optional[str]) -> Tuple:
+        return (tenant_id or "",) + tuple(sorted(scopes))
+
+    def _fresh(self, token: Optional[AccessToken], now: float) -> bool:
+        return token is not None and token.expires_on - now > self.refresh_margin
+
+    def _cached(self, key: Tuple) -> Optional[AccessToken]:
+        """Return the cached token if callers may use it without waiting, counting the hit."""
+        with self._lock:
+            token = self._tokens.get(key)
+            if token is None:
+                return None
+            remaining = token.expires_on - time.time()
+            # While the refresher is working on a token in its margin, keep serving it
+            refreshing = self.background_refresh and not self._closed
+            if remaining > self.refresh_margin or (refreshing and remaining > _MIN_VALIDITY_SECONDS):
+                self._stats["hits"] += 1
+                self._last_used[key] = time.time()
+                return token
+            return None
+
+    def get_token(self, *scopes: str, claims: Optional[str] = None, tenant_id: Optional[str] = None, **kwargs) -> AccessToken:
+        """
+        Get a token for the scopes, from the cache when it is not close to expiry.
+
+        Args:
+            *scopes: Token scopes, e.g. "https://management.azure.com/.default"
+            claims (str, optional): Claims challenge; always acquires a new token
+            tenant_id (str, optional): Tenant to request the token from
+
+        Returns:
+            AccessToken: Token and its expiry (epoch seconds)
+        """
+        key = self._key(scopes, tenant_id)
+        if claims is not None:
+            return self._acquire(key, scopes, tenant_id, "acquired", claims=claims, **kwargs)
+        token = self._cached(key)
+        if token is not None:
+            # Tokens loaded from the cache file need the refresher too
+            self._ensure_refresher()
+            return token
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            # Another caller may have acquired it while we waited
+            token = self._cached(key)
+            if token is not None:
+                return token
+            return self._acquire(key, scopes, tenant_id, "acquired", **kwargs)
+
+    def _acquire(self, key: Tuple, scopes: Tuple[str, ...], tenant_id: Optional[str], counter: str, **kwargs) -> AccessToken:
+        if tenant_id:
+            kwargs["tenant_id"] = tenant_id
+        result = self.credential.get_token(*scopes, **kwargs)
+        token = AccessToken(result.token, int(result.expires_on))
+        with self._lock:
+            self._tokens[key] = token
+            if counter == "acquired":
+                self._last_used[key] = time.time()
+            self._stats[counter] += 1
+            self._wakeup.notify()
+        self._save_cache()
+        self._ensure_refresher()
+        return token
+
+    def _ensure_refresher(self) -> None:
+        refresher = self._refresher
+        if not self.background_refresh or (refresher is not None and refresher.is_alive()):
+            return
+        with self._lock:
+            if self._closed or (self._refresher is not None and self._refresher.is_alive()):
+                return
+            self._refresher = threading.Thread(target=self._refresh_loop, name="azure-token-refresh", daemon=True)
+            self._refresher.start()
+
+    def _refresh_loop(self) -> None:
+        retry_at: Dict[Tuple, float] = {}
+        while True:
+            with self._lock:
+                if self._closed:
+                    return
+                now = time.time()
+                # Expired tokens can't be served any more; forget them, which also
+                # ends retries of a refresh that kept failing
+                expired = [key for key, token in self._tokens.items() if token.expires_on <= now]
+                for key in expired:
+                    del self._tokens[key]
+                    self._last_used.pop(key, None)
+                    retry_at.pop(key, None)
+                if not self._tokens:
+                    # Nothing left to refresh; the next acquisition starts a new thread
+                    self._refresher = None
+                    return
+
+                due = []
+                wake_times = []
+                for key, token in self._tokens.items():
+                    if now - self._last_used.get(key, 0.0) > self.idle_timeout:
+                        # Not in use: let it lapse
+                        wake_times.append(token.expires_on)
+                    elif self._fresh(token, now):
+                        wake_times.append(token.expires_on - self.refresh_margin)
+                    elif retry_at.get(key, 0.0) > now:
+                        wake_times.append(min(retry_at[key], token.expires_on))
+                    else:
+                        due.append(key)
+                if not due and not expired:
+                    self._wakeup.wait(max(min(wake_times) - now, 1.0))
+                    continue
+            if expired:
+                self._save_cache()
+            for key in due:
+                tenant_id, scopes = key[0] or None, key[1:]
+                try:
+                    self._acquire(key, scopes, tenant_id, "refreshed")
+                    retry_at.pop(key, None)
+                except Exception as e:
+                    # Keep the current token until it expires; try again shortly
+                    with self._lock:
+                        self._stats["refresh_errors"] += 1
+                    retry_at[key] = time.time() + _RETRY_SECONDS
+                    logger.warning(f"Background token refresh for {' '.join(scopes)} failed: {str(e)}")
+
+    def _load_cache(self) -> None:
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        for entry in entries:
+            try:
+                key = tuple(entry["key"])
+                token = AccessToken(entry["token"], int(entry["expires_on"]))
+            except (KeyError, TypeError, ValueError):
+                continue
+            if token.expires_on > now:
+                self._tokens[key] = token
+                self._stats["loaded"] += 1
+
+    def _save_cache(self) -> None:
+        if not self.cache_path:
+            return
+        with self._lock:
+            entries = [
+                {"key": list(key), "token": token.token, "expires_on": token.expires_on}
+                for key, token in self._tokens.items()
+            ]
+        temp_path = None
+        try:
+            cache_dir = os.path.dirname(self.cache_path)
+            if cache_dir:
+                os.makedirs(cache_dir, exist_ok=True)
+            # A unique temp file per write, so concurrent writers can't clobber
+            # each other's; mkstemp creates it readable by the current user only
+            fd, temp_path = tempfile.mkstemp(
+                dir=cache_dir or ".", prefix=f"{os.path.basename(self.cache_path)}.", suffix=".tmp"
+            )
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entries, f)
+            os.replace(temp_path, self.cache_path)
+        except OSError as e:
+            logger.warning(f"Could not write token cache {self.cache_path}: {str(e)}")
+            if temp_path is not None and os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def sync_credential(self) -> "CachedCredential":
+        """Credential object for synchronous Azure SDK clients."""
+        return CachedCredential(self)
+
+    def async_credential(self) -> "AsyncCachedCredential":
+        """Credential object for azure.*.aio clients."""
+        return AsyncCachedCredential(self)
+
+    def close(self) -> None:
+        """Stop background refresh and close the underlying credential."""
+        with self._lock:
+            self._closed = True
+            self._wakeup.notify_all()
+            credential, self._credential = self._credential, None
+        close = getattr(credential, "close", None)
+        if close is not None:
+            close()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get token cache counters.
+
+        Returns:
+            Dict: Cache 'hits', tokens 'acquired' on demand and 'refreshed' in the
+                background, 'refresh_errors', tokens 'loaded' from the cache file
+                and cached 'tokens'
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["tokens"] = len(self._tokens)
+        return stats
+
+
+class CachedCredential:
+    def __init__(self, provider: CredentialProvider):
+        """Sync credential backed by a CredentialProvider's token cache."""
+        self.provider = provider
+
+    def get_token(self, *scopes: str, **kwargs) -> AccessToken:
+        return self.provider.get_token(*scopes, **kwargs)
+
+    def close(self) -> None:
+        # The provider is shared by the process; clients must not close it
+        pass
+
+    def __enter__(self) -> "CachedCredential":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+
+class AsyncCachedCredential:
+    def __init__(self, provider: CredentialProvider):
+        """Async credential backed by a CredentialProvider's token cache."""
+        self.provider = provider
+
+    async def get_token(self, *scopes: str, **kwargs) -> AccessToken:
+        # Cache hits return without a thread hop; acquisition blocks, so it runs in a worker thread
+        provider = self.provider
+        if kwargs.get("claims") is None:
+            token = provider._cached(provider._key(scopes, kwargs.get("tenant_id")))
+            if token is not None:
+                return token
+        return await asyncio.to_thread(lambda: provider.get_token(*scopes, **kwargs))
+
+    async def close(self) -> None:
+        # The provider is shared by the process; clients must not close it
+        pass
+
+    async def __aenter__(self) -> "AsyncCachedCredential":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        pass
+
+
+_provider: Optional[CredentialProvider] = None
+_provider_lock = threading.Lock()
+
+
+def get_credential_provider() -> CredentialProvider:
+    """
+    Get the process-wide credential provider, creating it on first use.
+
+    AZURE_TOKEN_CACHE_PATH, if set, persists tokens to that file between runs.
+
+    Returns:
+        CredentialProvider: Shared provider
+    """
+    global _provider
+    with _provider_lock:
+        if _provider is None or _provider._closed:
+            cache_path = os.getenv("AZURE_TOKEN_CACHE_PATH")
+            _provider = CredentialProvider(cache_path=os.path.expanduser(cache_path) if cache_path else None)
+        return _provider
@@ -1,33 +1,200 @@
 """
 Utility functions for interacting with Azure OpenAI Service.
+
+The openai SDK, pandas, numpy and the .env file are loaded on first use
+rather than at import, so short scripts that only import the helper start fast.
 """
 
 import os
 import json
-from typing import Dict, List, Union, Optional
-from dotenv import load_dotenv
-import openai
+import time
+import asyncio
+from typing import TYPE_CHECKING, AsyncIterator, Dict, Iterator, List, Tuple, Union, Optional
 from datetime import datetime
+from src.utils.openai_client import ClientSettings, close_async_clients, get_async_client, load_environment
+from src.utils.response_cache import ResponseCache, make_cache_key
+from src.utils.prompt_template import PromptTemplate, cached_prompt_tokens, compile_template
+from src.utils.prompt_serializers import count_tokens, select_serialization, serialize_sales_data
+from src.utils.chunking import group_texts, partition_records
+from src.utils.sales_loader import aiter_sales_records, iter_sales_records
+from src.utils.sales_store import SalesStore
+from src.utils.log_sink import get_log_sink
+from src.utils.adaptive_limiter import (
+    AdaptiveConcurrencyLimiter, ThrottledError, backoff_delay, parse_retry_after
+)
+from src.utils.rate_limiter import TokenBucketRateLimiter, rate_limiter_from_env
+from src.utils.router import EndpointRouter, router_from_env
+from src.utils.hedging import HedgingPolicy, mark_attempt
+from src.utils.single_flight import SingleFlight
+
+if TYPE_CHECKING:
+    from openai import AsyncAzureOpenAI
+    from src.utils.similarity_cache import SimilarityCache
+
+DEFAULT_REDUCE_PROMPT = """
+Combine the following partial analyses, each covering one partition of a larger
+sales dataset, into a single analysis. Merge overlapping findings, add up counts
+and totals where they come from disjoint partitions, and keep the structure used
+by the partial analyses.
+
+Partial Analyses:
+{partial_results}
+"""
+
+def format_stream_stats(stats: Dict) -> str:
+    """
+    Format streaming statistics for display.
 
-# Load environment variables
-load_dotenv()
+    Args:
+        stats (Dict): Statistics filled in by generate_completion_stream
 
-# Configure OpenAI
-openai.api_key = os.getenv("AZURE_OPENAI_API_KEY")
-openai.api_base = os.getenv("AZURE_OPENAI_ENDPOINT")
-openai.api_type = "azure"
-openai.api_version = "2023-05-15"
+    Returns:
+        str: One-line summary of time-to-first-token, duration and throughput
+    """
+    ttft = stats.get("time_to_first_token")
+    ttft_text = f"{ttft:.2f}s" if ttft is not None else "n/a"
+    return (
+        f"first token {ttft_text}, total {stats.get('total_duration', 0.0):.2f}s, "
+        f"{stats.get('completion_tokens', 0)} tokens at {stats.get('tokens_per_second', 0.0):.1f} tokens/s"
+    )
 
 class AzureOpenAIHelper:
-    def __init__(self):
-        """Initialize the Azure OpenAI helper with environment variables."""
-        self.model = os.getenv("AZURE_OPENAI_MODEL", "gpt-4")
+    def __init__(
+        self,
+        cache: Optional[ResponseCache] = None,
+        endpoint: Optional[str] = None,
+        api_key: Optional[str] = None,
+        model: Optional[str] = None,
+        client_settings: Optional[ClientSettings] = None,
+        client: Optional["AsyncAzureOpenAI"] = None,
+        limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+        max_retries: int = 5,
+        rate_limiter: Optional[TokenBucketRateLimiter] = None,
+        similarity_cache: Optional["SimilarityCache"] = None,
+        router: Optional[EndpointRouter] = None,
+        hedging: Optional[HedgingPolicy] = None,
+        single_flight: Optional[SingleFlight] = None,
+        env_layers: bool = True
+    ):
+        """
+        Initialize the Azure OpenAI helper with environment variables.
+
+        Explicit arguments override the environment, so several helpers can
+        talk to different endpoints in one process. Helpers with identical
+        settings share one pooled client.
+
+        Args:
+            cache (ResponseCache, optional): Response cache to use. If omitted, a
+                cache is created when AZURE_OPENAI_CACHE_PATH is set.
+            endpoint (str, optional): Azure OpenAI endpoint
+            api_key (str, optional): Azure OpenAI API key
+            model (str, optional): Deployment name
+            client_settings (ClientSettings, optional): Pool limits and timeouts;
+                endpoint and api_key are taken from here if given
+            client (AsyncAzureOpenAI, optional): Pre-built client to use instead
+                of the shared pool
+            limiter (AdaptiveConcurrencyLimiter, optional): Concurrency window that
+                adapts to throttling; pass one instance to several helpers to share it
+            max_retries (int): Retries for throttled (429), timed-out, connection
+                and 5xx failures
+            rate_limiter (TokenBucketRateLimiter, optional): Client-side RPM/TPM
+                limiter. If omitted, one shared across processes is created when
+                AZURE_OPENAI_RPM or AZURE_OPENAI_TPM is set.
+            similarity_cache (SimilarityCache, optional): Approximate-match cache
+                consulted after an exact-match miss. If omitted, one is created when
+                AZURE_OPENAI_SIMILARITY_THRESHOLD is set.
+            router (EndpointRouter, optional): Spreads requests over several
+                endpoint/deployment backends with failover, replacing the single
+                endpoint. If omitted, one is created when AZURE_OPENAI_BACKENDS is set.
+            hedging (HedgingPolicy, optional): Sends a duplicate of requests slower
+                than the rolling latency threshold and keeps the first response. If
+                omitted, one is created when AZURE_OPENAI_HEDGE_BUDGET (max fraction
+                of extra requests, e.g. 0.05) is set.
+            single_flight (SingleFlight, optional): Coalesces identical concurrent
+                requests into one API call; pass one instance to several helpers
+                to share it
+            env_layers (bool): Create the response cache, rate limiter, similarity
+                cache, router and hedging policy from the environment when they
+                are not passed. False gives a helper that talks straight to the
+                endpoint, e.g. for load testing.
+        """
+        load_environment()
+        self.client_settings = client_settings or ClientSettings(endpoint=endpoint, api_key=api_key)
+        self.router = router or (router_from_env(self.client_settings) if env_layers else None)
+        # With a router, the model name only identifies requests (cache keys,
+        # token counting); each backend substitutes its own deployment
+        default_model = self.router.backends[0].deployment if self.router else "gpt-4"
+        self.model = model or os.getenv("AZURE_OPENAI_MODEL", default_model)
+        self._model_override = model
+        self._client = client
+        self.limiter = limiter or AdaptiveConcurrencyLimiter()
+        self.max_retries = max_retries
+        self._prompt_cache_stats = {"responses": 0, "prompt_tokens": 0, "cached_tokens": 0}
         self._validate_setup()
+        self.rate_limiter = rate_limiter
+        if rate_limiter is None and env_layers:
+            self.rate_limiter = rate_limiter_from_env(self.client_settings.endpoint, self.model)
+
+        cache_path = os.getenv("AZURE_OPENAI_CACHE_PATH")
+        if cache is None and cache_path and env_layers:
+            cache = ResponseCache(cache_path)
+        self.cache = cache
+
+        similarity_threshold = os.getenv("AZURE_OPENAI_SIMILARITY_THRESHOLD")
+        if similarity_cache is None and similarity_threshold and env_layers:
+            from src.utils.similarity_cache import SimilarityCache
+            similarity_cache = SimilarityCache(threshold=float(similarity_threshold))
+        self.similarity_cache = similarity_cache
+
+        hedge_budget = os.getenv("AZURE_OPENAI_HEDGE_BUDGET")
+        if hedging is None and hedge_budget and env_layers:
+            hedging = HedgingPolicy(max_extra_ratio=float(hedge_budget))
+        self.hedging = hedging
+        self.single_flight = single_flight or SingleFlight()
+
+    @property
+    def client(self) -> "AsyncAzureOpenAI":
+        """The async client, shared with other helpers on the same event loop."""
+        if self._client is not None:
+            return self._client
+        return get_async_client(self.client_settings)
+
+    async def aclose(self) -> None:
+        """
+        Stop the router's health checks and close the pooled clients created on
+        the running event loop.
+
+        Call this (or use the helper as an async context manager) before the
+        event loop ends, so their connections are closed cleanly. A client
+        passed in as `client` is left to its owner.
+        """
+        if self.router is not None:
+            await self.router.aclose()
+        await close_async_clients()
+
+    async def __aenter__(self) -> "AzureOpenAIHelper":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    @property
+    def cache_scope(self) -> Optional[str]:
+        """The resource(s) requests go to; part of every cache and coalescing key."""
+        if self.router is not None:
+            return ",".join(sorted(backend.endpoint for backend in self.router.backends))
+        return self.client_settings.endpoint
 
     def _validate_setup(self) -> None:
         """Validate that all required environment variables are set."""
-        required_vars = ["AZURE_OPENAI_API_KEY", "AZURE_OPENAI_ENDPOINT", "AZURE_OPENAI_MODEL"]
-        missing_vars = [var for var in required_vars if not os.getenv(var)]
+        if self.router is not None:
+            return
+        configured = {
+            "AZURE_OPENAI_API_KEY": self.client_settings.api_key,
+            "AZURE_OPENAI_ENDPOINT": self.client_settings.endpoint,
+            "AZURE_OPENAI_MODEL": self._model_override or os.getenv("AZURE_OPENAI_MODEL")
+        }
+        missing_vars = [var for var, value in configured.items() if not value]
         
         if missing_vars:
             raise EnvironmentError(
@@ -40,7 +207,10 @@ class AzureOpenAIHelper:
         prompt: str,
         max_tokens: int = 1000,
         temperature: float = 0.7,
-        system_message: Optional[str] = None
+        system_message: Optional[str] = None,
+        use_cache: bool = True,
+        refresh_cache: bool = False,
+        coalesce: Optional[bool] = None
     ) -> str:
         """
         Generate a completion using Azure OpenAI.
@@ -50,6 +220,12 @@ class AzureOpenAIHelper:
             max_tokens (int): Maximum number of tokens to generate
             temperature (float): Sampling temperature
             system_message (str, optional): System message to set context
+            use_cache (bool): Read from and write to the response and similarity
+                caches, if configured
+            refresh_cache (bool): Skip the cache lookups but store the fresh response
+            coalesce (bool, optional): Share one API call with identical requests
+                already in flight. Defaults to on only for temperature 0, since
+                sampled requests should each get their own completion.
 
         Returns:
             str: Generated completion text
@@ -59,20 +235,491 @@ class AzureOpenAIHelper:
             messages.append({"role": "system", "content": system_message})
         messages.append({"role": "user", "content": prompt})
 
+        cache_key = None
+        if self.cache is not None:
+            if use_cache and self.cache.is_cacheable(temperature):
+                cache_key = make_cache_key(self.model, messages, temperature, max_tokens, self.cache_scope)
+                if not refresh_cache:
+                    cached = await self.cache.get_async(cache_key)
+                    if cached is not None:
+                        return cached
+            else:
+                self.cache.record_bypass()
+
+        # Near-duplicates only match prompts sent with the same model, system
+        # message and generation settings
+        similarity_namespace = similarity_signature = candidate = None
+        if self.similarity_cache is not None and use_cache and self.similarity_cache.is_cacheable(temperature):
+            similarity_namespace = make_cache_key(self.model, messages[:-1], temperature, max_tokens, self.cache_scope)
+            # Hashing a long prompt's shingles is CPU-bound; keep it off the event loop
+            similarity_signature = await asyncio.to_thread(self.similarity_cache.signature, prompt)
+            if not refresh_cache:
+                match = self.similarity_cache.lookup(prompt, similarity_namespace, similarity_signature)
+                if match is not None and match.accepted:
+                    return match.completion
+                candidate = match
+
+        request_key = cache_key or make_cache_key(self.model, messages, temperature, max_tokens, self.cache_scope)
+        request = {
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature
+        }
+
+        async def send() -> str:
+            try:
+                # A hedge shares the original request's concurrency slot; the
+                # hedging budget bounds the extra load
+                async with self.limiter.slot():
+                    if self.hedging is not None:
+                        response = await self.hedging.run("completion", lambda: self._create_with_retries(**request))
+                    else:
+                        response = await self._create_with_retries(**request)
+                completion = response.choices[0].message.content
+            except ThrottledError:
+                raise
+            except Exception as e:
+                raise Exception(f"Error generating completion: {str(e)}")
+
+            if cache_key is not None and completion is not None:
+                await self.cache.set_async(cache_key, completion)
+            if similarity_namespace is not None and completion is not None:
+                self.similarity_cache.add(
+                    request_key, prompt, completion, similarity_namespace, similarity_signature
+                )
+            return completion
+
+        if coalesce is None:
+            coalesce = temperature == 0
+        completion = await (self.single_flight.do(request_key, send) if coalesce else send())
+        if candidate is not None and completion is not None:
+            self.similarity_cache.check_candidate(candidate, completion)
+        return completion
+
+    async def _create_with_retries(self, **request):
+        """
+        Send a chat completion request, retrying throttled and transient failures.
+
+        With a rate limiter configured, each attempt first waits for one request
+        and the estimated tokens (prompt + max_tokens) to be available locally;
+        the tokens of an attempt that fails or is cancelled (e.g. a losing
+        hedge) are given back, and a success gives back what it didn't use.
+        429s shrink the adaptive concurrency window and wait at least as long
+        as the service's Retry-After; timeouts, connection errors and 5xx
+        responses are retried with jittered exponential backoff. Successes grow
+        the window.
+        """
+        from openai import APIConnectionError, APIStatusError, RateLimitError
+
+        estimated_tokens = 0
+        if self.rate_limiter is not None:
+            estimated_tokens = request.get("max_tokens", 0) + sum(
+                count_tokens(message["content"], self.model) for message in request["messages"]
+            )
+
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire(estimated_tokens)
+            mark_attempt()
+            sent_at = time.monotonic()
+            try:
+                response = await self._send_attempt(request, estimated_tokens)
+            except RateLimitError as e:
+                self.limiter.on_throttle(sent_at)
+                retry_after = parse_retry_after(e.response.headers)
+                if attempt == self.max_retries:
+                    raise ThrottledError(
+                        f"Error generating completion: throttled after {attempt + 1} attempts: {str(e)}",
+                        retry_after=retry_after
+                    )
+            except (APIConnectionError, APIStatusError) as e:
+                retryable = isinstance(e, APIConnectionError) or e.status_code >= 500
+                self.limiter.on_error()
+                if not retryable or attempt == self.max_retries:
+                    raise
+                retry_after = parse_retry_after(e.response.headers) if isinstance(e, APIStatusError) else None
+            else:
+                self.limiter.on_success()
+                usage = getattr(response, "usage", None)
+                if usage is not None:
+                    self._prompt_cache_stats["responses"] += 1
+                    self._prompt_cache_stats["prompt_tokens"] += usage.prompt_tokens
+                    self._prompt_cache_stats["cached_tokens"] += cached_prompt_tokens(response)
+                if self.rate_limiter is not None and usage is not None:
+                    await self.rate_limiter.refund_async(estimated_tokens - usage.total_tokens)
+                return response
+
+            self.limiter.on_retry()
+            await asyncio.sleep(backoff_delay(attempt, retry_after=retry_after))
+
+    async def _send_attempt(self, request: Dict, estimated_tokens: int):
+        """Send one attempt, refunding its estimated tokens if it fails or is cancelled."""
         try:
-            response = await openai.ChatCompletion.acreate(
-                engine=self.model,
-                messages=messages,
-                max_tokens=max_tokens,
-                temperature=temperature,
+            if self.router is not None:
+                return await self.router.create(**request)
+            return await self.client.chat.completions.create(**request)
+        except BaseException:
+            if self.rate_limiter is not None:
+                await self.rate_limiter.refund_async(estimated_tokens)
+            raise
+
+    def concurrency_stats(self) -> Dict[str, float]:
+        """
+        Get the adaptive concurrency window and throttling counters.
+
+        Returns:
+            Dict: Current window/limit, in-flight requests and success, throttle,
+                error and retry counts
+        """
+        return self.limiter.stats()
+
+    def hedging_stats(self) -> Dict[str, float]:
+        """
+        Get request hedging counters.
+
+        Returns:
+            Dict: Requests, hedges sent and won, budget denials, cancellations,
+                extra-request ratio and current thresholds; empty without hedging
+        """
+        return self.hedging.stats() if self.hedging is not None else {}
+
+    def coalescing_stats(self) -> Dict[str, float]:
+        """
+        Get in-flight request coalescing counters.
+
+        Returns:
+            Dict: Calls, underlying requests executed, calls collapsed into one
+                already in flight, shared errors, collapse rate and calls in flight
+        """
+        return self.single_flight.stats()
+
+    def routing_stats(self) -> Dict[str, Dict]:
+        """
+        Get per-backend routing stats.
+
+        Returns:
+            Dict: Backend name -> request, success, throttle, error, failover and
+                ejection counters, outstanding requests, EWMA latency and health;
+                empty without a router
+        """
+        return self.router.stats() if self.router is not None else {}
+
+    def prompt_cache_stats(self) -> Dict[str, float]:
+        """
+        Get how much of the prompts sent so far the service served from its prompt cache.
+
+        Returns:
+            Dict: 'responses' with usage reported, total 'prompt_tokens', the
+                'cached_tokens' among them and the 'cached_ratio'
+        """
+        stats = dict(self._prompt_cache_stats)
+        stats["cached_ratio"] = stats["cached_tokens"] / stats["prompt_tokens"] if stats["prompt_tokens"] else 0.0
+        return stats
+
+    async def generate_completion_stream(
+        self,
+        prompt: str,
+        max_tokens: int = 1000,
+        temperature: float = 0.7,
+        system_message: Optional[str] = None,
+        stats: Optional[Dict] = None,
+        coalesce: Optional[bool] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream a completion from Azure OpenAI as content deltas arrive.
+
+        Args:
+            prompt (str): The prompt to generate completion for
+            max_tokens (int): Maximum number of tokens to generate
+            temperature (float): Sampling temperature
+            system_message (str, optional): System message to set context
+            stats (Dict, optional): Filled in when the stream ends with
+                'time_to_first_token', 'total_duration' (seconds),
+                'completion_tokens' and 'tokens_per_second'
+            coalesce (bool, optional): Share one stream with identical streams
+                already in flight; a late joiner first receives the deltas already
+                sent. Defaults to on only for temperature 0.
+
+        Yields:
+            str: Content deltas in order
+        """
+        messages = []
+        if system_message:
+            messages.append({"role": "system", "content": system_message})
+        messages.append({"role": "user", "content": prompt})
+
+        start_time = time.perf_counter()
+        first_token_time = None
+        token_count = 0
+
+        request = {
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "stream": True
+        }
+        if coalesce is None:
+            coalesce = temperature == 0
+        if coalesce:
+            deltas = self.single_flight.stream(
+                make_cache_key(self.model, messages, temperature, max_tokens, self.cache_scope),
+                lambda: self._stream_deltas(request)
             )
-            return response.choices[0].message.content
+        else:
+            deltas = self._stream_deltas(request)
+        try:
+            async for content in deltas:
+                if first_token_time is None:
+                    first_token_time = time.perf_counter()
+                # Azure OpenAI sends roughly one token per content chunk
+                token_count += 1
+                yield content
+        except ThrottledError:
+            raise
         except Exception as e:
             raise Exception(f"Error generating completion: {str(e)}")
+        finally:
+            await deltas.aclose()
+            if stats is not None:
+                total_duration = time.perf_counter() - start_time
+                time_to_first_token = (first_token_time - start_time) if first_token_time else None
+                generation_time = total_duration - (time_to_first_token or total_duration)
+                stats.update({
+                    "time_to_first_token": time_to_first_token,
+                    "total_duration": total_duration,
+                    "completion_tokens": token_count,
+                    "tokens_per_second": token_count / generation_time if generation_time > 0 else 0.0
+                })
+
+    async def _stream_deltas(self, request: Dict) -> AsyncIterator[str]:
+        """Send a streaming request and yield its non-empty content deltas."""
+        async with self.limiter.slot():
+            if self.hedging is not None:
+                response, chunks = await self.hedging.run(
+                    "first_chunk",
+                    lambda: self._open_stream(request),
+                    discard=lambda opened: opened[0].close()
+                )
+            else:
+                response = await self._create_with_retries(**request)
+                chunks = response
+            try:
+                async for chunk in chunks:
+                    if not chunk.choices:
+                        continue
+                    content = chunk.choices[0].delta.content
+                    if content:
+                        yield content
+            finally:
+                await response.close()
+
+    async def _open_stream(self, request: Dict):
+        """
+        Start a streaming request and wait for its first chunk.
+
+        Returns:
+            Tuple: The stream and an async iterator over all of its chunks,
+                including the first one already received
+        """
+        response = await self._create_with_retries(**request)
+        iterator = response.__aiter__()
+        try:
+            first_chunk = await iterator.__anext__()
+        except StopAsyncIteration:
+            return response, iterator
+        except BaseException:
+            await response.close()
+            raise
+
+        async def chunks():
+            yield first_chunk
+            async for chunk in iterator:
+                yield chunk
+
+        return response, chunks()
+
+    async def generate_completions_batch(
+        self,
+        prompts: List[str],
+        max_concurrency: int = 5,
+        max_tokens: int = 1000,
+        temperature: float = 0.7,
+        system_message: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        Generate completions for many prompts concurrently.
+
+        At most ``max_concurrency`` requests are in flight at once. A failing
+        prompt is recorded in its own result instead of failing the batch.
+
+        Args:
+            prompts (List[str]): Prompts to generate completions for
+            max_concurrency (int): Maximum number of concurrent requests
+            max_tokens (int): Maximum number of tokens to generate per prompt
+            temperature (float): Sampling temperature
+            system_message (str, optional): System message shared by all prompts
+
+        Returns:
+            List[Dict]: One result per prompt, in input order, with 'prompt',
+                'completion', 'error' and 'latency' (seconds) keys
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def run(prompt: str) -> Dict:
+            async with semaphore:
+                start_time = time.perf_counter()
+                completion, error = None, None
+                try:
+                    completion = await self.generate_completion(
+                        prompt,
+                        max_tokens=max_tokens,
+                        temperature=temperature,
+                        system_message=system_message
+                    )
+                except Exception as e:
+                    error = str(e)
+                return {
+                    "prompt": prompt,
+                    "completion": completion,
+                    "error": error,
+                    "latency": time.perf_counter() - start_time
+                }
+
+        return list(await asyncio.gather(*(run(prompt) for prompt in prompts)))
+
+    async def generate_map_reduce(
+        self,
+        map_prompt: str,
+        sales_data: Dict,
+        reduce_prompt: str = DEFAULT_REDUCE_PROMPT,
+        partition_by: Optional[str] = None,
+        max_prompt_tokens: int = 6000,
+        max_concurrency: int = 5,
+        mode: str = "auto",
+        max_tokens: int = 1000,
+        temperature: float = 0.7,
+        system_message: Optional[str] = None
+    ) -> str:
+        """
+        Analyze datasets larger than the context window with map-reduce.
+
+        Records are split into token-bounded partitions, the map prompt runs on
+        each partition concurrently, and the partial results are combined with
+        the reduce prompt, recursing until a single result remains. Each map
+        prompt is measured once rendered in the chosen mode, and a partition
+        over budget is halved until it fits (a single oversized record still
+        gets a prompt of its own).
+
+        Args:
+            map_prompt (str): Template with a {sales_data} placeholder, run per partition
+            sales_data (Dict): Sales data as returned by load_sales_data
+            reduce_prompt (str): Template with a {partial_results} placeholder
+            partition_by (str, optional): "date" (by month), "segment" or "rep"
+            max_prompt_tokens (int): Token budget for each map/reduce prompt
+            max_concurrency (int): Maximum number of concurrent requests
+            mode (str): How partition data is embedded, see format_sales_prompt
+            max_tokens (int): Maximum number of tokens to generate per call
+            temperature (float): Sampling temperature
+            system_message (str, optional): System message to set context
+
+        Returns:
+            str: Combined analysis
+        """
+        record_budget = max_prompt_tokens - count_tokens(map_prompt, self.model)
+        if record_budget < 1:
+            raise ValueError("max_prompt_tokens is too small for the map prompt")
+        reduce_budget = max_prompt_tokens - count_tokens(reduce_prompt, self.model)
+        if reduce_budget < 1:
+            raise ValueError("max_prompt_tokens is too small for the reduce prompt")
+
+        partitions = partition_records(
+            sales_data.get("sales_records", []),
+            record_budget,
+            partition_by=partition_by,
+            model=self.model
+        )
+        map_prompts = self._fit_map_prompts(map_prompt, partitions, mode, max_prompt_tokens)
+        partial_results = await self._run_all(
+            [prompt for _, prompt in map_prompts],
+            "map", max_concurrency, max_tokens, temperature, system_message
+        )
+        partial_results = [
+            f"[Partition: {label}]\n{result}"
+            for (label, _), result in zip(map_prompts, partial_results)
+        ]
+
+        while len(partial_results) > 1:
+            groups = group_texts(partial_results, reduce_budget, model=self.model)
+            reduce_template = compile_template(reduce_prompt, instruction="")
+            reduce_prompts = [
+                reduce_template.render(partial_results="\n\n".join(group))
+                for group in groups
+            ]
+            partial_results = await self._run_all(
+                reduce_prompts, "reduce", max_concurrency, max_tokens, temperature, system_message
+            )
+
+        return partial_results[0] if partial_results else ""
+
+    def _fit_map_prompts(
+        self,
+        map_prompt: str,
+        partitions: List[Tuple[str, List[Dict]]],
+        mode: str,
+        max_prompt_tokens: int
+    ) -> List[Tuple[str, str]]:
+        """Render each partition's map prompt, halving partitions whose prompt is over budget."""
+        template = compile_template(map_prompt, instruction="")
+        fitted: List[Tuple[str, str]] = []
+        pending = list(reversed(partitions))
+        while pending:
+            label, records = pending.pop()
+            prompt = self.format_sales_prompt(
+                template,
+                {"partition": label, "sales_records": records},
+                mode=mode
+            )
+            if len(records) > 1 and count_tokens(prompt, self.model) > max_prompt_tokens:
+                middle = len(records) // 2
+                pending.append((f"{label} [2/2]", records[middle:]))
+                pending.append((f"{label} [1/2]", records[:middle]))
+                continue
+            fitted.append((label, prompt))
+        return fitted
+
+    async def _run_all(
+        self,
+        prompts: List[str],
+        stage: str,
+        max_concurrency: int,
+        max_tokens: int,
+        temperature: float,
+        system_message: Optional[str]
+    ) -> List[str]:
+        """Run a map-reduce stage, failing if any of its prompts failed."""
+        results = await self.generate_completions_batch(
+            prompts,
+            max_concurrency=max_concurrency,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            system_message=system_message
+        )
+        errors = [result["error"] for result in results if result["error"]]
+        if errors:
+            raise Exception(
+                f"Error in {stage} step: {len(errors)} of {len(results)} requests failed "
+                f"(first error: {errors[0]})"
+            )
+        return [result["completion"] for result in results]
 
     def load_sales_data(self, filepath: str = "../data/sample_sales.json") -> Dict:
         """
-        Load sample sales data from JSON file.
+        Load sample sales data from a JSON (or JSONL) file.
 
         Args:
             filepath (str): Path to the sales data JSON file
@@ -81,11 +728,105 @@ class AzureOpenAIHelper:
             Dict: Sales data as a dictionary
         """
         try:
+            if filepath.endswith((".jsonl", ".ndjson")):
+                return {"sales_records": list(iter_sales_records(filepath))}
             with open(filepath, 'r') as f:
                 return json.load(f)
         except Exception as e:
             raise Exception(f"Error loading sales data: {str(e)}")
 
+    def iter_sales_records(
+        self,
+        filepath: str = "../data/sample_sales.json",
+        **filters
+    ) -> Iterator[Dict]:
+        """
+        Stream sales records one at a time without loading the whole file.
+
+        Args:
+            filepath (str): Path to a JSON or JSONL sales data file
+            **filters: start_date, end_date, segment, use_mmap (see sales_loader)
+
+        Returns:
+            Iterator[Dict]: Matching sales records
+        """
+        return iter_sales_records(filepath, **filters)
+
+    def aiter_sales_records(
+        self,
+        filepath: str = "../data/sample_sales.json",
+        **filters
+    ) -> AsyncIterator[Dict]:
+        """
+        Stream sales records from a worker thread so the event loop stays responsive.
+
+        Args:
+            filepath (str): Path to a JSON or JSONL sales data file
+            **filters: start_date, end_date, segment, use_mmap (see sales_loader)
+
+        Returns:
+            AsyncIterator[Dict]: Matching sales records
+        """
+        return aiter_sales_records(filepath, **filters)
+
+    def load_sales_store(
+        self,
+        filepath: str = "../data/sample_sales.json",
+        **filters
+    ) -> SalesStore:
+        """
+        Stream sales data into a compact, indexed SalesStore.
+
+        Args:
+            filepath (str): Path to a JSON or JSONL sales data file
+            **filters: start_date, end_date, segment, use_mmap (see sales_loader)
+
+        Returns:
+            SalesStore: Store supporting indexed lookups, range and group-by queries
+        """
+        try:
+            return SalesStore.from_records(iter_sales_records(filepath, **filters))
+        except Exception as e:
+            raise Exception(f"Error loading sales data: {str(e)}")
+
+    def format_sales_prompt(
+        self,
+        template: Union[str, PromptTemplate],
+        sales_data: Dict,
+        mode: str = "raw"
+    ) -> str:
+        """
+        Fill a template's {sales_data} placeholder.
+
+        The data always goes last, behind the template's static text, so
+        repeated runs share a prompt prefix the service can cache.
+
+        Args:
+            template (str or PromptTemplate): Prompt template containing a
+                {sales_data} placeholder; strings are compiled once and reused
+            sales_data (Dict): Sales data as returned by load_sales_data
+            mode (str): "raw" embeds the full JSON data; "hybrid" embeds exact,
+                locally computed metrics instead so the model only writes the narrative;
+                "auto" embeds the smallest faithful serialization; any other value
+                names a serializer from prompt_serializers (e.g. "minified", "csv",
+                "normalized")
+
+        Returns:
+            str: Formatted prompt
+        """
+        if mode == "raw":
+            payload = json.dumps(sales_data, indent=2)
+        elif mode == "hybrid":
+            from src.utils.sales_metrics import compute_kpi_metrics, format_metrics_for_prompt
+            payload = format_metrics_for_prompt(compute_kpi_metrics(sales_data))
+        elif mode == "auto":
+            _, payload = select_serialization(sales_data, model=self.model)
+        else:
+            payload = serialize_sales_data(sales_data, mode)
+        if not isinstance(template, PromptTemplate):
+            template = compile_template(template, instruction="")
+        return template.render(sales_data=payload)
+
     def format_prompt_with_examples(
         self,
         prompt: str,
@@ -94,6 +835,10 @@ class AzureOpenAIHelper:
         """
         Format a prompt with few-shot examples.
 
+        Instructions and examples come first and any placeholders such as
+        {sales_data} are moved to the end, so the result is still a template
+        for format_sales_prompt but with a stable prefix.
+
         Args:
             prompt (str): Base prompt
             examples (List[Dict]): List of example dictionaries with 'input' and 'output' keys
@@ -101,11 +846,7 @@ class AzureOpenAIHelper:
         Returns:
             str: Formatted prompt with examples
         """
-        formatted_examples = "\n\nExamples:\n"
-        for i, example in enumerate(examples, 1):
-            formatted_examples += f"\nExample {i}:\nInput: {example['input']}\nOutput: {example['output']}\n"
-        
-        return f"{prompt}\n{formatted_examples}\n\nNow, please provide your response:"
+        return compile_template(prompt, examples).to_format_string()
 
     def create_system_message(self, role: str = "sales analyst") -> str:
         """
@@ -134,6 +875,9 @@ class AzureOpenAIHelper:
         """
         Log prompt and completion for analysis.
 
+        The entry is handed to a background writer, so this never blocks on
+        file I/O. Call flush_logs() to wait until it has been written.
+
         Args:
             prompt (str): Original prompt
             completion (str): Generated completion
@@ -146,12 +890,19 @@ class AzureOpenAIHelper:
             "metadata": metadata or {}
         }
         
-        # Ensure log directory exists
-        os.makedirs("logs", exist_ok=True)
-        
-        # Append to log file
-        with open("logs/completions.jsonl", "a") as f:
-            f.write(json.dumps(log_entry) + "\n")
+        get_log_sink("logs/completions.jsonl").write(log_entry)
+
+    def flush_logs(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until all logged completions have been written to disk.
+
+        Args:
+            timeout (float, optional): Maximum seconds to wait
+
+        Returns:
+            bool: True if every queued entry was written in time
+        """
+        return get_log_sink("logs/completions.jsonl").flush(timeout)
 
 # Example usage
 if __name__ == "__main__":
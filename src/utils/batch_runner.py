@@ -0,0 +1,354 @@
+"""
+Resumable bulk completions over a JSONL request file.
+
+Each input line is a JSON object with an ID and a prompt (and optionally
+system_message, max_tokens and temperature). Lines are read lazily and at
+most --concurrency requests are in flight, so memory does not grow with the
+input. Results are appended to the output JSONL as they finish and each
+successful ID is recorded in a SQLite checkpoint, which is looked up on disk
+rather than loaded; rerunning the same command after a crash or Ctrl-C skips
+those IDs. Failed requests are written with an "error" and retried on the
+next run, so the last line for an ID wins.
+
+    python -m src.utils.batch_runner prompts.jsonl results.jsonl --concurrency 16
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import sqlite3
+import argparse
+from typing import Dict, Iterator, Optional, Set, TextIO, Tuple
+
+from src.utils.azure_openai_utils import AzureOpenAIHelper
+
+
+def count_lines(path: str, chunk_size: int = 1024 * 1024) -> int:
+    """Count the lines of a file without holding more than one chunk in memory."""
+    count = 0
+    last = b"\n"
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            count += chunk.count(b"\n")
+            last = chunk[-1:]
+    # A final line without a trailing newline still counts
+    return count + (last != b"\n")
+
+
+class Checkpoint:
+    def __init__(self, path: str):
+        """
+        Completed request IDs, kept in SQLite so memory stays flat however large
+        the input is.
+
+        Args:
+            path (str): SQLite file; created if it does not exist
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path)
+        # WAL without a sync per commit: a crash can only lose the newest
+        # entries, whose requests then run again
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS completed (id TEXT PRIMARY KEY)")
+        self._db.commit()
+
+    def __contains__(self, request_id: str) -> bool:
+        return self._db.execute(
+            "SELECT 1 FROM completed WHERE id = ?", (request_id,)
+        ).fetchone() is not None
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM completed").fetchone()[0]
+
+    def add(self, request_id: str) -> None:
+        """Record a request as completed."""
+        self._db.execute("INSERT OR IGNORE INTO completed (id) VALUES (?)", (request_id,))
+        self._db.commit()
+
+    def close(self) -> None:
+        """Close the database."""
+        self._db.close()
+
+
+def iter_requests(
+    path: str,
+    id_field: str = "id",
+    prompt_field: str = "prompt"
+) -> Iterator[Tuple[str, Optional[Dict], Optional[str], int]]:
+    """
+    Stream requests from a JSONL file one line at a time.
+
+    Args:
+        path (str): Input JSONL file
+        id_field (str): Field holding the request ID; lines without it are
+            identified by their line number ("line-<n>")
+        prompt_field (str): Field holding the prompt
+
+    Yields:
+        Tuple: Request ID, the parsed record and None; or the ID, None and an
+            error message for a line that is not a usable request. The last
+            item is the number of bytes read so far.
+    """
+    position = 0
+    with open(path, "rb") as f:
+        for line_number, line in enumerate(f, 1):
+            position += len(line)
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield f"line-{line_number}", None, f"Invalid JSON: {str(e)}", position
+                continue
+            if not isinstance(record, dict):
+                yield f"line-{line_number}", None, "Expected a JSON object", position
+                continue
+            request_id = str(record.get(id_field, f"line-{line_number}"))
+            if not isinstance(record.get(prompt_field), str):
+                yield request_id, None, f"Missing '{prompt_field}' field", position
+                continue
+            yield request_id, record, None, position
+
+
+class BatchProgress:
+    def __init__(
+        self,
+        total: Optional[int],
+        already_done: int,
+        out: TextIO = sys.stderr,
+        size: Optional[int] = None
+    ):
+        """
+        Track and print batch progress.
+
+        Args:
+            total (int, optional): Requests in the input, if known
+            already_done (int): Requests completed by earlier runs
+            out (TextIO): Stream progress lines are written to
+            size (int, optional): Input size in bytes; without a total, the
+                total is estimated from the bytes read so far
+        """
+        self.total = total
+        self.already_done = already_done
+        self.out = out
+        self.size = size
+        self.start_time = time.perf_counter()
+        self.succeeded = 0
+        self.failed = 0
+        self.requests_read = 0
+        self.bytes_read = 0
+
+    def estimated_total(self) -> Optional[int]:
+        """Requests in the input, extrapolated from the average line length so far."""
+        if self.total is not None:
+            return self.total
+        if not self.size or not self.bytes_read:
+            return None
+        return round(self.requests_read * self.size / self.bytes_read)
+
+    def report(self, final: bool = False) -> None:
+        """Print completed requests, throughput and the estimated time remaining."""
+        elapsed = time.perf_counter() - self.start_time
+        finished = self.succeeded + self.failed
+        rate = finished / elapsed if elapsed > 0 else 0.0
+        done = self.already_done + self.succeeded
+        total = self.estimated_total()
+        line = f"{done}"
+        if total is not None:
+            line += f"/{total}" if self.total is not None else f"/~{total}"
+        line += f" done, {self.failed} failed, {rate:.2f} req/s, elapsed {elapsed:.0f}s"
+        if not final and total is not None and rate > 0:
+            remaining = max(total - done - self.failed, 0)
+            line += f", ETA {remaining / rate:.0f}s"
+        print(line, file=self.out, flush=True)
+
+
+async def run_batch(
+    helper: AzureOpenAIHelper,
+    input_path: str,
+    output_path: str,
+    checkpoint_path: Optional[str] = None,
+    concurrency: int = 8,
+    id_field: str = "id",
+    prompt_field: str = "prompt",
+    max_tokens: int = 1000,
+    temperature: float = 0.7,
+    system_message: Optional[str] = None,
+    progress_interval: float = 5.0,
+    count_total: bool = False,
+    out: TextIO = sys.stderr
+) -> Dict[str, int]:
+    """
+    Run every request in a JSONL file that is not already checkpointed.
+
+    Args:
+        helper (AzureOpenAIHelper): Helper used to generate completions
+        input_path (str): Input JSONL file
+        output_path (str): Output JSONL file; results are appended
+        checkpoint_path (str, optional): Completed-ID SQLite file; defaults to
+            "<output_path>.done"
+        concurrency (int): Maximum requests in flight
+        id_field (str): Field holding the request ID
+        prompt_field (str): Field holding the prompt
+        max_tokens (int): Default maximum tokens per completion
+        temperature (float): Default sampling temperature
+        system_message (str, optional): Default system message
+        progress_interval (float): Seconds between progress lines
+        count_total (bool): Count the input's lines before starting, for an
+            exact ETA; otherwise the total is estimated from the file size
+        out (TextIO): Stream progress lines are written to
+
+    Returns:
+        Dict[str, int]: 'succeeded', 'failed', 'skipped' (already done or
+            duplicate IDs) and 'total' requests in the input
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+    checkpoint_path = checkpoint_path or f"{output_path}.done"
+    done = Checkpoint(checkpoint_path)
+    total = count_lines(input_path) if count_total else None
+    already_done = len(done)
+    progress = BatchProgress(total, already_done, out, size=os.path.getsize(input_path))
+    if already_done:
+        print(f"Resuming: {already_done} requests already completed", file=out, flush=True)
+
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    output = open(output_path, "a", encoding="utf-8")
+    in_flight: Set[str] = set()
+
+    def record_result(request_id: str, result: Dict) -> None:
+        # Write the result before its checkpoint entry: after a crash a request
+        # may be repeated, but never lost
+        output.write(json.dumps(dict(result, id=request_id)) + "\n")
+        output.flush()
+        if result["error"] is None:
+            done.add(request_id)
+            progress.succeeded += 1
+        else:
+            progress.failed += 1
+
+    async def run(request_id: str, record: Dict) -> None:
+        start_time = time.perf_counter()
+        completion, error = None, None
+        try:
+            completion = await helper.generate_completion(
+                record[prompt_field],
+                max_tokens=record.get("max_tokens", max_tokens),
+                temperature=record.get("temperature", temperature),
+                system_message=record.get("system_message", system_message)
+            )
+        except Exception as e:
+            error = str(e)
+        finally:
+            in_flight.discard(request_id)
+        record_result(request_id, {
+            "completion": completion,
+            "error": error,
+            "latency": time.perf_counter() - start_time
+        })
+
+    skipped = 0
+    pending: Set[asyncio.Task] = set()
+    next_report = time.perf_counter() + progress_interval
+    try:
+        for request_id, record, error, position in iter_requests(input_path, id_field, prompt_field):
+            progress.requests_read += 1
+            progress.bytes_read = position
+            if request_id in done or request_id in in_flight:
+                skipped += 1
+                continue
+            if record is None:
+                record_result(request_id, {"completion": None, "error": error, "latency": 0.0})
+                continue
+            # Only a window of requests is ever read ahead of the results
+            while len(pending) >= concurrency:
+                finished, pending = await asyncio.wait(
+                    pending, timeout=progress_interval, return_when=asyncio.FIRST_COMPLETED
+                )
+                if time.perf_counter() >= next_report:
+                    progress.report()
+                    next_report = time.perf_counter() + progress_interval
+            in_flight.add(request_id)
+            pending.add(asyncio.ensure_future(run(request_id, record)))
+
+        while pending:
+            _, pending = await asyncio.wait(pending, timeout=progress_interval)
+            if pending:
+                progress.report()
+        progress.report(final=True)
+    except (asyncio.CancelledError, KeyboardInterrupt):
+        print("Interrupted; rerun the same command to resume", file=out, flush=True)
+        raise
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        output.close()
+        done.close()
+
+    return {
+        "succeeded": progress.succeeded,
+        "failed": progress.failed,
+        "skipped": skipped,
+        "total": progress.requests_read
+    }
+
+
+def main():
+    """Run a JSONL request file from the command line."""
+    parser = argparse.ArgumentParser(description="Run a JSONL file of prompts through Azure OpenAI, resumably")
+    parser.add_argument("input", help="JSONL file with one request object per line")
+    parser.add_argument("output", help="JSONL file results are appended to")
+    parser.add_argument("--checkpoint", default=None, help="Completed-ID SQLite file (default: OUTPUT.done)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Maximum requests in flight")
+    parser.add_argument("--id-field", default="id")
+    parser.add_argument("--prompt-field", default="prompt")
+    parser.add_argument("--max-tokens", type=int, default=1000)
+    parser.add_argument("--temperature", type=float, default=0.7)
+    parser.add_argument("--system-message", default=None)
+    parser.add_argument("--progress-interval", type=float, default=5.0, help="Seconds between progress lines")
+    parser.add_argument(
+        "--count-lines", action="store_true",
+        help="Count the input's lines first for an exact ETA (default: estimate from the file size)"
+    )
+    args = parser.parse_args()
+
+    async def run() -> Dict:
+        # Closing the helper closes its pooled connections before the loop ends
+        async with AzureOpenAIHelper() as helper:
+            return await run_batch(
+                helper,
+                args.input,
+                args.output,
+                checkpoint_path=args.checkpoint,
+                concurrency=args.concurrency,
+                id_field=args.id_field,
+                prompt_field=args.prompt_field,
+                max_tokens=args.max_tokens,
+                temperature=args.temperature,
+                system_message=args.system_message,
+                progress_interval=args.progress_interval,
+                count_total=args.count_lines
+            )
+
+    try:
+        summary = asyncio.run(run())
+    except KeyboardInterrupt:
+        sys.exit(130)
+    print(json.dumps(summary))
+    sys.exit(1 if summary["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
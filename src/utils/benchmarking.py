@@ -0,0 +1,287 @@
+"""
+Helpers for micro-benchmarking the local (CPU and memory) side of requests.
+
+Provides a synthetic sales dataset generator shaped like data/sample_sales.json,
+a timer that also records peak memory, a cold-start import timer, and JSON
+baselines with a regression check. Used by the pytest suite in benchmarks/.
+"""
+
+import gc
+import os
+import sys
+import json
+import time
+import random
+import platform
+import statistics
+import subprocess
+import tracemalloc
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+_SEGMENTS = ["Enterprise", "Mid-Market", "Small Business"]
+_PRODUCTS = [
+    ("P101", "Enterprise Cloud Suite", "Software", 12000.0),
+    ("P102", "Security Add-on", "Software", 2500.0),
+    ("P201", "Analytics Platform", "Software", 8000.0),
+    ("P301", "Implementation Services", "Services", 5000.0),
+    ("P401", "Premium Support", "Support", 1500.0),
+]
+_REPS = ["Alice Johnson", "Bob Williams", "Carol Martinez", "David Chen", "Eva Brown"]
+_PAYMENT_TERMS = ["Net 30", "Net 45", "Net 60", "Prepaid"]
+_INTERACTIONS = [
+    ("Email", "Initial inquiry about cloud solutions"),
+    ("Call", "Discovery call with stakeholders"),
+    ("Demo", "Product demo with technical team"),
+    ("Meeting", "Price negotiation and feature discussion"),
+]
+
+
+def generate_sales_data(num_records: int, seed: int = 0) -> Dict:
+    """
+    Generate a synthetic dataset with the same shape as data/sample_sales.json.
+
+    Args:
+        num_records (int): Number of sales records
+        seed (int): Random seed, so every run benchmarks identical data
+
+    Returns:
+        Dict: {"sales_records": [...], "metadata": {...}}
+    """
+    rng = random.Random(seed)
+    start = date(2024, 1, 1)
+    num_customers = max(1, num_records // 5)
+    records = []
+    for i in range(num_records):
+        sale_date = start + timedelta(days=rng.randrange(365))
+        customer = rng.randrange(num_customers)
+        product_id, product_name, category, price = rng.choice(_PRODUCTS)
+        quantity = rng.randint(1, 10)
+        history = []
+        for days_before in sorted(rng.sample(range(1, 30), rng.randint(1, 3)), reverse=True):
+            kind, notes = rng.choice(_INTERACTIONS)
+            history.append({
+                "date": (sale_date - timedelta(days=days_before)).isoformat(),
+                "type": kind,
+                "notes": notes
+            })
+        records.append({
+            "transaction_id": f"TX{i:07d}",
+            "date": sale_date.isoformat(),
+            "customer": {
+                "id": f"C{customer:06d}",
+                "name": f"Customer {customer}",
+                "company": f"Company {customer} Inc",
+                "segment": _SEGMENTS[customer % len(_SEGMENTS)]
+            },
+            "product": {"id": product_id, "name": product_name, "category": category, "price": price},
+            "quantity": quantity,
+            "total_amount": price * quantity,
+            "payment_terms": rng.choice(_PAYMENT_TERMS),
+            "sales_rep": rng.choice(_REPS),
+            "interaction_history": history
+        })
+    return {
+        "sales_records": records,
+        "metadata": {"generated_date": start.isoformat(), "currency": "USD", "total_records": num_records}
+    }
+
+
+def measure(
+    func: Callable,
+    setup: Optional[Callable[[], Tuple]] = None,
+    repeat: int = 5,
+    min_seconds: float = 0.5,
+    max_seconds: float = 10.0,
+    max_runs: int = 200,
+    track_memory: bool = True
+) -> Dict[str, float]:
+    """
+    Time a function and record its peak memory.
+
+    Timing runs are repeated at least `repeat` times, and for fast functions
+    until `min_seconds` have been spent, but stop early once `max_seconds`
+    have been spent. As with timeit, garbage collection is paused while a
+    run is timed, and the fastest run is reported, being the least disturbed
+    by other activity. Peak memory comes from one extra run under
+    tracemalloc, which slows execution and so is kept out of the timings.
+
+    Args:
+        func (Callable): Function to measure
+        setup (Callable, optional): Returns the arguments for each call; not timed
+        repeat (int): Target number of timed runs
+        min_seconds (float): Keep repeating fast functions until this much time is spent
+        max_seconds (float): Stop repeating once this much time has been spent
+        max_runs (int): Upper bound on timed runs
+        track_memory (bool): Measure peak memory
+
+    Returns:
+        Dict: 'seconds' (fastest run), 'median_seconds', 'runs' and 'peak_bytes'
+    """
+    timings: List[float] = []
+    spent = 0.0
+    gc.collect()
+    while not timings or (
+        spent < max_seconds
+        and len(timings) < max_runs
+        and (len(timings) < repeat or spent < min_seconds)
+    ):
+        args = setup() if setup else ()
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            func(*args)
+            elapsed = time.perf_counter() - start
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+        timings.append(elapsed)
+        spent += elapsed
+
+    peak_bytes = 0
+    if track_memory:
+        args = setup() if setup else ()
+        gc.collect()
+        tracemalloc.start()
+        try:
+            baseline = tracemalloc.get_traced_memory()[0]
+            func(*args)
+            peak_bytes = tracemalloc.get_traced_memory()[1] - baseline
+        finally:
+            tracemalloc.stop()
+
+    return {
+        "seconds": min(timings),
+        "median_seconds": statistics.median(timings),
+        "runs": len(timings),
+        "peak_bytes": max(0, peak_bytes)
+    }
+
+
+_IMPORT_PROBE = """
+import importlib, importlib.util, json, sys, time
+sys.path.insert(0, {root!r})
+target = {target!r}
+start = time.perf_counter()
+if target.endswith(".py"):
+    spec = importlib.util.spec_from_file_location("entry_point", target)
+    spec.loader.exec_module(importlib.util.module_from_spec(spec))
+else:
+    importlib.import_module(target)
+seconds = time.perf_counter() - start
+loaded = sorted(name for name in {watch!r} if name in sys.modules)
+print(json.dumps({{"seconds": seconds, "loaded": loaded}}))
+"""
+
+
+def measure_import(
+    target: str,
+    root: str,
+    repeat: int = 5,
+    watch: Tuple[str, ...] = ()
+) -> Dict:
+    """
+    Time importing a module in fresh interpreters.
+
+    Each run starts a new Python process, so nothing is already imported; the
+    interpreter's own startup is not included. The fastest run is reported.
+
+    Args:
+        target (str): Dotted module name, or path to a script to load as a module
+        root (str): Directory put first on sys.path
+        repeat (int): Number of fresh processes to time
+        watch (Tuple[str, ...]): Top-level modules to report if the import loaded them
+
+    Returns:
+        Dict: 'seconds' (fastest run), 'median_seconds', 'runs' and 'loaded'
+            (the watched modules that were imported)
+    """
+    code = _IMPORT_PROBE.format(root=root, target=target, watch=tuple(watch))
+    timings: List[float] = []
+    loaded: List[str] = []
+    for _ in range(repeat):
+        completed = subprocess.run(
+            [sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=False
+        )
+        if completed.returncode != 0:
+            raise RuntimeError(f"Importing {target} failed:\n{completed.stderr.strip()}")
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        timings.append(result["seconds"])
+        loaded = result["loaded"]
+    return {
+        "seconds": min(timings),
+        "median_seconds": statistics.median(timings),
+        "runs": len(timings),
+        "loaded": loaded
+    }
+
+
+def load_baselines(path: str) -> Dict[str, Dict]:
+    """
+    Load stored benchmark baselines.
+
+    Args:
+        path (str): Baseline JSON file
+
+    Returns:
+        Dict: Benchmark name -> result; empty if the file does not exist
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f).get("results", {})
+
+
+def save_baselines(path: str, results: Dict[str, Dict]) -> None:
+    """
+    Store benchmark results as the new baselines.
+
+    Args:
+        path (str): Baseline JSON file
+        results (Dict): Benchmark name -> result
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    payload = {
+        "created": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()}",
+        "results": dict(sorted(results.items()))
+    }
+    with open(path, "w") as f:
+        json.dump(payload, f, indent=2)
+
+
+def find_regressions(
+    result: Dict[str, float],
+    baseline: Dict[str, float],
+    threshold: float = 0.25,
+    min_seconds: float = 0.001,
+    min_bytes: int = 64 * 1024
+) -> List[str]:
+    """
+    Compare a result against its baseline.
+
+    Args:
+        result (Dict): Output of measure()
+        baseline (Dict): Stored output of measure()
+        threshold (float): Allowed relative slowdown / memory growth (0.25 = 25%)
+        min_seconds (float): Absolute slowdowns below this are treated as noise
+        min_bytes (int): Absolute memory growth below this is treated as noise
+
+    Returns:
+        List[str]: One message per regressed measurement; empty if none
+    """
+    regressions = []
+    for key, floor, unit in (("seconds", min_seconds, "s"), ("peak_bytes", min_bytes, " bytes")):
+        old, new = baseline.get(key), result.get(key)
+        if not old or new is None:
+            continue
+        if new > old * (1 + threshold) and new - old > floor:
+            regressions.append(
+                f"{key} regressed {new / old - 1:+.0%} ({old:.6g}{unit} -> {new:.6g}{unit}, "
+                f"threshold {threshold:.0%})"
+            )
+    return regressions
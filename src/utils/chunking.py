@@ -0,0 +1,138 @@
+"""
+Token-bounded partitioning of sales records for map-reduce analysis.
+"""
+
+import json
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from src.utils.prompt_serializers import count_tokens
+
+
+def _partition_by_month(record: Dict) -> str:
+    return str(record.get("date", ""))[:7] or "unknown"
+
+
+def _partition_by_segment(record: Dict) -> str:
+    return (record.get("customer") or {}).get("segment") or "unknown"
+
+
+def _partition_by_rep(record: Dict) -> str:
+    return record.get("sales_rep") or "unknown"
+
+
+PARTITION_KEYS: Dict[str, Callable[[Dict], str]] = {
+    "date": _partition_by_month,
+    "segment": _partition_by_segment,
+    "rep": _partition_by_rep,
+}
+
+
+def estimate_record_tokens(record: Dict, model: str = "gpt-4") -> int:
+    """
+    Estimate the prompt tokens one record costs.
+
+    Records are measured as minified JSON, which the table serializers
+    usually undercut. Indented JSON costs more, so callers embedding records
+    in another format should measure the rendered prompt as well (see
+    AzureOpenAIHelper.generate_map_reduce).
+
+    Args:
+        record (Dict): A single sales record
+        model (str): Model whose tokenizer to count with
+
+    Returns:
+        int: Estimated token count
+    """
+    return count_tokens(json.dumps(record, separators=(",", ":")), model)
+
+
+def partition_records(
+    records: Iterable[Dict],
+    max_tokens: int,
+    partition_by: Optional[Union[str, Callable[[Dict], str]]] = None,
+    model: str = "gpt-4"
+) -> List[Tuple[str, List[Dict]]]:
+    """
+    Split records into chunks that each fit within a token budget.
+
+    Records are first grouped by partition key (so a chunk never mixes, say,
+    two months), then each group is packed into as few chunks as fit.
+
+    Args:
+        records (Iterable[Dict]): Sales records
+        max_tokens (int): Token budget for the records in one chunk
+        partition_by (str or Callable, optional): "date" (by month), "segment",
+            "rep", or a function returning a partition key per record
+        model (str): Model whose tokenizer to count with
+
+    Returns:
+        List[Tuple[str, List[Dict]]]: (label, records) per chunk, in key order
+    """
+    if max_tokens < 1:
+        raise ValueError("max_tokens must be at least 1")
+
+    if partition_by is None:
+        key_func: Callable[[Dict], str] = lambda record: "all"
+    elif callable(partition_by):
+        key_func = partition_by
+    elif partition_by in PARTITION_KEYS:
+        key_func = PARTITION_KEYS[partition_by]
+    else:
+        raise ValueError(f"Unknown partition key: {partition_by}")
+
+    groups: Dict[str, List[Dict]] = {}
+    for record in records:
+        groups.setdefault(str(key_func(record)), []).append(record)
+
+    chunks: List[Tuple[str, List[Dict]]] = []
+    for key in sorted(groups):
+        group_chunks: List[List[Dict]] = [[]]
+        used = 0
+        for record in groups[key]:
+            tokens = estimate_record_tokens(record, model)
+            # An oversized record still gets a chunk of its own rather than being dropped
+            if group_chunks[-1] and used + tokens > max_tokens:
+                group_chunks.append([])
+                used = 0
+            group_chunks[-1].append(record)
+            used += tokens
+
+        if len(group_chunks) == 1:
+            chunks.append((key, group_chunks[0]))
+        else:
+            for i, chunk in enumerate(group_chunks, 1):
+                chunks.append((f"{key} (part {i}/{len(group_chunks)})", chunk))
+    return chunks
+
+
+def group_texts(texts: List[str], max_tokens: int, model: str = "gpt-4") -> List[List[str]]:
+    """
+    Pack texts into groups within a token budget for a reduce step.
+
+    Every group holds at least two texts (when available) so each reduce
+    round strictly shrinks the number of partial results.
+
+    Args:
+        texts (List[str]): Partial results to combine
+        max_tokens (int): Token budget per group
+        model (str): Model whose tokenizer to count with
+
+    Returns:
+        List[List[str]]: Groups of texts, in order
+    """
+    groups: List[List[str]] = []
+    current: List[str] = []
+    used = 0
+    for text in texts:
+        tokens = count_tokens(text, model)
+        if len(current) >= 2 and used + tokens > max_tokens:
+            groups.append(current)
+            current, used = [], 0
+        current.append(text)
+        used += tokens
+    if current:
+        if len(current) == 1 and groups:
+            groups[-1].append(current[0])
+        else:
+            groups.append(current)
+    return groups
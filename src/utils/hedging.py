@@ -0,0 +1,177 @@
+"""
+Request hedging to cut tail latency.
+
+If a request hasn't completed (or, for streams, produced its first chunk)
+within a rolling high percentile of recent latencies, a duplicate is sent
+and whichever finishes first wins; the other is cancelled. A budget caps
+duplicates at a fraction of all requests, so hedging spends a predictable
+amount of extra quota.
+"""
+
+import time
+import asyncio
+from collections import deque
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+from src.utils.latency_stats import percentile as nearest_rank_percentile
+
+T = TypeVar("T")
+
+# When the current attempt of a hedged request was sent; each attempt runs in
+# its own task, so each sees its own value
+_attempt_started: ContextVar[Optional[float]] = ContextVar("hedging_attempt_started", default=None)
+
+
+def mark_attempt() -> None:
+    """
+    Note that a request attempt is being sent now.
+
+    Senders that retry call this before each attempt, so the latency recorded
+    by HedgingPolicy.run covers only the last attempt, not backoff or
+    rate-limit waits before it.
+    """
+    _attempt_started.set(time.monotonic())
+
+
+class HedgingPolicy:
+    def __init__(
+        self,
+        max_extra_ratio: float = 0.05,
+        percentile: float = 95.0,
+        window: int = 200,
+        min_samples: int = 20,
+        min_delay: float = 0.05,
+        initial_delay: Optional[float] = None
+    ):
+        """
+        Initialize the hedging policy.
+
+        Args:
+            max_extra_ratio (float): Budget: hedges may be at most this fraction of
+                requests (0.05 = 5% extra requests)
+            percentile (float): Latency percentile used as the hedging threshold
+            window (int): Number of recent latencies the percentile is taken over
+            min_samples (int): Latencies needed before the percentile is trusted
+            min_delay (float): Lower bound for the threshold, in seconds
+            initial_delay (float, optional): Threshold to use until min_samples
+                latencies are known; None disables hedging until then
+        """
+        self.max_extra_ratio = max_extra_ratio
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.initial_delay = initial_delay
+        self._window = window
+        # Request kind (e.g. "completion", "first_token") -> recent latencies
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._stats = {"requests": 0, "hedged": 0, "hedge_wins": 0, "budget_denied": 0, "cancelled": 0}
+
+    def record(self, kind: str, latency: float) -> None:
+        """Add a successful request's latency to the rolling window for its kind."""
+        samples = self._latencies.get(kind)
+        if samples is None:
+            samples = self._latencies[kind] = deque(maxlen=self._window)
+        samples.append(latency)
+
+    def delay(self, kind: str) -> Optional[float]:
+        """
+        Current hedging threshold for a request kind.
+
+        Returns:
+            float, optional: Seconds to wait before hedging, or None if there
+                is not enough data yet and no initial_delay is configured
+        """
+        samples = self._latencies.get(kind)
+        if not samples or len(samples) < self.min_samples:
+            return self.initial_delay
+        return max(self.min_delay, nearest_rank_percentile(sorted(samples), self.percentile))
+
+    def _take_budget(self) -> bool:
+        if self._stats["hedged"] + 1 > self.max_extra_ratio * self._stats["requests"]:
+            self._stats["budget_denied"] += 1
+            return False
+        self._stats["hedged"] += 1
+        return True
+
+    async def run(
+        self,
+        kind: str,
+        call: Callable[[], Awaitable[T]],
+        discard: Optional[Callable[[T], Awaitable[None]]] = None
+    ) -> T:
+        """
+        Run a request, hedging it if it is slower than the threshold.
+
+        Args:
+            kind (str): Latency class of the request; thresholds are per kind
+            call (Callable): Starts one attempt of the request; called a second
+                time for the hedge
+            discard (Callable, optional): Releases the result of an attempt that
+                also succeeded but lost the race (e.g. closes an open stream)
+
+        Returns:
+            The result of whichever attempt finished first without error. If
+            both fail, the primary attempt's error is raised.
+        """
+        self._stats["requests"] += 1
+        primary = asyncio.ensure_future(self._timed(kind, call))
+        hedge = None
+        winner = None
+        # Every exit, including the caller being cancelled while waiting on the
+        # threshold, cancels and awaits the attempts still running
+        try:
+            threshold = self.delay(kind)
+            if threshold is not None:
+                done, _ = await asyncio.wait({primary}, timeout=threshold)
+                if not done and self._take_budget():
+                    hedge = asyncio.ensure_future(self._timed(kind, call))
+            if hedge is None:
+                result = await primary
+                winner = primary
+                return result
+
+            pending = {primary, hedge}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in (primary, hedge):
+                    if task in done and not task.cancelled() and task.exception() is None:
+                        winner = task
+                        if task is hedge:
+                            self._stats["hedge_wins"] += 1
+                        return task.result()
+            return primary.result()
+        finally:
+            attempts = [task for task in (primary, hedge) if task is not None]
+            for task in attempts:
+                if not task.done():
+                    task.cancel()
+                    self._stats["cancelled"] += 1
+            # Let cancelled attempts release their connections
+            results = await asyncio.gather(*attempts, return_exceptions=True)
+            if discard is not None:
+                for task, result in zip(attempts, results):
+                    if task is not winner and not isinstance(result, BaseException):
+                        await discard(result)
+
+    async def _timed(self, kind: str, call: Callable[[], Awaitable[T]]) -> T:
+        _attempt_started.set(time.monotonic())
+        result = await call()
+        self.record(kind, time.monotonic() - _attempt_started.get())
+        return result
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Get hedging counters.
+
+        Returns:
+            Dict: 'requests', 'hedged' (extra requests sent), 'hedge_wins',
+                'budget_denied', 'cancelled', the 'extra_ratio' spent and the
+                current threshold per kind in milliseconds
+        """
+        stats = dict(self._stats)
+        stats["extra_ratio"] = stats["hedged"] / stats["requests"] if stats["requests"] else 0.0
+        for kind in self._latencies:
+            threshold = self.delay(kind)
+            stats[f"{kind}_threshold_ms"] = round(threshold * 1000, 1) if threshold is not None else None
+        return stats
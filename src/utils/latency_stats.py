@@ -0,0 +1,23 @@
+"""
+Percentile helpers shared by the load generator and the hedging policy.
+"""
+
+import math
+from typing import List, Optional
+
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    """
+    Nearest-rank percentile of already sorted values.
+
+    Args:
+        sorted_values (List[float]): Values in ascending order
+        pct (float): Percentile between 0 and 100
+
+    Returns:
+        float, optional: Percentile value, or None for no values
+    """
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
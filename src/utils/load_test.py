@@ -0,0 +1,399 @@
+"""
+Concurrent load generation and latency reporting for Azure OpenAI deployments.
+
+Supports closed-loop (N virtual users, each sending its next request as soon
+as the previous one finishes) and open-loop (requests started at a target rate
+regardless of completions) workloads. Warm-up requests are reported
+separately, and results are summarized as percentiles with configurable SLO
+assertions.
+"""
+
+import re
+import json
+import random
+import asyncio
+from typing import Callable, Dict, List, Optional
+
+from src.utils.adaptive_limiter import ThrottledError
+from src.utils.latency_stats import percentile
+
+DEFAULT_PROMPTS = [
+    "Summarize this text: Hello world",
+    "Translate to French: Good morning",
+    "Write a haiku about: Spring",
+]
+
+_SLO_PATTERN = re.compile(r"^\s*([\w.]+)\s*(<=|>=|<|>)\s*([-+\d.eE]+)\s*$")
+
+
+def classify_error(error: BaseException) -> str:
+    """
+    Map an exception (or the one it wraps) to a short error class.
+
+    Args:
+        error (BaseException): Exception raised by a request
+
+    Returns:
+        str: e.g. "throttled", "timeout", "connection", "http_500" or the type name
+    """
+    from openai import APIConnectionError, APIStatusError, APITimeoutError
+
+    seen = set()
+    current: Optional[BaseException] = error
+    while current is not None and id(current) not in seen:
+        seen.add(id(current))
+        if isinstance(current, ThrottledError):
+            return "throttled"
+        if isinstance(current, APITimeoutError) or isinstance(current, asyncio.TimeoutError):
+            return "timeout"
+        if isinstance(current, APIConnectionError):
+            return "connection"
+        if isinstance(current, APIStatusError):
+            return "throttled" if current.status_code == 429 else f"http_{current.status_code}"
+        current = current.__cause__ or current.__context__
+    return type(error).__name__
+
+
+def summarize(values: List[float]) -> Dict[str, Optional[float]]:
+    """Summarize samples as count, mean, p50, p95, p99 and max."""
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "mean": sum(ordered) / len(ordered) if ordered else None,
+        "p50": percentile(ordered, 50),
+        "p95": percentile(ordered, 95),
+        "p99": percentile(ordered, 99),
+        "max": ordered[-1] if ordered else None,
+    }
+
+
+def histogram(values: List[float], bucket_bounds: List[float]) -> Dict[str, int]:
+    """
+    Count samples per bucket (upper bounds inclusive, plus an overflow bucket).
+
+    Args:
+        values (List[float]): Samples
+        bucket_bounds (List[float]): Ascending bucket upper bounds
+
+    Returns:
+        Dict[str, int]: "<=bound" -> count, and ">last" for the overflow bucket
+    """
+    counts = {f"<={bound:g}": 0 for bound in bucket_bounds}
+    overflow = f">{bucket_bounds[-1]:g}"
+    counts[overflow] = 0
+    for value in values:
+        for bound in bucket_bounds:
+            if value <= bound:
+                counts[f"<={bound:g}"] += 1
+                break
+        else:
+            counts[overflow] += 1
+    return counts
+
+
+LATENCY_BUCKETS_MS = [100, 250, 500, 1000, 2000, 5000, 10000, 30000]
+TTFT_BUCKETS_MS = [50, 100, 250, 500, 1000, 2000, 5000, 10000]
+TOKENS_PER_SECOND_BUCKETS = [5, 10, 20, 40, 60, 80, 120, 200]
+
+# Summary key, its histogram key and bucket bounds, and the console label
+HISTOGRAMS = [
+    ("latency_ms", "latency_histogram_ms", LATENCY_BUCKETS_MS, "latency (ms)"),
+    ("ttft_ms", "ttft_histogram_ms", TTFT_BUCKETS_MS, "TTFT (ms)"),
+    ("tokens_per_second", "tokens_per_second_histogram", TOKENS_PER_SECOND_BUCKETS, "tokens/s"),
+]
+
+
+class LoadTestConfig:
+    def __init__(
+        self,
+        mode: str = "closed",
+        virtual_users: int = 4,
+        target_rps: float = 2.0,
+        duration: float = 30.0,
+        warmup: float = 5.0,
+        prompts: Optional[List[str]] = None,
+        max_tokens: int = 50,
+        request_timeout: float = 60.0,
+        poisson_arrivals: bool = True
+    ):
+        """
+        Describe a load test.
+
+        Args:
+            mode (str): "closed" (virtual users) or "open" (target request rate)
+            virtual_users (int): Concurrent users for closed-loop mode
+            target_rps (float): Request start rate for open-loop mode
+            duration (float): Seconds of measured load after warm-up
+            warmup (float): Seconds of load reported separately before measuring
+            prompts (List[str], optional): Prompts sent round-robin
+            max_tokens (int): Maximum tokens per completion
+            request_timeout (float): Seconds before a request counts as a timeout
+            poisson_arrivals (bool): Randomize open-loop arrivals (exponential gaps)
+        """
+        if mode not in ("closed", "open"):
+            raise ValueError(f"Unknown load test mode: {mode}")
+        self.mode = mode
+        self.virtual_users = virtual_users
+        self.target_rps = target_rps
+        self.duration = duration
+        self.warmup = warmup
+        self.prompts = prompts or list(DEFAULT_PROMPTS)
+        self.max_tokens = max_tokens
+        self.request_timeout = request_timeout
+        self.poisson_arrivals = poisson_arrivals
+
+    def to_dict(self) -> Dict:
+        return {
+            "mode": self.mode,
+            "virtual_users": self.virtual_users,
+            "target_rps": self.target_rps,
+            "duration": self.duration,
+            "warmup": self.warmup,
+            "prompts": len(self.prompts),
+            "max_tokens": self.max_tokens,
+            "request_timeout": self.request_timeout,
+        }
+
+
+class LoadTestReport:
+    def __init__(self, config: LoadTestConfig):
+        """Collect per-request samples for a load test run."""
+        self.config = config
+        self.samples: List[Dict] = []
+        self.started_at: Optional[float] = None
+        self.measure_started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def record(self, sample: Dict) -> None:
+        self.samples.append(sample)
+
+    def _phase_summary(self, phase: str) -> Dict:
+        samples = [s for s in self.samples if s["phase"] == phase]
+        successes = [s for s in samples if s["error"] is None]
+        errors: Dict[str, int] = {}
+        for sample in samples:
+            if sample["error"] is not None:
+                errors[sample["error"]] = errors.get(sample["error"], 0) + 1
+
+        if phase == "measure" and self.measure_started_at is not None and self.finished_at is not None:
+            elapsed = max(1e-9, self.finished_at - self.measure_started_at)
+        elif phase == "warmup" and self.started_at is not None and self.measure_started_at is not None:
+            elapsed = max(1e-9, self.measure_started_at - self.started_at)
+        else:
+            elapsed = None
+
+        values = {
+            "latency_ms": [s["latency_ms"] for s in successes],
+            "ttft_ms": [s["ttft_ms"] for s in successes if s["ttft_ms"] is not None],
+            "tokens_per_second": [s["tokens_per_second"] for s in successes if s["tokens_per_second"]],
+        }
+        summary = {
+            "requests": len(samples),
+            "successes": len(successes),
+            "success_rate": len(successes) / len(samples) if samples else 0.0,
+            "error_rate": 1 - len(successes) / len(samples) if samples else 0.0,
+            "errors": errors,
+            "throughput_rps": len(successes) / elapsed if elapsed else None,
+        }
+        for key, series in values.items():
+            summary[key] = summarize(series)
+        for key, histogram_key, bounds, _ in HISTOGRAMS:
+            summary[histogram_key] = histogram(values[key], bounds)
+        return summary
+
+    def to_dict(self, include_samples: bool = False) -> Dict:
+        """
+        Build the JSON-serializable report.
+
+        Args:
+            include_samples (bool): Also include every per-request sample
+
+        Returns:
+            Dict: Config, warm-up and measured summaries (and optionally samples)
+        """
+        report = {
+            "config": self.config.to_dict(),
+            "warmup": self._phase_summary("warmup"),
+            "summary": self._phase_summary("measure"),
+        }
+        if include_samples:
+            report["samples"] = self.samples
+        return report
+
+    def write_json(self, path: str, include_samples: bool = True) -> None:
+        """Write the report to a JSON file."""
+        with open(path, "w") as f:
+            json.dump(self.to_dict(include_samples=include_samples), f, indent=2)
+
+    def format_console(self) -> str:
+        """Render the measured summary as a console table."""
+        summary = self._phase_summary("measure")
+        warmup = self._phase_summary("warmup")
+
+        def fmt(value: Optional[float]) -> str:
+            return "-" if value is None else f"{value:,.1f}"
+
+        lines = [
+            f"Mode: {self.config.mode}   Requests: {summary['requests']} "
+            f"(+{warmup['requests']} warm-up)   Success rate: {summary['success_rate'] * 100:.1f}%   "
+            f"Throughput: {fmt(summary['throughput_rps'])} req/s",
+            f"{'metric':<20}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}",
+        ]
+        for label, key in (("latency (ms)", "latency_ms"), ("TTFT (ms)", "ttft_ms"), ("tokens/s", "tokens_per_second")):
+            stats = summary[key]
+            lines.append(
+                f"{label:<20}{fmt(stats['p50']):>10}{fmt(stats['p95']):>10}"
+                f"{fmt(stats['p99']):>10}{fmt(stats['max']):>10}"
+            )
+        lines.append("histograms (bucket:count)")
+        for _, histogram_key, _, label in HISTOGRAMS:
+            buckets = "  ".join(f"{bucket}:{count}" for bucket, count in summary[histogram_key].items())
+            lines.append(f"  {label:<18}{buckets}")
+        if summary["errors"]:
+            lines.append("errors: " + ", ".join(f"{name}={count}" for name, count in sorted(summary["errors"].items())))
+        return "\n".join(lines)
+
+
+def check_slos(report: Dict, slos: List[str]) -> List[str]:
+    """
+    Evaluate SLO assertions against a report's measured summary.
+
+    Each SLO is "<path> <op> <value>", where path indexes into the summary,
+    e.g. "latency_ms.p95 <= 2000", "ttft_ms.p99 < 800" or "success_rate >= 0.9".
+
+    Args:
+        report (Dict): Output of LoadTestReport.to_dict()
+        slos (List[str]): SLO assertions
+
+    Returns:
+        List[str]: Descriptions of the SLOs that were violated (empty if all pass)
+    """
+    operators: Dict[str, Callable[[float, float], bool]] = {
+        "<=": lambda a, b: a <= b,
+        ">=": lambda a, b: a >= b,
+        "<": lambda a, b: a < b,
+        ">": lambda a, b: a > b,
+    }
+    failures = []
+    for slo in slos:
+        match = _SLO_PATTERN.match(slo)
+        if not match:
+            raise ValueError(f"Invalid SLO: {slo!r}")
+        path, op, threshold = match.group(1), match.group(2), float(match.group(3))
+        value = report["summary"]
+        for part in path.split("."):
+            if not isinstance(value, dict) or part not in value:
+                raise ValueError(f"Unknown SLO metric: {path}")
+            value = value[part]
+        if value is None or not operators[op](value, threshold):
+            failures.append(f"{path} = {value} (required {op} {threshold:g})")
+    return failures
+
+
+def create_load_test_helper(config: LoadTestConfig, endpoint: Optional[str] = None):
+    """
+    Build an AzureOpenAIHelper that measures the deployment, not the client.
+
+    It has no retries and a fixed concurrency window, and none of the
+    client-side layers (response and similarity caches, rate limiter, router,
+    hedging) that the environment would otherwise configure.
+
+    Args:
+        config (LoadTestConfig): Workload description; sizes the concurrency window
+        endpoint (str, optional): Azure OpenAI endpoint; defaults to the environment
+
+    Returns:
+        AzureOpenAIHelper: Helper for run_load_test
+    """
+    from src.utils.adaptive_limiter import AdaptiveConcurrencyLimiter
+    from src.utils.azure_openai_utils import AzureOpenAIHelper
+
+    window = config.virtual_users if config.mode == "closed" else 10000
+    return AzureOpenAIHelper(
+        endpoint=endpoint,
+        limiter=AdaptiveConcurrencyLimiter(initial_limit=window, min_limit=window, max_limit=window),
+        max_retries=0,
+        env_layers=False
+    )
+
+
+async def run_load_test(helper, config: LoadTestConfig) -> LoadTestReport:
+    """
+    Drive load against a deployment through an AzureOpenAIHelper.
+
+    The helper should be configured for load testing (see
+    create_load_test_helper), so the numbers reflect the deployment, not the
+    client. Requests are never coalesced.
+
+    Args:
+        helper (AzureOpenAIHelper): Helper used to send streaming completions
+        config (LoadTestConfig): Workload description
+
+    Returns:
+        LoadTestReport: Collected samples
+    """
+    report = LoadTestReport(config)
+    loop = asyncio.get_running_loop()
+    report.started_at = loop.time()
+    report.measure_started_at = report.started_at + config.warmup
+    end_time = report.measure_started_at + config.duration
+    prompt_index = 0
+
+    def next_prompt() -> str:
+        nonlocal prompt_index
+        prompt = config.prompts[prompt_index % len(config.prompts)]
+        prompt_index += 1
+        return prompt
+
+    async def one_request(prompt: str) -> None:
+        start = loop.time()
+        phase = "warmup" if start < report.measure_started_at else "measure"
+        stats: Dict = {}
+        error = None
+
+        async def consume() -> None:
+            async for _ in helper.generate_completion_stream(
+                prompt, max_tokens=config.max_tokens, stats=stats, coalesce=False
+            ):
+                pass
+
+        try:
+            await asyncio.wait_for(consume(), timeout=config.request_timeout)
+        except Exception as e:
+            error = classify_error(e)
+        ttft = stats.get("time_to_first_token")
+        report.record({
+            "phase": phase,
+            "start": start - report.started_at,
+            "latency_ms": (loop.time() - start) * 1000,
+            "ttft_ms": ttft * 1000 if ttft is not None else None,
+            "tokens_per_second": stats.get("tokens_per_second"),
+            "completion_tokens": stats.get("completion_tokens"),
+            "error": error,
+        })
+
+    if config.mode == "closed":
+        async def virtual_user() -> None:
+            while loop.time() < end_time:
+                await one_request(next_prompt())
+
+        await asyncio.gather(*(virtual_user() for _ in range(config.virtual_users)))
+    else:
+        in_flight = set()
+        next_start = loop.time()
+        while next_start < end_time:
+            delay = next_start - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            task = asyncio.ensure_future(one_request(next_prompt()))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+            if config.poisson_arrivals:
+                next_start += random.expovariate(config.target_rps)
+            else:
+                next_start += 1.0 / config.target_rps
+        if in_flight:
+            await asyncio.gather(*in_flight)
+
+    report.finished_at = loop.time()
+    return report
@@ -0,0 +1,297 @@
+"""
+Background JSONL log sink for completion logging.
+
+Callers enqueue entries and return immediately; a writer thread batches them
+into a single open file, flushing on batch size or time, rotating by size or
+day and optionally gzip-compressing rotated segments.
+"""
+
+import os
+import gzip
+import json
+import queue
+import atexit
+import shutil
+import logging
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+_FLUSH = object()
+# Attempts to write a batch to the log file before it is spilled
+_WRITE_ATTEMPTS = 3
+
+
+class CompletionLogSink:
+    def __init__(
+        self,
+        path: str = "logs/completions.jsonl",
+        flush_interval: float = 1.0,
+        max_batch: int = 256,
+        max_bytes: Optional[int] = 50 * 1024 * 1024,
+        rotate_daily: bool = True,
+        compress: bool = True,
+        max_queue: int = 10000
+    ):
+        """
+        Initialize the log sink and start its writer thread.
+
+        Args:
+            path (str): Active log file
+            flush_interval (float): Maximum seconds an entry waits before being written
+            max_batch (int): Number of queued entries that triggers an immediate write
+            max_bytes (int, optional): Rotate once the active file reaches this size
+            rotate_daily (bool): Rotate when the local date changes
+            compress (bool): Gzip rotated segments
+            max_queue (int): Entries buffered; further writes are dropped (and
+                counted) until the writer catches up
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_bytes = max_bytes
+        self.rotate_daily = rotate_daily
+        self.compress = compress
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._file = None
+        self._opened_day: Optional[str] = None
+        self._closed = False
+        # Makes the closed check and enqueueing atomic with close()
+        self._write_lock = threading.Lock()
+        # Counters are updated by the writer thread and by callers
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "written": 0, "batches": 0, "rotations": 0, "errors": 0,
+            "retries": 0, "spilled": 0, "dropped": 0
+        }
+
+        self._thread = threading.Thread(target=self._run, name="completion-log-sink", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def write(self, entry: Dict) -> bool:
+        """
+        Queue an entry for writing without ever blocking the caller.
+
+        Args:
+            entry (Dict): JSON-serializable log entry
+
+        Returns:
+            bool: True if queued; False if the queue was full and the entry was dropped
+        """
+        with self._write_lock:
+            if self._closed:
+                raise RuntimeError("Log sink is closed")
+            try:
+                self._queue.put_nowait(entry)
+            except queue.Full:
+                self._count("dropped")
+                return False
+        return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every queued entry has been written.
+
+        Args:
+            timeout (float, optional): Maximum seconds to wait
+
+        Returns:
+            bool: True if the queue drained in time
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._write_lock:
+            if self._queue.unfinished_tasks and not self._closed:
+                # Wake the writer instead of waiting out its batching interval;
+                # a full queue already makes it write without waiting
+                try:
+                    self._queue.put_nowait(_FLUSH)
+                except queue.Full:
+                    pass
+        while self._queue.unfinished_tasks:
+            if not self._thread.is_alive():
+                return False
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def close(self) -> None:
+        """Write any queued entries, stop the writer thread and close the file."""
+        with self._write_lock:
+            if self._closed:
+                return
+            self._closed = True
+        # Every write that got in before _closed was set is ahead of _STOP
+        self._queue.put(_STOP)
+        self._thread.join()
+        atexit.unregister(self.close)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get sink counters.
+
+        Returns:
+            Dict: Entries 'written', 'batches', 'rotations', failed write
+                attempts ('errors') and 'retries', entries 'spilled' to the
+                fallback file or 'dropped' (queue full or unwritable), and
+                entries still 'queued'
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["queued"] = self._queue.qsize()
+        return stats
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            self._stats[name] += amount
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch: List = []
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is _STOP:
+                    stopping = True
+                    self._queue.task_done()
+                    break
+                if item is _FLUSH:
+                    self._queue.task_done()
+                    break
+                batch.append(item)
+                if len(batch) >= self.max_batch:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+
+            if batch:
+                self._write_batch(batch)
+        self._close_file()
+
+    def _write_batch(self, batch: List[Dict]) -> None:
+        try:
+            lines = []
+            for entry in batch:
+                try:
+                    lines.append(json.dumps(entry) + "\n")
+                except (TypeError, ValueError) as e:
+                    self._count("dropped")
+                    logger.error(f"Dropping log entry that is not JSON-serializable: {str(e)}")
+            if not lines:
+                return
+            data = "".join(lines)
+
+            for attempt in range(_WRITE_ATTEMPTS):
+                try:
+                    self._rotate_if_needed()
+                    if self._file is None:
+                        self._open_file()
+                    self._file.write(data)
+                    self._file.flush()
+                    self._count("written", len(lines))
+                    self._count("batches")
+                    return
+                except Exception as e:
+                    self._count("errors")
+                    logger.warning(
+                        f"Writing {len(lines)} log entries to {self.path} failed "
+                        f"(attempt {attempt + 1} of {_WRITE_ATTEMPTS}): {str(e)}"
+                    )
+                    # Reopen the file on the next attempt
+                    try:
+                        self._close_file()
+                    except Exception:
+                        self._file = None
+                    if attempt + 1 < _WRITE_ATTEMPTS:
+                        self._count("retries")
+                        time.sleep(0.1 * (attempt + 1))
+            self._spill(data, len(lines))
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    def _spill(self, data: str, count: int) -> None:
+        """Append a batch that could not be written to a fallback file in the temp directory."""
+        spill_path = os.path.join(
+            tempfile.gettempdir(), f"{os.path.basename(self.path)}.spill-{os.getpid()}"
+        )
+        try:
+            with open(spill_path, "a") as f:
+                f.write(data)
+            self._count("spilled", count)
+            logger.error(f"Spilled {count} log entries to {spill_path} after repeated write failures")
+        except Exception as e:
+            self._count("dropped", count)
+            logger.error(f"Dropped {count} log entries; writing them to {spill_path} also failed: {str(e)}")
+
+    def _open_file(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, "a")
+        if os.path.getsize(self.path):
+            self._opened_day = datetime.fromtimestamp(os.path.getmtime(self.path)).strftime("%Y-%m-%d")
+        else:
+            self._opened_day = datetime.now().strftime("%Y-%m-%d")
+
+    def _close_file(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _rotate_if_needed(self) -> None:
+        if not os.path.exists(self.path) or not os.path.getsize(self.path):
+            return
+        if self._opened_day is None:
+            self._opened_day = datetime.fromtimestamp(os.path.getmtime(self.path)).strftime("%Y-%m-%d")
+        too_big = self.max_bytes is not None and os.path.getsize(self.path) >= self.max_bytes
+        new_day = self.rotate_daily and datetime.now().strftime("%Y-%m-%d") != self._opened_day
+        if not (too_big or new_day):
+            return
+
+        self._close_file()
+        base, ext = os.path.splitext(self.path)
+        rotated = f"{base}-{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}{ext}"
+        os.replace(self.path, rotated)
+        if self.compress:
+            with open(rotated, "rb") as source, gzip.open(rotated + ".gz", "wb") as target:
+                shutil.copyfileobj(source, target)
+            os.remove(rotated)
+        self._opened_day = None
+        self._count("rotations")
+
+
+_sinks: Dict[str, CompletionLogSink] = {}
+_sinks_lock = threading.Lock()
+
+
+def get_log_sink(path: str = "logs/completions.jsonl") -> CompletionLogSink:
+    """
+    Get the process-wide sink for a log file, creating it on first use.
+
+    Args:
+        path (str): Active log file
+
+    Returns:
+        CompletionLogSink: Shared sink for that file
+    """
+    key = os.path.abspath(path)
+    with _sinks_lock:
+        sink = _sinks.get(key)
+        if sink is None or sink._closed:
+            sink = CompletionLogSink(path)
+            _sinks[key] = sink
+        return sink
@@ -0,0 +1,474 @@
+"""
+Local stand-in for the Azure OpenAI chat completions API.
+
+Serves /openai/deployments/<name>/chat/completions (streaming and not) with
+configurable latency, output rate, error injection and RPM/TPM quotas, so
+clients can be benchmarked offline and repeatably:
+
+    python -m src.utils.mock_openai_server --port 8000 --latency lognormal:300,0.4
+    AZURE_OPENAI_ENDPOINT=http://localhost:8000 python exercises/...
+"""
+
+import re
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+from src.utils.prompt_serializers import CHARS_PER_TOKEN, count_tokens
+from src.utils.rate_limiter import TokenBucketRateLimiter
+
+_CHAT_PATH = re.compile(r"^/openai/deployments/([^/]+)/chat/completions$")
+_MODELS_PATH = re.compile(r"^/openai/(models|deployments)$")
+
+# Azure OpenAI caches prompts of at least 1024 tokens in 128-token increments
+PROMPT_CACHE_MIN_TOKENS = 1024
+PROMPT_CACHE_BLOCK_TOKENS = 128
+
+_WORDS = (
+    "sales revenue grew across the enterprise segment while small business orders "
+    "stayed flat and the average deal size increased compared with last quarter"
+).split()
+
+
+class LatencyDistribution:
+    def __init__(self, spec: str = "fixed:0"):
+        """
+        Parse a latency distribution specification.
+
+        Args:
+            spec (str): "fixed:<ms>", "uniform:<low_ms>,<high_ms>",
+                "normal:<mean_ms>,<stddev_ms>" or "lognormal:<median_ms>,<sigma>"
+        """
+        kind, _, params = spec.partition(":")
+        self.kind = kind.strip().lower()
+        self.params = [float(p) for p in params.split(",") if p.strip()] if params else []
+        expected = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+        if self.kind not in expected or len(self.params) != expected[self.kind]:
+            raise ValueError(f"Invalid latency distribution: {spec!r}")
+        self.spec = spec
+
+    def sample(self, rng: random.Random) -> float:
+        """Draw one latency in seconds (never negative)."""
+        if self.kind == "fixed":
+            ms = self.params[0]
+        elif self.kind == "uniform":
+            ms = rng.uniform(*self.params)
+        elif self.kind == "normal":
+            ms = rng.gauss(*self.params)
+        else:
+            median, sigma = self.params
+            ms = median * rng.lognormvariate(0.0, sigma)
+        return max(0.0, ms) / 1000
+
+
+class MockServerConfig:
+    def __init__(
+        self,
+        latency: str = "lognormal:300,0.3",
+        tokens_per_second: float = 50.0,
+        completion_tokens: int = 100,
+        error_rate_429: float = 0.0,
+        error_rate_500: float = 0.0,
+        retry_after_ms: int = 1000,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        max_concurrency: Optional[int] = None,
+        api_key: Optional[str] = None,
+        seed: Optional[int] = None,
+        prompt_caching: bool = True
+    ):
+        """
+        Describe how the mock server behaves.
+
+        Args:
+            latency (str): Distribution of the delay before the first token
+                (see LatencyDistribution)
+            tokens_per_second (float): Output rate after the first token; 0 sends
+                everything at once
+            completion_tokens (int): Tokens generated per response, capped by max_tokens
+            error_rate_429 (float): Fraction of requests randomly rejected with 429
+            error_rate_500 (float): Fraction of requests randomly failed with 500
+            retry_after_ms (int): retry-after-ms sent with injected 429s
+            requests_per_minute (float, optional): RPM quota enforced with 429s
+            tokens_per_minute (float, optional): TPM quota enforced with 429s
+            max_concurrency (int, optional): In-flight requests beyond which 429 is returned
+            api_key (str, optional): Required api-key header; None accepts any key
+            seed (int, optional): Seed for repeatable latency and error sequences
+            prompt_caching (bool): Report usage.prompt_tokens_details.cached_tokens
+                for prompt prefixes seen before, as the service does
+        """
+        self.latency = LatencyDistribution(latency)
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+        self.error_rate_429 = error_rate_429
+        self.error_rate_500 = error_rate_500
+        self.retry_after_ms = retry_after_ms
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_concurrency = max_concurrency
+        self.api_key = api_key
+        self.seed = seed
+        self.prompt_caching = prompt_caching
+
+
+class MockOpenAIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], config: Optional[MockServerConfig] = None):
+        """
+        Create the server; call serve_forever() or use start_mock_server().
+
+        Args:
+            address (Tuple[str, int]): Host and port; port 0 picks a free port
+            config (MockServerConfig, optional): Behavior; defaults to MockServerConfig()
+        """
+        super().__init__(address, _MockRequestHandler)
+        self.config = config or MockServerConfig()
+        self.rng = random.Random(self.config.seed)
+        self.quota = None
+        if self.config.requests_per_minute or self.config.tokens_per_minute:
+            self.quota = TokenBucketRateLimiter(
+                requests_per_minute=self.config.requests_per_minute,
+                tokens_per_minute=self.config.tokens_per_minute
+            )
+        self._lock = threading.Lock()
+        self._prefixes: "OrderedDict[bytes, None]" = OrderedDict()
+        self._in_flight = 0
+        self._stats = {"requests": 0, "completed": 0, "throttled": 0, "errors": 0, "streamed": 0}
+
+    def handle_error(self, request, client_address) -> None:
+        # Clients that cancel (timeouts, hedged requests) drop the connection mid-response
+        if isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            return
+        super().handle_error(request, client_address)
+
+    @property
+    def endpoint(self) -> str:
+        """Base URL to use as AZURE_OPENAI_ENDPOINT."""
+        host, port = self.server_address[:2]
+        return f"http://{'localhost' if host in ('0.0.0.0', '127.0.0.1') else host}:{port}"
+
+    def stats(self) -> Dict[str, int]:
+        """Return request, completion, throttle, error and stream counters."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = self._in_flight
+        return stats
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def _enter(self) -> bool:
+        """Track a new request; False if it exceeds max_concurrency."""
+        with self._lock:
+            self._stats["requests"] += 1
+            limit = self.config.max_concurrency
+            if limit is not None and self._in_flight >= limit:
+                return False
+            self._in_flight += 1
+            return True
+
+    def _exit(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    def _cached_tokens(self, text: str, prompt_tokens: int) -> int:
+        """Tokens of the longest previously seen prefix, in whole cache blocks."""
+        if not self.config.prompt_caching or prompt_tokens < PROMPT_CACHE_MIN_TOKENS:
+            return 0
+        # Blocks are cut at fixed character offsets so equal prefixes hash equally
+        block_chars = PROMPT_CACHE_BLOCK_TOKENS * CHARS_PER_TOKEN
+        blocks = min(prompt_tokens // PROMPT_CACHE_BLOCK_TOKENS, len(text) // block_chars)
+        digest = hashlib.sha1()
+        prefixes = []
+        for block in range(blocks):
+            digest.update(text[block * block_chars:(block + 1) * block_chars].encode("utf-8"))
+            prefixes.append(digest.digest())
+
+        min_blocks = PROMPT_CACHE_MIN_TOKENS // PROMPT_CACHE_BLOCK_TOKENS
+        cached_blocks = 0
+        with self._lock:
+            for block in range(blocks - 1, min_blocks - 2, -1):
+                if prefixes[block] in self._prefixes:
+                    cached_blocks = block + 1
+                    break
+            for prefix in prefixes:
+                self._prefixes[prefix] = None
+                self._prefixes.move_to_end(prefix)
+            while len(self._prefixes) > 100000:
+                self._prefixes.popitem(last=False)
+        return cached_blocks * PROMPT_CACHE_BLOCK_TOKENS
+
+    def _random(self) -> float:
+        with self._lock:
+            return self.rng.random()
+
+    def _latency(self) -> float:
+        with self._lock:
+            return self.config.latency.sample(self.rng)
+
+
+class _MockRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: MockOpenAIServer
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        path = self.path.split("?", 1)[0]
+        if not _MODELS_PATH.match(path):
+            self._send_error(404, "NotFound", f"Unknown path: {path}")
+            return
+        if not self._authorized():
+            return
+        self._send_json(200, {"object": "list", "data": [{"id": "mock", "object": "model"}]})
+
+    def do_POST(self) -> None:
+        server = self.server
+        config = server.config
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+        match = _CHAT_PATH.match(self.path.split("?", 1)[0])
+        if not match:
+            self._send_error(404, "NotFound", f"Unknown path: {self.path}")
+            return
+        if not self._authorized():
+            return
+        try:
+            request = json.loads(body)
+            messages = request["messages"]
+        except (ValueError, KeyError, TypeError):
+            self._send_error(400, "BadRequest", "Request body must be JSON with 'messages'")
+            return
+
+        if not server._enter():
+            server._count("throttled")
+            self._send_throttled("Concurrency limit exceeded", config.retry_after_ms)
+            return
+        try:
+            self._complete(match.group(1), request, messages)
+        finally:
+            server._exit()
+
+    def _complete(self, deployment: str, request: Dict, messages: List[Dict]) -> None:
+        server = self.server
+        config = server.config
+
+        prompt_tokens = sum(count_tokens(str(m.get("content") or "")) for m in messages)
+        max_tokens = request.get("max_tokens") or config.completion_tokens
+        completion_tokens = max(1, min(config.completion_tokens, max_tokens))
+        finish_reason = "length" if config.completion_tokens > max_tokens else "stop"
+
+        headers = {}
+        if server.quota is not None:
+            wait = server.quota.try_acquire(prompt_tokens + completion_tokens)
+            remaining = server.quota.remaining()
+            if "requests" in remaining:
+                headers["x-ratelimit-remaining-requests"] = str(int(remaining["requests"]))
+            if "tokens" in remaining:
+                headers["x-ratelimit-remaining-tokens"] = str(int(remaining["tokens"]))
+            if wait > 0:
+                server._count("throttled")
+                self._send_throttled("Rate limit exceeded", int(wait * 1000) + 1, headers)
+                return
+
+        roll = server._random()
+        if roll < config.error_rate_429:
+            server._count("throttled")
+            self._send_throttled("Injected rate limit", config.retry_after_ms, headers)
+            return
+        if roll < config.error_rate_429 + config.error_rate_500:
+            server._count("errors")
+            self._send_error(500, "InternalServerError", "Injected server error", headers)
+            return
+
+        cached_tokens = server._cached_tokens(
+            "\n".join(str(m.get("content") or "") for m in messages), prompt_tokens
+        )
+        time.sleep(server._latency())
+        tokens = [(" " if i else "") + _WORDS[i % len(_WORDS)] for i in range(completion_tokens)]
+        response_id = f"chatcmpl-mock-{int(time.time() * 1000)}"
+        model = request.get("model") or deployment
+
+        if request.get("stream"):
+            self._stream(response_id, model, tokens, finish_reason, headers)
+            server._count("streamed")
+        else:
+            if config.tokens_per_second > 0:
+                time.sleep((completion_tokens - 1) / config.tokens_per_second)
+            self._send_json(200, {
+                "id": response_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "".join(tokens)},
+                    "finish_reason": finish_reason
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                    "prompt_tokens_details": {"cached_tokens": cached_tokens}
+                }
+            }, headers)
+        server._count("completed")
+
+    def _stream(
+        self,
+        response_id: str,
+        model: str,
+        tokens: List[str],
+        finish_reason: str,
+        headers: Dict[str, str]
+    ) -> None:
+        config = self.server.config
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+
+        def chunk(delta: Dict, finish_reason: Optional[str] = None) -> Dict:
+            return {
+                "id": response_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+            }
+
+        self._write_event(json.dumps(chunk({"role": "assistant", "content": ""})))
+        interval = 1.0 / config.tokens_per_second if config.tokens_per_second > 0 else 0.0
+        next_at = time.monotonic()
+        for token in tokens:
+            # Pace against a schedule so per-chunk overhead doesn't lower the rate
+            delay = next_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self._write_event(json.dumps(chunk({"content": token})))
+            next_at += interval
+        self._write_event(json.dumps(chunk({}, finish_reason)))
+        self._write_event("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _write_event(self, data: str) -> None:
+        payload = f"data: {data}\n\n".encode("utf-8")
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(payload), payload))
+        self.wfile.flush()
+
+    def _authorized(self) -> bool:
+        expected = self.server.config.api_key
+        if expected is None:
+            return True
+        provided = self.headers.get("api-key") or self.headers.get("Authorization", "").replace("Bearer ", "")
+        if provided == expected:
+            return True
+        self._send_error(401, "Unauthorized", "Access denied due to invalid subscription key")
+        return False
+
+    def _send_throttled(self, message: str, retry_after_ms: int, headers: Optional[Dict[str, str]] = None) -> None:
+        headers = dict(headers or {})
+        headers["retry-after-ms"] = str(retry_after_ms)
+        headers["retry-after"] = str(max(1, -(-retry_after_ms // 1000)))
+        self._send_error(429, "429", message, headers)
+
+    def _send_error(self, status: int, code: str, message: str, headers: Optional[Dict[str, str]] = None) -> None:
+        self._send_json(status, {"error": {"code": code, "message": message}}, headers)
+
+    def _send_json(self, status: int, payload: Dict, headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_mock_server(
+    config: Optional[MockServerConfig] = None,
+    host: str = "127.0.0.1",
+    port: int = 0
+) -> MockOpenAIServer:
+    """
+    Start the mock server on a background thread.
+
+    Args:
+        config (MockServerConfig, optional): Behavior; defaults to MockServerConfig()
+        host (str): Interface to bind
+        port (int): Port to bind; 0 picks a free port
+
+    Returns:
+        MockOpenAIServer: Running server; use .endpoint as AZURE_OPENAI_ENDPOINT
+            and .shutdown() to stop it
+    """
+    server = MockOpenAIServer((host, port), config)
+    thread = threading.Thread(target=server.serve_forever, name="mock-openai-server", daemon=True)
+    thread.start()
+    return server
+
+
+def main():
+    """Run the mock server in the foreground."""
+    parser = argparse.ArgumentParser(description="Local mock Azure OpenAI chat completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", default="lognormal:300,0.3",
+                        help="fixed:MS | uniform:LOW,HIGH | normal:MEAN,STDDEV | lognormal:MEDIAN,SIGMA")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--completion-tokens", type=int, default=100)
+    parser.add_argument("--error-rate-429", type=float, default=0.0)
+    parser.add_argument("--error-rate-500", type=float, default=0.0)
+    parser.add_argument("--retry-after-ms", type=int, default=1000)
+    parser.add_argument("--rpm", type=float, default=None, help="Requests-per-minute quota")
+    parser.add_argument("--tpm", type=float, default=None, help="Tokens-per-minute quota")
+    parser.add_argument("--max-concurrency", type=int, default=None)
+    parser.add_argument("--api-key", default=None, help="Require this api-key header")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--no-prompt-caching", action="store_true",
+                        help="Never report cached prompt tokens")
+    args = parser.parse_args()
+
+    config = MockServerConfig(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens,
+        error_rate_429=args.error_rate_429,
+        error_rate_500=args.error_rate_500,
+        retry_after_ms=args.retry_after_ms,
+        requests_per_minute=args.rpm,
+        tokens_per_minute=args.tpm,
+        max_concurrency=args.max_concurrency,
+        api_key=args.api_key,
+        seed=args.seed,
+        prompt_caching=not args.no_prompt_caching
+    )
+    server = MockOpenAIServer((args.host, args.port), config)
+    print(f"Mock Azure OpenAI server listening on {server.endpoint}")
+    print(f"Set AZURE_OPENAI_ENDPOINT={server.endpoint} to use it")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(server.stats()))
+
+
+if __name__ == "__main__":
+    main()
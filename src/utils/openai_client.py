@@ -0,0 +1,168 @@
+"""
+Shared, pooled async Azure OpenAI clients.
+
+Clients are created lazily on first use and shared by every helper that
+talks to the same endpoint with the same settings, so HTTP keep-alive
+connections (and their TLS sessions) are reused across calls. Because
+connection pools belong to an event loop, clients are cached per loop.
+
+The openai and httpx SDKs, and the .env file, are only loaded when first
+needed, so importing this module (and the helpers built on it) stays cheap.
+"""
+
+import os
+import asyncio
+import weakref
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+if TYPE_CHECKING:
+    from openai import AsyncAzureOpenAI
+
+DEFAULT_API_VERSION = "2023-05-15"
+
+_env_loaded = False
+
+
+def load_environment() -> None:
+    """Load variables from a .env file into the environment, once per process."""
+    global _env_loaded
+    if _env_loaded:
+        return
+    from dotenv import load_dotenv
+    load_dotenv()
+    _env_loaded = True
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+class ClientSettings:
+    __slots__ = (
+        "endpoint",
+        "api_key",
+        "api_version",
+        "max_connections",
+        "max_keepalive_connections",
+        "keepalive_expiry",
+        "connect_timeout",
+        "read_timeout",
+        "max_retries",
+    )
+
+    def __init__(
+        self,
+        endpoint: Optional[str] = None,
+        api_key: Optional[str] = None,
+        api_version: Optional[str] = None,
+        max_connections: Optional[int] = None,
+        max_keepalive_connections: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+        connect_timeout: Optional[float] = None,
+        read_timeout: Optional[float] = None,
+        max_retries: Optional[int] = None
+    ):
+        """
+        Collect client settings, falling back to environment variables.
+
+        Args:
+            endpoint (str, optional): Azure OpenAI endpoint (AZURE_OPENAI_ENDPOINT)
+            api_key (str, optional): API key (AZURE_OPENAI_API_KEY)
+            api_version (str, optional): API version (AZURE_OPENAI_API_VERSION)
+            max_connections (int, optional): Pool size (AZURE_OPENAI_MAX_CONNECTIONS, default 20)
+            max_keepalive_connections (int, optional): Idle connections kept open
+                (AZURE_OPENAI_MAX_KEEPALIVE, default 10)
+            keepalive_expiry (float, optional): Seconds an idle connection is kept
+                (AZURE_OPENAI_KEEPALIVE_EXPIRY, default 60)
+            connect_timeout (float, optional): Connect timeout in seconds
+                (AZURE_OPENAI_CONNECT_TIMEOUT, default 10)
+            read_timeout (float, optional): Read timeout in seconds
+                (AZURE_OPENAI_READ_TIMEOUT, default 120)
+            max_retries (int, optional): SDK-level retries (AZURE_OPENAI_MAX_RETRIES, default 0;
+                AzureOpenAIHelper retries throttled and transient failures itself)
+        """
+        load_environment()
+        self.endpoint = endpoint or os.getenv("AZURE_OPENAI_ENDPOINT")
+        self.api_key = api_key or os.getenv("AZURE_OPENAI_API_KEY")
+        self.api_version = api_version or os.getenv("AZURE_OPENAI_API_VERSION", DEFAULT_API_VERSION)
+        self.max_connections = max_connections or _env_int("AZURE_OPENAI_MAX_CONNECTIONS", 20)
+        self.max_keepalive_connections = (
+            max_keepalive_connections or _env_int("AZURE_OPENAI_MAX_KEEPALIVE", 10)
+        )
+        self.keepalive_expiry = keepalive_expiry or _env_float("AZURE_OPENAI_KEEPALIVE_EXPIRY", 60.0)
+        self.connect_timeout = connect_timeout or _env_float("AZURE_OPENAI_CONNECT_TIMEOUT", 10.0)
+        self.read_timeout = read_timeout or _env_float("AZURE_OPENAI_READ_TIMEOUT", 120.0)
+        self.max_retries = max_retries if max_retries is not None else _env_int("AZURE_OPENAI_MAX_RETRIES", 0)
+
+    def key(self) -> Tuple:
+        """Return a hashable key identifying clients that can be shared."""
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+
+# Event loop -> settings key -> client
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple, 'AsyncAzureOpenAI']]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def create_async_client(settings: ClientSettings) -> "AsyncAzureOpenAI":
+    """
+    Create a new async Azure OpenAI client with its own connection pool.
+
+    Args:
+        settings (ClientSettings): Endpoint, credentials, pool limits and timeouts
+
+    Returns:
+        AsyncAzureOpenAI: Client backed by a keep-alive httpx connection pool
+    """
+    import httpx
+    from openai import AsyncAzureOpenAI
+
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=settings.max_connections,
+            max_keepalive_connections=settings.max_keepalive_connections,
+            keepalive_expiry=settings.keepalive_expiry,
+        ),
+        timeout=httpx.Timeout(settings.read_timeout, connect=settings.connect_timeout),
+    )
+    return AsyncAzureOpenAI(
+        azure_endpoint=settings.endpoint,
+        api_key=settings.api_key,
+        api_version=settings.api_version,
+        max_retries=settings.max_retries,
+        http_client=http_client,
+    )
+
+
+def get_async_client(settings: ClientSettings) -> "AsyncAzureOpenAI":
+    """
+    Get the shared client for these settings on the running event loop.
+
+    Args:
+        settings (ClientSettings): Endpoint, credentials, pool limits and timeouts
+
+    Returns:
+        AsyncAzureOpenAI: Shared client, created on first use
+    """
+    loop = asyncio.get_running_loop()
+    loop_clients = _clients.setdefault(loop, {})
+    key = settings.key()
+    client = loop_clients.get(key)
+    if client is None:
+        client = create_async_client(settings)
+        loop_clients[key] = client
+    return client
+
+
+async def close_async_clients() -> None:
+    """Close every shared client created on the running event loop."""
+    loop_clients = _clients.pop(asyncio.get_running_loop(), {})
+    for client in loop_clients.values():
+        await client.close()
@@ -0,0 +1,342 @@
+"""
+Token-efficient serializers for embedding sales data in prompts.
+
+Pretty-printed JSON is mostly whitespace and repeats nested customer and
+product objects on every record. These serializers trade that for compact
+tables while keeping every value, and report token counts so callers can
+pick the smallest faithful format.
+"""
+
+import io
+import csv
+import json
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Characters per token for English/JSON text when tiktoken is unavailable
+CHARS_PER_TOKEN = 4
+
+RECORDS_KEY = "sales_records"
+RECORD_ID_KEY = "transaction_id"
+
+# Table cell for a None value; a missing key is rendered as an empty cell
+NULL_CELL = "null"
+
+
+@lru_cache(maxsize=1)
+def _load_tiktoken():
+    # Imported on first use: tiktoken is optional and slow to import
+    try:
+        import tiktoken
+    except ImportError:  # Token counts fall back to a character-based estimate
+        return None
+    return tiktoken
+
+
+def count_tokens(text: str, model: str = "gpt-4") -> int:
+    """
+    Count (or estimate) the number of tokens in a piece of text.
+
+    Args:
+        text (str): Text to measure
+        model (str): Model whose tokenizer to use when tiktoken is installed
+
+    Returns:
+        int: Token count, estimated from length if tiktoken is not installed
+    """
+    tiktoken = _load_tiktoken()
+    if tiktoken is not None:
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding("cl100k_base")
+        return len(encoding.encode(text))
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _flatten_record(record: Dict) -> Tuple[Dict, Dict[str, List[Dict]]]:
+    """Split a record into flat dotted columns and child tables (lists)."""
+    flat: Dict = {}
+    children: Dict[str, List[Dict]] = {}
+    for key, value in record.items():
+        if isinstance(value, dict):
+            for sub_key, sub_value in value.items():
+                flat[f"{key}.{sub_key}"] = sub_value
+        elif isinstance(value, list):
+            children[key] = [item if isinstance(item, dict) else {"value": item} for item in value]
+        else:
+            flat[key] = value
+    return flat, children
+
+
+def _is_scalar(value) -> bool:
+    return value is None or isinstance(value, (str, int, float, bool))
+
+
+def _render_table(rows: List[Dict], delimiter: str) -> str:
+    """
+    Render rows as a delimited table whose header is the union of their keys.
+
+    None is written as NULL_CELL and a key missing from a row as an empty cell.
+    """
+    columns: List[str] = []
+    for row in rows:
+        for key in row:
+            if key not in columns:
+                columns.append(key)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=delimiter, lineterminator="\n")
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow([
+            "" if column not in row else NULL_CELL if row[column] is None else row[column]
+            for column in columns
+        ])
+    return buffer.getvalue()
+
+
+def _render_sections(sales_data: Dict, sections: List[Tuple[str, List[Dict]]], delimiter: str) -> str:
+    """Render other top-level keys as minified JSON followed by titled tables."""
+    parts = []
+    for key, value in sales_data.items():
+        if key != RECORDS_KEY:
+            parts.append(f"{key}: {json.dumps(value, separators=(',', ':'))}\n")
+    for title, rows in sections:
+        if rows:
+            parts.append(f"{title}:\n{_render_table(rows, delimiter)}")
+    return "\n".join(parts)
+
+
+def _child_sections(children_by_name: Dict[str, List[Dict]]) -> List[Tuple[str, List[Dict]]]:
+    return [
+        (f"{name} (by {RECORD_ID_KEY})", rows)
+        for name, rows in children_by_name.items()
+    ]
+
+
+def _split_records(records: List[Dict], entity_keys: Tuple[str, ...] = ()) -> Tuple[
+    List[Dict], Dict[str, List[Dict]], Dict[str, Dict[str, Dict]]
+]:
+    """
+    Split records into fact rows, child rows and (optionally) entity tables.
+
+    Nested objects named in entity_keys are replaced by an '<key>_id' reference
+    and collected once per id.
+    """
+    facts: List[Dict] = []
+    children_by_name: Dict[str, List[Dict]] = {}
+    entities: Dict[str, Dict[str, Dict]] = {key: {} for key in entity_keys}
+
+    for record in records:
+        record = dict(record)
+        for key in entity_keys:
+            entity = record.pop(key, None)
+            if isinstance(entity, dict):
+                entities[key].setdefault(entity.get("id"), entity)
+                record[f"{key}_id"] = entity.get("id")
+        flat, children = _flatten_record(record)
+        facts.append(flat)
+        for name, rows in children.items():
+            bucket = children_by_name.setdefault(name, [])
+            for row in rows:
+                bucket.append({RECORD_ID_KEY: flat.get(RECORD_ID_KEY), **row})
+    return facts, children_by_name, entities
+
+
+def serialize_pretty(sales_data: Dict) -> str:
+    """Serialize as indented JSON (the original prompt format)."""
+    return json.dumps(sales_data, indent=2)
+
+
+def serialize_minified(sales_data: Dict) -> str:
+    """Serialize as JSON without insignificant whitespace."""
+    return json.dumps(sales_data, separators=(",", ":"))
+
+
+def _serialize_table(sales_data: Dict, delimiter: str) -> str:
+    facts, children, _ = _split_records(sales_data.get(RECORDS_KEY, []))
+    return _render_sections(sales_data, [(RECORDS_KEY, facts)] + _child_sections(children), delimiter)
+
+
+def serialize_csv(sales_data: Dict) -> str:
+    """Serialize records as comma-separated tables, nested lists as child tables."""
+    return _serialize_table(sales_data, ",")
+
+
+def serialize_tsv(sales_data: Dict) -> str:
+    """Serialize records as tab-separated tables, nested lists as child tables."""
+    return _serialize_table(sales_data, "\t")
+
+
+def serialize_normalized(sales_data: Dict) -> str:
+    """Serialize as customer/product reference tables plus fact rows."""
+    facts, children, entities = _split_records(
+        sales_data.get(RECORDS_KEY, []), entity_keys=("customer", "product")
+    )
+    sections = [(f"{key}s", list(table.values())) for key, table in entities.items()]
+    sections.append((RECORDS_KEY, facts))
+    sections.extend(_child_sections(children))
+    return _render_sections(sales_data, sections, "\t")
+
+
+def _is_ambiguous_text(value: str) -> bool:
+    """True for strings a table cell can't tell apart from a missing, None, bool or number value."""
+    if value in ("", NULL_CELL, "True", "False"):
+        return True
+    try:
+        float(value)
+    except ValueError:
+        return False
+    return True
+
+
+def _columns_are_faithful(rows: List[Dict]) -> bool:
+    """Cells are unambiguous when each column holds one type and no ambiguous strings."""
+    types: Dict[str, set] = {}
+    for row in rows:
+        for column, value in row.items():
+            if not _is_scalar(value):
+                return False
+            if value is None:
+                continue
+            if isinstance(value, str) and _is_ambiguous_text(value):
+                return False
+            types.setdefault(column, set()).add(type(value))
+    return all(len(column_types) == 1 for column_types in types.values())
+
+
+def _tables_are_faithful(sales_data: Dict) -> bool:
+    """
+    Tables are lossless when records nest at most one level of objects/lists of
+    flat objects, and every column's text reads back as a single type.
+    """
+    facts: List[Dict] = []
+    children_by_name: Dict[str, List[Dict]] = {}
+    for record in sales_data.get(RECORDS_KEY, []):
+        flat, children = _flatten_record(record)
+        facts.append(flat)
+        for name, rows in children.items():
+            children_by_name.setdefault(name, []).extend(rows)
+    return _columns_are_faithful(facts) and all(
+        _columns_are_faithful(rows) for rows in children_by_name.values()
+    )
+
+
+def _normalized_is_faithful(sales_data: Dict) -> bool:
+    """Normalization is lossless when every customer/product id always maps to the same object."""
+    if not _tables_are_faithful(sales_data):
+        return False
+    seen: Dict[Tuple[str, object], Dict] = {}
+    for record in sales_data.get(RECORDS_KEY, []):
+        for key in ("customer", "product"):
+            entity = record.get(key)
+            if not isinstance(entity, dict):
+                continue
+            if entity.get("id") is None:
+                return False
+            if seen.setdefault((key, entity["id"]), entity) != entity:
+                return False
+    return True
+
+
+def _always_faithful(sales_data: Dict) -> bool:
+    return True
+
+
+SERIALIZERS: Dict[str, Tuple[Callable[[Dict], str], Callable[[Dict], bool]]] = {
+    "pretty": (serialize_pretty, _always_faithful),
+    "minified": (serialize_minified, _always_faithful),
+    "csv": (serialize_csv, _tables_are_faithful),
+    "tsv": (serialize_tsv, _tables_are_faithful),
+    "normalized": (serialize_normalized, _normalized_is_faithful),
+}
+
+
+def register_serializer(
+    name: str,
+    serializer: Callable[[Dict], str],
+    is_faithful: Optional[Callable[[Dict], bool]] = None
+) -> None:
+    """
+    Register an additional prompt serializer.
+
+    Args:
+        name (str): Mode name used to select the serializer
+        serializer (Callable): Function turning sales data into prompt text
+        is_faithful (Callable, optional): Returns True if the serializer keeps
+            every value of the given data; assumed lossless if omitted
+    """
+    SERIALIZERS[name] = (serializer, is_faithful or _always_faithful)
+
+
+def serialize_sales_data(sales_data: Dict, mode: str = "pretty") -> str:
+    """
+    Serialize sales data for a prompt.
+
+    Args:
+        sales_data (Dict): Sales data as returned by load_sales_data
+        mode (str): Serializer name, see SERIALIZERS
+
+    Returns:
+        str: Serialized data
+    """
+    if mode not in SERIALIZERS:
+        raise ValueError(f"Unknown serialization mode: {mode}")
+    return SERIALIZERS[mode][0](sales_data)
+
+
+def compare_serializations(
+    sales_data: Dict,
+    modes: Optional[List[str]] = None,
+    model: str = "gpt-4"
+) -> Dict[str, Dict]:
+    """
+    Report the size of each serialization mode.
+
+    Args:
+        sales_data (Dict): Sales data as returned by load_sales_data
+        modes (List[str], optional): Modes to compare; defaults to all registered
+        model (str): Model whose tokenizer to count with
+
+    Returns:
+        Dict: Per mode, 'tokens', 'characters' and 'faithful'
+    """
+    report = {}
+    for mode in modes or list(SERIALIZERS):
+        text = serialize_sales_data(sales_data, mode)
+        report[mode] = {
+            "tokens": count_tokens(text, model),
+            "characters": len(text),
+            "faithful": SERIALIZERS[mode][1](sales_data),
+        }
+    return report
+
+
+def select_serialization(
+    sales_data: Dict,
+    modes: Optional[List[str]] = None,
+    model: str = "gpt-4"
+) -> Tuple[str, str]:
+    """
+    Pick the faithful serialization with the fewest tokens.
+
+    Args:
+        sales_data (Dict): Sales data as returned by load_sales_data
+        modes (List[str], optional): Candidate modes; defaults to all registered
+        model (str): Model whose tokenizer to count with
+
+    Returns:
+        Tuple[str, str]: Chosen mode and the serialized text
+    """
+    best: Optional[Tuple[int, str, str]] = None
+    for mode in modes or list(SERIALIZERS):
+        serializer, is_faithful = SERIALIZERS[mode]
+        if not is_faithful(sales_data):
+            continue
+        text = serializer(sales_data)
+        tokens = count_tokens(text, model)
+        if best is None or tokens < best[0]:
+            best = (tokens, mode, text)
+    if best is None:
+        return "pretty", serialize_pretty(sales_data)
+    return best[1], best[2]
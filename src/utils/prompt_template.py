@@ -0,0 +1,169 @@
+"""
+Prefix-stable prompt templates.
+
+Azure OpenAI can reuse the computation for a prompt prefix it has seen
+recently, but only if the prefix is byte-identical. Templates that embed
+{sales_data} in the middle defeat this: everything after the data changes
+with it. PromptTemplate compiles a template once, moves every placeholder
+(with its "Label:" line) behind the static instructions and few-shot
+examples, and renders with a single join.
+"""
+
+import json
+import string
+import textwrap
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from src.utils.prompt_serializers import count_tokens
+
+DEFAULT_INSTRUCTION = "Now, please provide your response:"
+DATA_INSTRUCTION = "Now, please provide your response using the data below."
+
+_formatter = string.Formatter()
+
+
+def _escape(text: str) -> str:
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+class PromptTemplate:
+    def __init__(
+        self,
+        template: str,
+        examples: Optional[Sequence[Dict[str, str]]] = None,
+        instruction: Optional[str] = None
+    ):
+        """
+        Compile a template into a static prefix and data fields.
+
+        Args:
+            template (str): Template with str.format placeholders such as {sales_data}
+            examples (Sequence[Dict], optional): Few-shot examples with 'input' and
+                'output' keys, placed after the instructions
+            instruction (str, optional): Closing instruction placed after the examples
+                and before the data; "" for none. Defaults to DATA_INSTRUCTION, or
+                DEFAULT_INSTRUCTION for templates without placeholders.
+        """
+        self.template = template
+        self.examples = list(examples or [])
+        self.instruction = instruction
+
+        static_parts, self.fields = self._split(textwrap.dedent(template).strip())
+        if self.examples:
+            lines = ["Examples:"]
+            for i, example in enumerate(self.examples, 1):
+                lines.append(f"\nExample {i}:\nInput: {example['input']}\nOutput: {example['output']}")
+            static_parts.append("\n".join(lines))
+        if instruction is None:
+            instruction = DATA_INSTRUCTION if self.fields else DEFAULT_INSTRUCTION
+        if instruction:
+            static_parts.append(instruction)
+        self.static_prefix = "\n\n".join(part for part in static_parts if part)
+
+    @staticmethod
+    def _split(text: str) -> Tuple[List[str], List[Tuple[str, str]]]:
+        """Separate literal text from placeholders, keeping each placeholder's label line."""
+        literals: List[str] = []
+        fields: List[Tuple[str, str]] = []
+        for literal, field, format_spec, conversion in _formatter.parse(text):
+            label = ""
+            if field is not None:
+                if format_spec or conversion:
+                    raise ValueError(f"Placeholder {{{field}}} may not use a format spec or conversion")
+                if not field.isidentifier():
+                    raise ValueError(f"Placeholder {{{field}}} must be a plain name")
+                # A trailing "Sales Data:" line describes the data, so it moves with it
+                head, _, last_line = literal.rstrip().rpartition("\n")
+                if last_line.strip().endswith(":"):
+                    literal, label = head, last_line.strip()
+                fields.append((label, field))
+            literals.append(literal)
+        static = "".join(literals)
+        # Collapse the blank lines left behind by removed placeholders
+        paragraphs = [p.strip("\n") for p in static.split("\n\n")]
+        return ["\n\n".join(p for p in paragraphs if p.strip())], fields
+
+    @property
+    def field_names(self) -> List[str]:
+        """Names of the placeholders, in render order."""
+        return [name for _, name in self.fields]
+
+    def render(self, **values: Any) -> str:
+        """
+        Render the prompt: static prefix first, then each data field.
+
+        Args:
+            **values: A value for every placeholder
+
+        Returns:
+            str: Prompt text
+        """
+        missing = [name for name in self.field_names if name not in values]
+        if missing:
+            raise KeyError(f"Missing template values: {', '.join(missing)}")
+        parts = [self.static_prefix]
+        for label, name in self.fields:
+            value = str(values[name])
+            parts.append(f"{label}\n{value}" if label else value)
+        return "\n\n".join(parts)
+
+    def to_format_string(self) -> str:
+        """
+        Return the reordered template as a str.format string.
+
+        Literal braces in the static text and examples are escaped, so the
+        result can be filled with str.format(**values).
+        """
+        parts = [_escape(self.static_prefix)]
+        for label, name in self.fields:
+            placeholder = "{" + name + "}"
+            parts.append(f"{_escape(label)}\n{placeholder}" if label else placeholder)
+        return "\n\n".join(parts)
+
+    def prefix_tokens(self, model: str = "gpt-4") -> int:
+        """Tokens in the static prefix, i.e. the part that can be served from the prompt cache."""
+        return count_tokens(self.static_prefix, model)
+
+
+@lru_cache(maxsize=256)
+def _compile(template: str, examples_json: str, instruction: Optional[str]) -> PromptTemplate:
+    return PromptTemplate(template, json.loads(examples_json), instruction)
+
+
+def compile_template(
+    template: str,
+    examples: Optional[Sequence[Dict[str, str]]] = None,
+    instruction: Optional[str] = None
+) -> PromptTemplate:
+    """
+    Get the compiled form of a template, compiling it only the first time.
+
+    Args:
+        template (str): Template with str.format placeholders
+        examples (Sequence[Dict], optional): Few-shot examples
+        instruction (str, optional): Closing instruction (see PromptTemplate)
+
+    Returns:
+        PromptTemplate: Shared compiled template
+    """
+    return _compile(template, json.dumps(list(examples or []), sort_keys=True), instruction)
+
+
+def cached_prompt_tokens(response: Any) -> int:
+    """
+    Read how many prompt tokens the service served from its prompt cache.
+
+    Args:
+        response: Chat completion response
+
+    Returns:
+        int: usage.prompt_tokens_details.cached_tokens, or 0 if not reported
+    """
+    usage = getattr(response, "usage", None)
+    details = getattr(usage, "prompt_tokens_details", None)
+    if details is None:
+        return 0
+    if isinstance(details, dict):
+        return int(details.get("cached_tokens") or 0)
+    return int(getattr(details, "cached_tokens", 0) or 0)
@@ -0,0 +1,261 @@
+"""
+Client-side token-bucket rate limiting for Azure OpenAI quotas.
+
+Two buckets, requests/min and tokens/min, are refilled continuously. With the
+file backend their state lives in a small locked file, so every process on the
+host that points at the same file draws from one shared quota and requests
+queue locally instead of being rejected with 429.
+"""
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+import tempfile
+import threading
+from typing import Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class InProcessBucketBackend:
+    """Bucket state shared by the threads and tasks of one process."""
+
+    # Updates only take an in-memory lock, so they can run on the event loop
+    blocking = False
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state: Dict[str, float] = {}
+
+    def update(self, transform) -> float:
+        """Atomically apply transform(state) -> (result, new_state)."""
+        with self._lock:
+            result, self._state = transform(dict(self._state))
+            return result
+
+
+class FileBucketBackend:
+    """Bucket state shared across processes through an exclusively locked file."""
+
+    # Updates wait on a lock other processes may hold and do file I/O
+    blocking = True
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._thread_lock = threading.Lock()
+
+    def _lock(self, f) -> None:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+    def _unlock(self, f) -> None:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def update(self, transform) -> float:
+        """Atomically apply transform(state) -> (result, new_state) across processes."""
+        with self._thread_lock, open(self.path, "a+") as f:
+            self._lock(f)
+            try:
+                f.seek(0)
+                content = f.read()
+                try:
+                    state = json.loads(content) if content else {}
+                except json.JSONDecodeError:
+                    state = {}
+                result, state = transform(state)
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(state))
+                f.flush()
+                return result
+            finally:
+                self._unlock(f)
+
+
+def default_state_path(endpoint: Optional[str], deployment: str) -> str:
+    """
+    Shared state file for an endpoint/deployment pair.
+
+    Args:
+        endpoint (str, optional): Azure OpenAI endpoint
+        deployment (str): Deployment name
+
+    Returns:
+        str: Path in the system temp directory, identical for every process
+    """
+    digest = hashlib.sha256(f"{endpoint}|{deployment}".encode("utf-8")).hexdigest()[:16]
+    return os.path.join(tempfile.gettempdir(), f"azure-openai-ratelimit-{digest}.json")
+
+
+class TokenBucketRateLimiter:
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        burst_seconds: float = 10.0,
+        state_path: Optional[str] = None
+    ):
+        """
+        Initialize the requests/min and tokens/min buckets.
+
+        Args:
+            requests_per_minute (float, optional): RPM quota; None disables the request bucket
+            tokens_per_minute (float, optional): TPM quota; None disables the token bucket
+            burst_seconds (float): Bucket capacity in seconds of quota. Azure enforces
+                quotas over short windows, so a full minute of burst would still be throttled.
+            state_path (str, optional): File shared by all processes drawing on the same
+                quota; None keeps the state in this process only
+        """
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.burst_seconds = burst_seconds
+        self.backend = FileBucketBackend(state_path) if state_path else InProcessBucketBackend()
+        self._stats = {"requests": 0, "waits": 0, "wait_seconds": 0.0}
+
+    def _buckets(self) -> Dict[str, Tuple[float, float]]:
+        """Bucket name -> (refill rate per second, capacity)."""
+        buckets = {}
+        for name, per_minute in (("requests", self.requests_per_minute), ("tokens", self.tokens_per_minute)):
+            if per_minute:
+                rate = per_minute / 60.0
+                buckets[name] = (rate, max(1.0, rate * self.burst_seconds))
+        return buckets
+
+    def _refill(self, state: Dict[str, float], now: float) -> Dict[str, float]:
+        updated = state.get("updated", now)
+        elapsed = max(0.0, now - updated)
+        for name, (rate, capacity) in self._buckets().items():
+            state[name] = min(capacity, state.get(name, capacity) + rate * elapsed)
+        state["updated"] = now
+        return state
+
+    def try_acquire(self, tokens: float) -> float:
+        """
+        Take one request and the given tokens if both buckets have enough.
+
+        Args:
+            tokens (float): Estimated tokens for the request
+
+        Returns:
+            float: 0 if acquired, otherwise seconds until enough quota will be available
+        """
+        def transform(state):
+            now = time.time()
+            state = self._refill(state, now)
+            needs = {"requests": 1.0, "tokens": float(tokens)}
+            wait = 0.0
+            for name, (rate, capacity) in self._buckets().items():
+                # A request larger than the bucket only waits for a full bucket
+                need = min(needs[name], capacity)
+                if state[name] < need:
+                    wait = max(wait, (need - state[name]) / rate)
+            if wait == 0.0:
+                for name, (rate, capacity) in self._buckets().items():
+                    state[name] -= min(needs[name], capacity)
+            return wait, state
+
+        return self.backend.update(transform)
+
+    async def acquire(self, tokens: float) -> float:
+        """
+        Wait until one request and the given tokens are available, then take them.
+
+        Args:
+            tokens (float): Estimated tokens for the request
+
+        Returns:
+            float: Total seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            wait = await self._update_async(self.try_acquire, tokens)
+            if wait <= 0:
+                break
+            await asyncio.sleep(wait)
+            waited += wait
+        self._stats["requests"] += 1
+        if waited:
+            self._stats["waits"] += 1
+            self._stats["wait_seconds"] += waited
+        return waited
+
+    def refund(self, tokens: float) -> None:
+        """
+        Return over-estimated tokens once the actual usage is known.
+
+        Args:
+            tokens (float): Tokens to give back to the token bucket
+        """
+        if tokens <= 0 or "tokens" not in self._buckets():
+            return
+
+        def transform(state):
+            state = self._refill(state, time.time())
+            capacity = self._buckets()["tokens"][1]
+            state["tokens"] = min(capacity, state["tokens"] + tokens)
+            return None, state
+
+        self.backend.update(transform)
+
+    async def refund_async(self, tokens: float) -> None:
+        """Like refund(), without blocking the event loop on a shared state file."""
+        await self._update_async(self.refund, tokens)
+
+    async def _update_async(self, update, *args):
+        # A file lock held by another process would stall every coroutine in
+        # this one, so blocking backends are updated from a worker thread
+        if self.backend.blocking:
+            return await asyncio.to_thread(update, *args)
+        return update(*args)
+
+    def remaining(self) -> Dict[str, float]:
+        """Return the quota currently left in each enabled bucket."""
+        def transform(state):
+            state = self._refill(state, time.time())
+            return {name: state[name] for name in self._buckets()}, state
+
+        return self.backend.update(transform)
+
+    def stats(self) -> Dict[str, float]:
+        """Return request, wait and total wait-time counters for this process."""
+        return dict(self._stats)
+
+
+def rate_limiter_from_env(endpoint: Optional[str], deployment: str) -> Optional[TokenBucketRateLimiter]:
+    """
+    Build a cross-process limiter from AZURE_OPENAI_RPM / AZURE_OPENAI_TPM, if set.
+
+    AZURE_OPENAI_RATE_LIMIT_STATE overrides the shared state file.
+
+    Args:
+        endpoint (str, optional): Azure OpenAI endpoint
+        deployment (str): Deployment name
+
+    Returns:
+        TokenBucketRateLimiter, optional: Limiter, or None if no quota is configured
+    """
+    rpm = os.getenv("AZURE_OPENAI_RPM")
+    tpm = os.getenv("AZURE_OPENAI_TPM")
+    if not rpm and not tpm:
+        return None
+    return TokenBucketRateLimiter(
+        requests_per_minute=float(rpm) if rpm else None,
+        tokens_per_minute=float(tpm) if tpm else None,
+        state_path=os.getenv("AZURE_OPENAI_RATE_LIMIT_STATE") or default_state_path(endpoint, deployment)
+    )
@@ -0,0 +1,259 @@
+"""
+Two-tier response cache for Azure OpenAI completions.
+
+Responses are kept in a bounded in-memory LRU backed by a persistent SQLite
+store, so repeated runs against unchanged data skip the API entirely.
+"""
+
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+
+def make_cache_key(
+    model: str,
+    messages: List[Dict[str, str]],
+    temperature: float,
+    max_tokens: int,
+    endpoint: Optional[str] = None
+) -> str:
+    """
+    Build a canonical cache key for a chat completion request.
+
+    Args:
+        model (str): Deployment/model name
+        messages (List[Dict]): Chat messages sent to the model
+        temperature (float): Sampling temperature
+        max_tokens (int): Maximum number of tokens to generate
+        endpoint (str, optional): Resource the request is sent to, so deployments
+            with the same name on different resources get separate entries
+
+    Returns:
+        str: Hex SHA-256 digest of the canonical request
+    """
+    canonical = json.dumps(
+        {
+            "endpoint": endpoint,
+            "model": model,
+            "messages": messages,
+            "temperature": float(temperature),
+            "max_tokens": int(max_tokens)
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        path: Optional[str] = "logs/completion_cache.sqlite",
+        max_memory_entries: int = 256,
+        max_disk_bytes: int = 50 * 1024 * 1024,
+        ttl_seconds: Optional[float] = 7 * 24 * 3600,
+        cache_nonzero_temperature: bool = False
+    ):
+        """
+        Initialize the response cache.
+
+        Args:
+            path (str, optional): SQLite file for the persistent tier; None keeps
+                the cache in memory only
+            max_memory_entries (int): Maximum entries held in the in-memory LRU
+            max_disk_bytes (int): Maximum total size of cached responses on disk
+            ttl_seconds (float, optional): Entry lifetime; None disables expiry
+            cache_nonzero_temperature (bool): Also cache sampled (temperature > 0) calls
+        """
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.ttl_seconds = ttl_seconds
+        self.cache_nonzero_temperature = cache_nonzero_temperature
+
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "expired": 0,
+            "bypassed": 0
+        }
+
+        self._db: Optional[sqlite3.Connection] = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created_at REAL NOT NULL, last_access REAL NOT NULL, "
+                "size INTEGER NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_responses_last_access "
+                "ON responses(last_access)"
+            )
+            self._db.commit()
+
+    def is_cacheable(self, temperature: float) -> bool:
+        """Return True if a request with this temperature may be cached."""
+        return self.cache_nonzero_temperature or temperature == 0
+
+    def record_bypass(self) -> None:
+        """Count a request that skipped the cache."""
+        with self._lock:
+            self._stats["bypassed"] += 1
+
+    def _is_expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - created_at > self.ttl_seconds
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached response.
+
+        Args:
+            key (str): Cache key from make_cache_key
+
+        Returns:
+            str, optional: Cached completion text, or None on a miss
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, created_at = entry
+                if not self._is_expired(created_at, now):
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+                self._stats["expired"] += 1
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, created_at = row
+                    if not self._is_expired(created_at, now):
+                        self._db.execute(
+                            "UPDATE responses SET last_access = ? WHERE key = ?", (now, key)
+                        )
+                        self._db.commit()
+                        self._remember(key, value, created_at)
+                        self._stats["disk_hits"] += 1
+                        return value
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._db.commit()
+                    self._stats["expired"] += 1
+
+            self._stats["misses"] += 1
+            return None
+
+    async def get_async(self, key: str) -> Optional[str]:
+        """Like get(), without blocking the event loop on SQLite."""
+        if self._db is None:
+            return self.get(key)
+        return await asyncio.to_thread(self.get, key)
+
+    async def set_async(self, key: str, value: str) -> None:
+        """Like set(), without blocking the event loop on SQLite writes and eviction."""
+        if self._db is None:
+            self.set(key, value)
+            return
+        await asyncio.to_thread(self.set, key, value)
+
+    def set(self, key: str, value: str) -> None:
+        """
+        Store a response in both cache tiers.
+
+        Args:
+            key (str): Cache key from make_cache_key
+            value (str): Completion text to cache
+        """
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses "
+                    "(key, value, created_at, last_access, size) VALUES (?, ?, ?, ?, ?)",
+                    (key, value, now, now, len(value.encode("utf-8")))
+                )
+                self._evict_disk()
+                self._db.commit()
+            self._stats["stores"] += 1
+
+    def _remember(self, key: str, value: str, created_at: float) -> None:
+        """Insert into the in-memory LRU, evicting the least recently used entries."""
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _evict_disk(self) -> None:
+        """Drop expired rows, then least recently used rows until under the size limit."""
+        if self.ttl_seconds is not None:
+            cursor = self._db.execute(
+                "DELETE FROM responses WHERE created_at < ?",
+                (time.time() - self.ttl_seconds,)
+            )
+            self._stats["expired"] += cursor.rowcount
+
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_disk_bytes:
+            return
+
+        for key, size in self._db.execute(
+            "SELECT key, size FROM responses ORDER BY last_access ASC"
+        ).fetchall():
+            if total <= self.max_disk_bytes:
+                break
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            self._stats["evictions"] += 1
+
+    def clear(self) -> None:
+        """Remove all entries from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Get cache counters.
+
+        Returns:
+            Dict: Hit/miss/store/eviction counters and the overall hit rate
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        lookups = hits + stats["misses"]
+        stats["hits"] = hits
+        stats["hit_rate"] = hits / lookups if lookups else 0.0
+        return stats
+
+    def close(self) -> None:
+        """Close the SQLite connection."""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
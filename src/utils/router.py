@@ -0,0 +1,380 @@
+"""
+Routing of chat completion requests across several Azure OpenAI backends.
+
+Each backend is an endpoint/deployment pair with a weight. Requests go to
+the backend with the fewest outstanding requests (or the lowest
+load-adjusted EWMA latency), fail over to the next backend on 429, 5xx and
+connection errors, and skip backends that are cooling down after a 429 or
+have been ejected by passive failure counting or active health checks.
+"""
+
+import os
+import json
+import time
+import random
+import asyncio
+from typing import Dict, List, Optional, Set
+
+from src.utils.adaptive_limiter import ThrottledError, parse_retry_after
+from src.utils.openai_client import ClientSettings, get_async_client
+
+STRATEGIES = ("least_outstanding", "ewma")
+
+
+class Backend:
+    def __init__(
+        self,
+        endpoint: str,
+        deployment: str,
+        api_key: Optional[str] = None,
+        weight: float = 1.0,
+        name: Optional[str] = None,
+        client_settings: Optional[ClientSettings] = None
+    ):
+        """
+        Describe one endpoint/deployment pair.
+
+        Args:
+            endpoint (str): Azure OpenAI endpoint
+            deployment (str): Deployment name on that endpoint
+            api_key (str, optional): API key; defaults to AZURE_OPENAI_API_KEY
+            weight (float): Relative share of traffic
+            name (str, optional): Label used in stats; defaults to "<host>/<deployment>"
+            client_settings (ClientSettings, optional): Pool limits and timeouts;
+                endpoint and api_key are taken from the arguments above
+        """
+        if weight <= 0:
+            raise ValueError("Backend weight must be positive")
+        self.endpoint = endpoint
+        self.deployment = deployment
+        self.weight = weight
+        self.name = name or f"{endpoint.split('//')[-1].split('/')[0]}/{deployment}"
+        base = client_settings or ClientSettings()
+        self.settings = ClientSettings(
+            endpoint=endpoint,
+            api_key=api_key or base.api_key,
+            api_version=base.api_version,
+            max_connections=base.max_connections,
+            max_keepalive_connections=base.max_keepalive_connections,
+            keepalive_expiry=base.keepalive_expiry,
+            connect_timeout=base.connect_timeout,
+            read_timeout=base.read_timeout,
+            max_retries=0
+        )
+
+        self.outstanding = 0
+        self.ewma_latency: Optional[float] = None
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self.ejected_until = 0.0
+        self._stats = {"requests": 0, "successes": 0, "throttles": 0, "errors": 0, "failovers": 0, "ejections": 0}
+
+    def available(self, now: float) -> bool:
+        """True if the backend is neither ejected nor cooling down after a 429."""
+        return now >= self.ejected_until and now >= self.cooldown_until
+
+    def stats(self, now: Optional[float] = None) -> Dict:
+        """Return counters, outstanding requests, EWMA latency and health for this backend."""
+        now = time.monotonic() if now is None else now
+        stats = dict(self._stats)
+        stats.update({
+            "endpoint": self.endpoint,
+            "deployment": self.deployment,
+            "weight": self.weight,
+            "outstanding": self.outstanding,
+            "ewma_latency_ms": round(self.ewma_latency * 1000, 1) if self.ewma_latency is not None else None,
+            "healthy": now >= self.ejected_until,
+            "cooling_down": now < self.cooldown_until
+        })
+        return stats
+
+
+class _TrackedStream:
+    """Streaming response that counts as outstanding on its backend until it ends."""
+
+    def __init__(self, stream, backend: Backend):
+        self._stream = stream
+        self._backend = backend
+        self._finished = False
+
+    def _finish(self) -> None:
+        if not self._finished:
+            self._finished = True
+            self._backend.outstanding -= 1
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+    async def __aiter__(self):
+        try:
+            async for chunk in self._stream:
+                yield chunk
+        finally:
+            self._finish()
+
+    async def close(self) -> None:
+        try:
+            await self._stream.close()
+        finally:
+            self._finish()
+
+    async def __aenter__(self) -> "_TrackedStream":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+
+class EndpointRouter:
+    def __init__(
+        self,
+        backends: List[Backend],
+        strategy: str = "least_outstanding",
+        ewma_alpha: float = 0.3,
+        eject_after: int = 3,
+        ejection_seconds: float = 30.0,
+        health_check_interval: Optional[float] = 15.0,
+        health_check_timeout: float = 5.0,
+        max_unavailable_wait: float = 5.0
+    ):
+        """
+        Initialize the router.
+
+        Args:
+            backends (List[Backend]): Backends to spread requests over
+            strategy (str): "least_outstanding" (fewest in-flight requests per
+                unit of weight) or "ewma" (lowest EWMA latency scaled by load)
+            ewma_alpha (float): Weight of the newest latency sample in the EWMA
+            eject_after (int): Consecutive 5xx/connection failures that eject a backend
+            ejection_seconds (float): How long an ejected backend is skipped, unless
+                a health check reinstates it earlier
+            health_check_interval (float, optional): Seconds between active health
+                checks of every backend; None disables them
+            health_check_timeout (float): Timeout for one health check
+            max_unavailable_wait (float): When no backend is available, how long to
+                wait for the first one to come back before raising ThrottledError
+        """
+        if not backends:
+            raise ValueError("At least one backend is required")
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown strategy {strategy!r}; expected one of {', '.join(STRATEGIES)}")
+        self.backends = list(backends)
+        self.strategy = strategy
+        self.ewma_alpha = ewma_alpha
+        self.eject_after = eject_after
+        self.ejection_seconds = ejection_seconds
+        self.health_check_interval = health_check_interval
+        self.health_check_timeout = health_check_timeout
+        self.max_unavailable_wait = max_unavailable_wait
+        self._health_task: Optional[asyncio.Task] = None
+
+    def _score(self, backend: Backend) -> float:
+        load = (backend.outstanding + 1) / backend.weight
+        if self.strategy == "ewma":
+            # Untried backends score 0 so each gets sampled once
+            return (backend.ewma_latency or 0.0) * load
+        return load
+
+    def select(self, exclude: Optional[Set[str]] = None) -> Optional[Backend]:
+        """
+        Pick the backend for the next request.
+
+        Args:
+            exclude (Set[str], optional): Names of backends already tried
+
+        Returns:
+            Backend, optional: Best available backend; if every untried backend is
+                unavailable, the one that becomes available soonest; None if all
+                backends were tried
+        """
+        now = time.monotonic()
+        candidates = [b for b in self.backends if not exclude or b.name not in exclude]
+        if not candidates:
+            return None
+        available = [b for b in candidates if b.available(now)]
+        if not available:
+            return min(candidates, key=lambda b: max(b.ejected_until, b.cooldown_until))
+        best = min(self._score(b) for b in available)
+        tied = [b for b in available if self._score(b) <= best]
+        return random.choices(tied, weights=[b.weight for b in tied])[0]
+
+    async def create(self, **request):
+        """
+        Send a chat completion request, failing over between backends.
+
+        The request's model is replaced by each backend's deployment. 429, 5xx
+        and connection errors move on to the next backend; other errors are
+        raised immediately. If every backend fails, the last error is raised.
+        If no backend is available, the request waits up to max_unavailable_wait
+        for one to come out of cooldown or ejection, then raises ThrottledError.
+
+        Returns:
+            The chat completion response (or stream) from the first backend that
+                succeeded; a stream counts as outstanding until it is closed or
+                fully read
+        """
+        from openai import APIConnectionError, APIStatusError, RateLimitError
+
+        self._ensure_health_checks()
+        tried: Set[str] = set()
+        last_error: Optional[Exception] = None
+        while True:
+            backend = self.select(tried)
+            if backend is None:
+                raise last_error
+            wait = max(backend.ejected_until, backend.cooldown_until) - time.monotonic()
+            if wait > 0:
+                if wait > self.max_unavailable_wait:
+                    if last_error is not None:
+                        raise last_error
+                    raise ThrottledError(
+                        f"No backend available: all are ejected or cooling down for at least {wait:.1f}s",
+                        retry_after=wait
+                    )
+                await asyncio.sleep(wait)
+            if tried:
+                backend._stats["failovers"] += 1
+            tried.add(backend.name)
+
+            backend.outstanding += 1
+            backend._stats["requests"] += 1
+            start = time.monotonic()
+            streaming = False
+            try:
+                response = await get_async_client(backend.settings).chat.completions.create(
+                    **dict(request, model=backend.deployment)
+                )
+            except RateLimitError as e:
+                backend._stats["throttles"] += 1
+                backend.cooldown_until = time.monotonic() + (parse_retry_after(e.response.headers) or 1.0)
+                last_error = e
+            except (APIConnectionError, APIStatusError) as e:
+                if isinstance(e, APIStatusError) and e.status_code < 500:
+                    raise
+                self._record_failure(backend)
+                last_error = e
+            else:
+                self._record_success(backend, time.monotonic() - start)
+                if request.get("stream"):
+                    # The stream releases its outstanding slot when it ends
+                    streaming = True
+                    return _TrackedStream(response, backend)
+                return response
+            finally:
+                if not streaming:
+                    backend.outstanding -= 1
+
+    def _record_success(self, backend: Backend, latency: float) -> None:
+        backend._stats["successes"] += 1
+        backend.consecutive_failures = 0
+        if backend.ewma_latency is None:
+            backend.ewma_latency = latency
+        else:
+            backend.ewma_latency += self.ewma_alpha * (latency - backend.ewma_latency)
+
+    def _record_failure(self, backend: Backend) -> None:
+        backend._stats["errors"] += 1
+        backend.consecutive_failures += 1
+        if backend.consecutive_failures >= self.eject_after:
+            self._eject(backend)
+
+    def _eject(self, backend: Backend) -> None:
+        if time.monotonic() >= backend.ejected_until:
+            backend._stats["ejections"] += 1
+        backend.ejected_until = time.monotonic() + self.ejection_seconds
+        backend.consecutive_failures = 0
+
+    async def check_health(self, backend: Backend) -> bool:
+        """
+        Probe a backend with a cheap models listing request.
+
+        Args:
+            backend (Backend): Backend to probe
+
+        Returns:
+            bool: True if it answered; a failed probe ejects the backend and a
+                successful one reinstates it
+        """
+        try:
+            await asyncio.wait_for(
+                get_async_client(backend.settings).models.list(),
+                timeout=self.health_check_timeout
+            )
+        except Exception:
+            self._eject(backend)
+            return False
+        backend.ejected_until = 0.0
+        backend.consecutive_failures = 0
+        return True
+
+    def _ensure_health_checks(self) -> None:
+        if not self.health_check_interval:
+            return
+        loop = asyncio.get_running_loop()
+        task = self._health_task
+        if task is not None and not task.done() and task.get_loop() is loop:
+            return
+        self._health_task = loop.create_task(self._health_loop())
+
+    async def aclose(self) -> None:
+        """Stop the background health checks."""
+        task, self._health_task = self._health_task, None
+        if task is None or task.done():
+            return
+        task.cancel()
+        if task.get_loop() is asyncio.get_running_loop():
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _health_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            await asyncio.gather(*(self.check_health(b) for b in self.backends))
+
+    def stats(self) -> Dict[str, Dict]:
+        """
+        Get per-backend stats.
+
+        Returns:
+            Dict: Backend name -> requests, successes, throttles, errors, failovers,
+                ejections, outstanding requests, EWMA latency and health
+        """
+        now = time.monotonic()
+        return {backend.name: backend.stats(now) for backend in self.backends}
+
+
+def router_from_env(client_settings: Optional[ClientSettings] = None) -> Optional[EndpointRouter]:
+    """
+    Build a router from AZURE_OPENAI_BACKENDS, if set.
+
+    AZURE_OPENAI_BACKENDS is a JSON list of objects with "endpoint",
+    "deployment" and optional "api_key", "weight" and "name".
+    AZURE_OPENAI_ROUTING ("least_outstanding" or "ewma") picks the strategy.
+
+    Args:
+        client_settings (ClientSettings, optional): Shared pool limits and timeouts
+
+    Returns:
+        EndpointRouter, optional: Router, or None if no backends are configured
+    """
+    value = os.getenv("AZURE_OPENAI_BACKENDS")
+    if not value:
+        return None
+    try:
+        entries = json.loads(value)
+        backends = [
+            Backend(
+                endpoint=entry["endpoint"],
+                deployment=entry["deployment"],
+                api_key=entry.get("api_key"),
+                weight=float(entry.get("weight", 1.0)),
+                name=entry.get("name"),
+                client_settings=client_settings
+            )
+            for entry in entries
+        ]
+    except (ValueError, KeyError, TypeError) as e:
+        raise EnvironmentError(f"Invalid AZURE_OPENAI_BACKENDS: {str(e)}")
+    return EndpointRouter(backends, strategy=os.getenv("AZURE_OPENAI_ROUTING", "least_outstanding"))
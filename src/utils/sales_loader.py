@@ -0,0 +1,245 @@
+"""
+Streaming, memory-bounded loader for sales exports.
+
+Records are parsed incrementally from JSON (``{"sales_records": [...]}``) or
+JSONL (one record per line) files, so peak memory stays at roughly one read
+buffer plus one record regardless of file size.
+"""
+
+import json
+import mmap
+import codecs
+import asyncio
+from itertools import islice
+from typing import AsyncIterator, Collection, Dict, Iterator, Optional, Tuple, Union
+
+RECORDS_KEY = "sales_records"
+DEFAULT_CHUNK_SIZE = 64 * 1024
+# Largest single JSON value buffered before the input is treated as malformed
+MAX_VALUE_SIZE = 64 * 1024 * 1024
+
+_WHITESPACE = " \t\n\r"
+
+
+class _TextStream:
+    """Incrementally decoded text buffer over a binary source."""
+
+    def __init__(self, source, chunk_size: int):
+        self._source = source
+        self._chunk_size = chunk_size
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """Read another chunk, discarding consumed text. Returns False at EOF."""
+        if self.eof:
+            return False
+        data = self._source.read(self._chunk_size)
+        self.buffer = self.buffer[self.pos:] + self._decoder.decode(data, final=not data)
+        self.pos = 0
+        if not data:
+            self.eof = True
+        return True
+
+    def skip_whitespace(self) -> None:
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self.fill():
+                return
+
+    def peek(self) -> str:
+        self.skip_whitespace()
+        return self.buffer[self.pos] if self.pos < len(self.buffer) else ""
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            found = self.peek() or "end of file"
+            raise json.JSONDecodeError(f"Expected '{char}', found {found!r}", self.buffer, self.pos)
+        self.pos += 1
+
+    def decode_value(self, decoder: json.JSONDecoder):
+        """Decode the next complete JSON value, reading more input as needed."""
+        self.skip_whitespace()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if len(self.buffer) - self.pos > MAX_VALUE_SIZE or not self.fill():
+                    raise
+                continue
+            # A number at the end of the buffer may continue in the next chunk
+            if end == len(self.buffer) and not self.eof:
+                self.fill()
+                continue
+            self.pos = end
+            return value
+
+
+def _iter_json_records(source, chunk_size: int) -> Iterator[Dict]:
+    """Yield the elements of the top-level 'sales_records' array of a JSON document."""
+    stream = _TextStream(source, chunk_size)
+    decoder = json.JSONDecoder()
+
+    stream.expect("{")
+    if stream.peek() == "}":
+        stream.pos += 1
+    else:
+        while True:
+            key = stream.decode_value(decoder)
+            if not isinstance(key, str):
+                raise json.JSONDecodeError("Expected object key", stream.buffer, stream.pos)
+            stream.expect(":")
+            if key == RECORDS_KEY:
+                stream.expect("[")
+                if stream.peek() == "]":
+                    stream.pos += 1
+                else:
+                    while True:
+                        yield stream.decode_value(decoder)
+                        if stream.peek() == ",":
+                            stream.pos += 1
+                            continue
+                        stream.expect("]")
+                        break
+            else:
+                stream.decode_value(decoder)
+            if stream.peek() == ",":
+                stream.pos += 1
+                continue
+            stream.expect("}")
+            break
+
+    if stream.peek():
+        raise json.JSONDecodeError("Extra data after JSON document", stream.buffer, stream.pos)
+
+
+def _iter_jsonl_records(source) -> Iterator[Dict]:
+    """Yield one record per non-blank line."""
+    for line_number, line in enumerate(iter(source.readline, b""), 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            raise json.JSONDecodeError(f"Line {line_number}: {e.msg}", e.doc, e.pos)
+
+
+def _matches(
+    record: Dict,
+    start_date: Optional[str],
+    end_date: Optional[str],
+    segments: Optional[Collection[str]]
+) -> bool:
+    date = record.get("date", "")
+    if start_date and date < start_date:
+        return False
+    if end_date and date > end_date:
+        return False
+    if segments is not None and (record.get("customer") or {}).get("segment") not in segments:
+        return False
+    return True
+
+
+def iter_sales_records(
+    filepath: str,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    segment: Optional[Union[str, Collection[str]]] = None,
+    use_mmap: bool = False,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[Dict]:
+    """
+    Stream sales records from a JSON or JSONL file.
+
+    Files ending in .jsonl/.ndjson are read one record per line; anything else
+    is parsed as a JSON document with a 'sales_records' array.
+
+    Args:
+        filepath (str): Path to the sales data file
+        start_date (str, optional): Earliest record date to keep (YYYY-MM-DD, inclusive)
+        end_date (str, optional): Latest record date to keep (YYYY-MM-DD, inclusive)
+        segment (str or Collection[str], optional): Customer segment(s) to keep
+        use_mmap (bool): Read through a memory map instead of buffered file reads
+        chunk_size (int): Bytes to read per chunk for JSON documents
+
+    Yields:
+        Dict: Matching sales records in file order
+    """
+    segments = {segment} if isinstance(segment, str) else segment
+    is_jsonl = filepath.endswith((".jsonl", ".ndjson"))
+
+    with open(filepath, "rb") as f:
+        source = f
+        mapped = None
+        if use_mmap:
+            try:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                source = mapped
+            except ValueError:
+                # Empty files cannot be memory-mapped
+                mapped = None
+        try:
+            records = _iter_jsonl_records(source) if is_jsonl else _iter_json_records(source, chunk_size)
+            for record in records:
+                if not isinstance(record, dict):
+                    raise ValueError(f"Sales record is not a JSON object: {record!r}")
+                if _matches(record, start_date, end_date, segments):
+                    yield record
+        finally:
+            if mapped is not None:
+                mapped.close()
+
+
+async def aiter_sales_records(
+    filepath: str,
+    batch_size: int = 1000,
+    **filters
+) -> AsyncIterator[Dict]:
+    """
+    Stream sales records without blocking the event loop.
+
+    Parsing happens in a worker thread, one batch of records at a time.
+
+    Args:
+        filepath (str): Path to the sales data file
+        batch_size (int): Records parsed per worker-thread hop
+        **filters: Keyword arguments accepted by iter_sales_records
+
+    Yields:
+        Dict: Matching sales records in file order
+    """
+    records = iter_sales_records(filepath, **filters)
+    try:
+        while True:
+            batch = await asyncio.to_thread(lambda: list(islice(records, batch_size)))
+            if not batch:
+                return
+            for record in batch:
+                yield record
+    finally:
+        records.close()
+
+
+def validate_sales_file(filepath: str) -> Tuple[bool, str]:
+    """
+    Check that a sales data file parses, without loading it into memory.
+
+    Args:
+        filepath (str): Path to the sales data file
+
+    Returns:
+        Tuple[bool, str]: Whether the file is valid, and a status message
+    """
+    try:
+        count = 0
+        for _ in iter_sales_records(filepath):
+            count += 1
+        return True, f"Sample sales data file is valid ({count} records)"
+    except json.JSONDecodeError as e:
+        return False, f"Sample sales data file contains invalid JSON: {e.msg}"
+    except Exception as e:
+        return False, f"Error reading sample sales data: {str(e)}"
@@ -0,0 +1,177 @@
+"""
+Exact, vectorized sales metrics computed locally with pandas/NumPy.
+
+These figures are cheaper and more reliable than asking the model to do
+arithmetic over a JSON dump; prompts can embed them and leave only the
+narrative to the model.
+"""
+
+import json
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+FRAME_COLUMNS = [
+    "transaction_id",
+    "date",
+    "customer_id",
+    "customer_name",
+    "customer_segment",
+    "product_id",
+    "product_category",
+    "quantity",
+    "total_amount",
+    "sales_rep",
+    "interaction_count",
+    "first_interaction_date",
+]
+
+
+def records_to_frame(sales_data: Dict) -> pd.DataFrame:
+    """
+    Flatten sales records into a columnar DataFrame.
+
+    Args:
+        sales_data (Dict): Sales data with a 'sales_records' list
+
+    Returns:
+        pd.DataFrame: One row per transaction with typed columns
+    """
+    records: List[Dict] = sales_data.get("sales_records", [])
+    columns = {name: [] for name in FRAME_COLUMNS}
+
+    for record in records:
+        customer = record.get("customer", {})
+        product = record.get("product", {})
+        interactions = record.get("interaction_history", [])
+        columns["transaction_id"].append(record.get("transaction_id"))
+        columns["date"].append(record.get("date"))
+        columns["customer_id"].append(customer.get("id"))
+        columns["customer_name"].append(customer.get("name"))
+        columns["customer_segment"].append(customer.get("segment"))
+        columns["product_id"].append(product.get("id"))
+        columns["product_category"].append(product.get("category"))
+        columns["quantity"].append(record.get("quantity", 0))
+        columns["total_amount"].append(record.get("total_amount", 0.0))
+        columns["sales_rep"].append(record.get("sales_rep"))
+        columns["interaction_count"].append(len(interactions))
+        columns["first_interaction_date"].append(
+            min((i["date"] for i in interactions if i.get("date")), default=None)
+        )
+
+    frame = pd.DataFrame(columns)
+    frame["date"] = pd.to_datetime(frame["date"])
+    frame["first_interaction_date"] = pd.to_datetime(frame["first_interaction_date"])
+    frame["quantity"] = frame["quantity"].astype(np.int64)
+    frame["total_amount"] = frame["total_amount"].astype(np.float64)
+    frame["interaction_count"] = frame["interaction_count"].astype(np.int64)
+    return frame
+
+
+def _revenue_by(frame: pd.DataFrame, column: str) -> Dict[str, float]:
+    """Sum total_amount per value of a column, largest first."""
+    grouped = frame.groupby(column, sort=False)["total_amount"].sum()
+    return {str(key): round(float(value), 2) for key, value in grouped.sort_values(ascending=False).items()}
+
+
+def compute_basic_metrics(sales_data: Dict) -> Dict:
+    """
+    Compute the headline metrics used by the basic metrics exercise.
+
+    Args:
+        sales_data (Dict): Sales data with a 'sales_records' list
+
+    Returns:
+        Dict: total_sales, transaction_count, average_deal, largest_transaction
+            and most_frequent_customer
+    """
+    return _basic_metrics(records_to_frame(sales_data))
+
+
+def _basic_metrics(frame: pd.DataFrame) -> Dict:
+    """Compute the headline metrics from a records frame."""
+    if frame.empty:
+        return {
+            "total_sales": 0.0,
+            "transaction_count": 0,
+            "average_deal": 0.0,
+            "largest_transaction": None,
+            "most_frequent_customer": None,
+        }
+
+    amounts = frame["total_amount"].to_numpy()
+    total_sales = float(amounts.sum())
+    # One row per transaction; ids may be missing or repeated, so they aren't counted
+    transaction_count = len(frame)
+    largest = frame.iloc[int(np.argmax(amounts))]
+    customer_counts = frame["customer_id"].value_counts()
+    most_frequent_customer = None
+    if not customer_counts.empty:
+        top_customer_id = customer_counts.index[0]
+        most_frequent_customer = {
+            "id": top_customer_id,
+            "name": frame.loc[frame["customer_id"] == top_customer_id, "customer_name"].iloc[0],
+            "transactions": int(customer_counts.iloc[0]),
+        }
+
+    return {
+        "total_sales": round(total_sales, 2),
+        "transaction_count": transaction_count,
+        "average_deal": round(total_sales / transaction_count, 2),
+        "largest_transaction": {
+            "transaction_id": largest["transaction_id"],
+            "total_amount": round(float(largest["total_amount"]), 2),
+        },
+        "most_frequent_customer": most_frequent_customer,
+    }
+
+
+def compute_kpi_metrics(sales_data: Dict) -> Dict:
+    """
+    Compute the KPI report metrics.
+
+    Args:
+        sales_data (Dict): Sales data with a 'sales_records' list
+
+    Returns:
+        Dict: Basic metrics plus revenue breakdowns, segment distribution,
+            repeat customer rate, interactions per deal and sales cycle length
+    """
+    frame = records_to_frame(sales_data)
+    metrics = _basic_metrics(frame)
+    if frame.empty:
+        return metrics
+
+    per_customer = frame.groupby("customer_id").size().to_numpy()
+    cycle_days = (frame["date"] - frame["first_interaction_date"]).dt.days.dropna().to_numpy()
+
+    metrics.update({
+        "revenue_by_segment": _revenue_by(frame, "customer_segment"),
+        "revenue_by_category": _revenue_by(frame, "product_category"),
+        "revenue_by_sales_rep": _revenue_by(frame, "sales_rep"),
+        "segment_distribution": {
+            str(key): int(value)
+            for key, value in frame.groupby("customer_id")["customer_segment"].first().value_counts().items()
+        },
+        "repeat_customer_rate": round(float(np.mean(per_customer > 1)), 4) if per_customer.size else 0.0,
+        "interactions_per_deal": round(float(frame["interaction_count"].to_numpy().mean()), 2),
+        "average_sales_cycle_days": round(float(cycle_days.mean()), 1) if cycle_days.size else None,
+    })
+    return metrics
+
+
+def format_metrics_for_prompt(metrics: Dict) -> str:
+    """
+    Render precomputed metrics for use in place of raw sales data in a prompt.
+
+    Args:
+        metrics (Dict): Output of compute_basic_metrics or compute_kpi_metrics
+
+    Returns:
+        str: Metrics block stating that the figures are exact
+    """
+    return (
+        "Precomputed metrics (exact; use these figures as-is, do not recalculate):\n"
+        + json.dumps(metrics, indent=2, default=str)
+    )
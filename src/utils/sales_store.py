@@ -0,0 +1,453 @@
+"""
+Compact, indexed in-memory store for sales records.
+
+Numeric fields live in typed arrays, repeated strings (customers, products,
+reps, segments, categories) are dictionary-encoded, and secondary indexes
+make lookups and range queries avoid scanning every record.
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+# Fields record() rebuilds; any of them missing from an input record is left out again
+_OPTIONAL_FIELDS = (
+    "transaction_id", "date", "customer", "product", "quantity", "total_amount",
+    "payment_terms", "sales_rep", "interaction_history",
+)
+# Earlier objects with the same id compared against before storing another copy
+_MAX_VARIANTS_COMPARED = 8
+# Date ordinal stored for a record without a date (real ordinals start at 1)
+_NO_DATE = 0
+
+
+def _whole_quantity(record: Dict, value: Any) -> int:
+    """Return a quantity as an int, refusing values that would be truncated."""
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or (
+        isinstance(value, float) and not value.is_integer()
+    ):
+        raise ValueError(
+            f"Transaction {record.get('transaction_id')!r}: quantity must be a whole number, got {value!r}"
+        )
+    return int(value)
+
+
+class _ObjectPool:
+    """Nested objects (customers, products), one copy per distinct value per id."""
+
+    __slots__ = ("values", "_variants")
+
+    def __init__(self):
+        self.values: List[Any] = []
+        # Id code -> indexes into values of the objects seen with that id
+        self._variants: Dict[int, List[int]] = {}
+
+    def intern(self, code: int, value: Any) -> int:
+        variants = self._variants.setdefault(code, [])
+        # Rows sharing an id almost always share the object; only an equal
+        # object is reused, so rows with different nested fields keep their own
+        for index in variants[-_MAX_VARIANTS_COMPARED:]:
+            if self.values[index] == value:
+                return index
+        self.values.append(value)
+        variants.append(len(self.values) - 1)
+        return len(self.values) - 1
+
+
+class _StringPool:
+    """Dictionary encoding for a repeated string column."""
+
+    __slots__ = ("values", "_codes")
+
+    def __init__(self):
+        self.values: List[Optional[str]] = []
+        self._codes: Dict[Optional[str], int] = {}
+
+    def encode(self, value: Optional[str]) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self._codes[value] = code
+            self.values.append(value)
+        return code
+
+    def code_of(self, value: Optional[str]) -> Optional[int]:
+        return self._codes.get(value)
+
+
+class SalesRecordView:
+    """Lightweight read-only view of one stored record."""
+
+    __slots__ = ("_store", "_row")
+
+    def __init__(self, store: "SalesStore", row: int):
+        self._store = store
+        self._row = row
+
+    @property
+    def transaction_id(self) -> str:
+        return self._store._transaction_ids[self._row]
+
+    @property
+    def date(self) -> Optional[str]:
+        ordinal = self._store._dates[self._row]
+        return date.fromordinal(ordinal).isoformat() if ordinal != _NO_DATE else None
+
+    @property
+    def total_amount(self) -> float:
+        return self._store._amounts[self._row]
+
+    @property
+    def quantity(self) -> int:
+        return self._store._quantities[self._row]
+
+    @property
+    def customer_id(self) -> Optional[str]:
+        return self._store._customer_ids.values[self._store._customer_codes[self._row]]
+
+    @property
+    def segment(self) -> Optional[str]:
+        return self._store._segments.values[self._store._segment_codes[self._row]]
+
+    @property
+    def sales_rep(self) -> Optional[str]:
+        return self._store._reps.values[self._store._rep_codes[self._row]]
+
+    @property
+    def product_id(self) -> Optional[str]:
+        return self._store._product_ids.values[self._store._product_codes[self._row]]
+
+    @property
+    def category(self) -> Optional[str]:
+        return self._store._categories.values[self._store._category_codes[self._row]]
+
+    def to_dict(self) -> Dict:
+        """Rebuild the original record dictionary."""
+        return self._store.record(self._row)
+
+    def __repr__(self) -> str:
+        return f"SalesRecordView({self.transaction_id!r}, {self.date}, {self.total_amount})"
+
+
+class SalesStore:
+    # Columns that can be used with rows_where/group_by, mapped to (pool, codes) attribute names
+    INDEXED_COLUMNS = {
+        "customer_id": ("_customer_ids", "_customer_codes"),
+        "segment": ("_segments", "_segment_codes"),
+        "sales_rep": ("_reps", "_rep_codes"),
+        "category": ("_categories", "_category_codes"),
+        "product_id": ("_product_ids", "_product_codes"),
+    }
+
+    def __init__(self):
+        """Initialize an empty sales store."""
+        self._transaction_ids: List[str] = []
+        self._dates = array("l")
+        self._amounts = array("d")
+        self._quantities = array("q")
+
+        self._customer_ids = _StringPool()
+        self._segments = _StringPool()
+        self._reps = _StringPool()
+        self._categories = _StringPool()
+        self._product_ids = _StringPool()
+        self._payment_terms = _StringPool()
+        self._interaction_types = _StringPool()
+
+        self._customer_codes = array("i")
+        self._segment_codes = array("i")
+        self._rep_codes = array("i")
+        self._category_codes = array("i")
+        self._product_codes = array("i")
+        self._payment_codes = array("i")
+
+        # Distinct customer/product objects, and each row's index into them
+        self._customers = _ObjectPool()
+        self._products = _ObjectPool()
+        self._customer_objects = array("i")
+        self._product_objects = array("i")
+        # Optional fields missing from each input record, or None if all were present
+        self._absent: List[Optional[tuple]] = []
+        # Interaction history per row as (ordinal, type code, notes) tuples, or dicts
+        # for entries with extra fields
+        self._interactions: List[tuple] = []
+        # Any fields not covered by the columns above, or None
+        self._extras: List[Optional[Dict]] = []
+
+        self._indexes: Dict[str, Dict[int, array]] = {name: {} for name in self.INDEXED_COLUMNS}
+        self._date_order: Optional[array] = None
+        self._sorted_dates: Optional[array] = None
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict]) -> "SalesStore":
+        """
+        Build a store from an iterable of sales records.
+
+        Args:
+            records (Iterable[Dict]): Records, e.g. from iter_sales_records
+
+        Returns:
+            SalesStore: Populated store
+        """
+        store = cls()
+        for record in records:
+            store.add(record)
+        return store
+
+    @classmethod
+    def from_sales_data(cls, sales_data: Dict) -> "SalesStore":
+        """
+        Build a store from load_sales_data output.
+
+        Args:
+            sales_data (Dict): Sales data with a 'sales_records' list
+
+        Returns:
+            SalesStore: Populated store
+        """
+        return cls.from_records(sales_data.get("sales_records", []))
+
+    def add(self, record: Dict) -> int:
+        """
+        Append a record to the store.
+
+        Args:
+            record (Dict): A sales record. A missing or None date is kept as
+                None (like NaT in sales_metrics) and never matches a date range.
+
+        Returns:
+            int: Row number of the new record
+
+        Raises:
+            ValueError: If the quantity is not a whole number or the date is not ISO formatted
+        """
+        row = len(self._transaction_ids)
+        record = dict(record)
+        absent = tuple(name for name in _OPTIONAL_FIELDS if name not in record) or None
+        # Validate before touching any column, so a rejected record leaves no partial row
+        quantity = _whole_quantity(record, record.pop("quantity", 0))
+        record_date = record.pop("date", None)
+        ordinal = date.fromisoformat(record_date).toordinal() if record_date is not None else _NO_DATE
+        self._absent.append(absent)
+        customer = record.pop("customer", None)
+        product = record.pop("product", None)
+        customer_fields = customer if isinstance(customer, dict) else {}
+        product_fields = product if isinstance(product, dict) else {}
+
+        self._transaction_ids.append(record.pop("transaction_id", None))
+        self._dates.append(ordinal)
+        self._amounts.append(float(record.pop("total_amount", 0.0)))
+        self._quantities.append(quantity)
+        self._payment_codes.append(self._payment_terms.encode(record.pop("payment_terms", None)))
+
+        customer_code = self._customer_ids.encode(customer_fields.get("id"))
+        product_code = self._product_ids.encode(product_fields.get("id"))
+        self._customer_objects.append(self._customers.intern(customer_code, customer))
+        self._product_objects.append(self._products.intern(product_code, product))
+        codes = {
+            "customer_id": customer_code,
+            "segment": self._segments.encode(customer_fields.get("segment")),
+            "sales_rep": self._reps.encode(record.pop("sales_rep", None)),
+            "category": self._categories.encode(product_fields.get("category")),
+            "product_id": product_code,
+        }
+        for name, code in codes.items():
+            getattr(self, self.INDEXED_COLUMNS[name][1]).append(code)
+            self._indexes[name].setdefault(code, array("i")).append(row)
+
+        self._interactions.append(tuple(
+            (
+                date.fromisoformat(item["date"]).toordinal() if item.get("date") else None,
+                self._interaction_types.encode(item.get("type")),
+                item.get("notes"),
+            )
+            if set(item) <= {"date", "type", "notes"} else dict(item)
+            for item in record.pop("interaction_history", [])
+        ))
+        self._extras.append(record or None)
+
+        self._date_order = None
+        self._sorted_dates = None
+        return row
+
+    def __len__(self) -> int:
+        return len(self._transaction_ids)
+
+    def __iter__(self) -> Iterator[SalesRecordView]:
+        return (SalesRecordView(self, row) for row in range(len(self)))
+
+    def view(self, row: int) -> SalesRecordView:
+        """Return a view of a single row."""
+        return SalesRecordView(self, row)
+
+    def record(self, row: int) -> Dict:
+        """
+        Rebuild the full record dictionary for a row.
+
+        Args:
+            row (int): Row number
+
+        Returns:
+            Dict: Record in the original load_sales_data shape, with the same fields
+        """
+        customer = self._customers.values[self._customer_objects[row]]
+        product = self._products.values[self._product_objects[row]]
+        record = {
+            "transaction_id": self._transaction_ids[row],
+            "date": self.view(row).date,
+            "customer": dict(customer) if isinstance(customer, dict) else customer,
+            "product": dict(product) if isinstance(product, dict) else product,
+            "quantity": self._quantities[row],
+            "total_amount": self._amounts[row],
+            "payment_terms": self._payment_terms.values[self._payment_codes[row]],
+            "sales_rep": self._reps.values[self._rep_codes[row]],
+            "interaction_history": [self._interaction(item) for item in self._interactions[row]],
+        }
+        for name in self._absent[row] or ():
+            del record[name]
+        if self._extras[row]:
+            record.update(self._extras[row])
+        return record
+
+    def _interaction(self, item) -> Dict:
+        if isinstance(item, dict):
+            return dict(item)
+        ordinal, type_code, notes = item
+        return {
+            "date": date.fromordinal(ordinal).isoformat() if ordinal is not None else None,
+            "type": self._interaction_types.values[type_code],
+            "notes": notes,
+        }
+
+    def _ensure_date_index(self) -> None:
+        if self._date_order is None:
+            order = sorted(range(len(self)), key=self._dates.__getitem__)
+            self._date_order = array("i", order)
+            self._sorted_dates = array("l", (self._dates[row] for row in order))
+
+    def rows_in_date_range(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[int]:
+        """
+        Find rows whose date falls in an inclusive range, using the sorted date index.
+
+        Rows without a date are never in a range.
+
+        Args:
+            start_date (str, optional): Earliest date (YYYY-MM-DD)
+            end_date (str, optional): Latest date (YYYY-MM-DD)
+
+        Returns:
+            List[int]: Row numbers in date order
+        """
+        self._ensure_date_index()
+        low = (
+            bisect_left(self._sorted_dates, date.fromisoformat(start_date).toordinal())
+            if start_date else bisect_right(self._sorted_dates, _NO_DATE)
+        )
+        high = (
+            bisect_right(self._sorted_dates, date.fromisoformat(end_date).toordinal())
+            if end_date else len(self._sorted_dates)
+        )
+        return list(self._date_order[low:high])
+
+    def rows_where(
+        self,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        **equals: str
+    ) -> List[int]:
+        """
+        Find rows matching a date range and/or exact column values.
+
+        Args:
+            start_date (str, optional): Earliest date (YYYY-MM-DD)
+            end_date (str, optional): Latest date (YYYY-MM-DD)
+            **equals: Column values to match, for columns in INDEXED_COLUMNS
+
+        Returns:
+            List[int]: Matching row numbers in ascending order
+        """
+        candidates: Optional[set] = None
+        # Intersect the smallest index postings first
+        postings = []
+        for name, value in equals.items():
+            if name not in self.INDEXED_COLUMNS:
+                raise ValueError(f"Unknown indexed column: {name}")
+            pool = getattr(self, self.INDEXED_COLUMNS[name][0])
+            code = pool.code_of(value)
+            if code is None:
+                return []
+            postings.append(self._indexes[name].get(code, array("i")))
+        for rows in sorted(postings, key=len):
+            candidates = set(rows) if candidates is None else candidates.intersection(rows)
+            if not candidates:
+                return []
+
+        if start_date or end_date:
+            in_range = self.rows_in_date_range(start_date, end_date)
+            candidates = set(in_range) if candidates is None else candidates.intersection(in_range)
+        if candidates is None:
+            return list(range(len(self)))
+        return sorted(candidates)
+
+    def group_by(
+        self,
+        column: str,
+        measure: str = "total_amount",
+        aggregate: str = "sum",
+        rows: Optional[Sequence[int]] = None
+    ) -> Dict[Optional[str], float]:
+        """
+        Aggregate a numeric column per value of an indexed column.
+
+        Args:
+            column (str): Grouping column, one of INDEXED_COLUMNS
+            measure (str): "total_amount" or "quantity"
+            aggregate (str): "sum", "count", "mean", "min" or "max"
+            rows (Sequence[int], optional): Restrict to these rows (e.g. from rows_where)
+
+        Returns:
+            Dict: Aggregate per group value
+        """
+        if column not in self.INDEXED_COLUMNS:
+            raise ValueError(f"Unknown indexed column: {column}")
+        values = {"total_amount": self._amounts, "quantity": self._quantities}.get(measure)
+        if values is None:
+            raise ValueError(f"Unknown measure: {measure}")
+        aggregators: Dict[str, Callable[[List[float]], float]] = {
+            "sum": sum,
+            "count": len,
+            "mean": lambda items: sum(items) / len(items),
+            "min": min,
+            "max": max,
+        }
+        if aggregate not in aggregators:
+            raise ValueError(f"Unknown aggregate: {aggregate}")
+
+        pool = getattr(self, self.INDEXED_COLUMNS[column][0])
+        if rows is None:
+            # Use the postings lists directly; no scan over unrelated columns
+            groups = {code: posting for code, posting in self._indexes[column].items()}
+        else:
+            codes = getattr(self, self.INDEXED_COLUMNS[column][1])
+            groups = {}
+            for row in rows:
+                groups.setdefault(codes[row], []).append(row)
+
+        return {
+            pool.values[code]: aggregators[aggregate]([values[row] for row in group_rows])
+            for code, group_rows in groups.items()
+        }
+
+    def to_sales_data(self, rows: Optional[Iterable[int]] = None) -> Dict:
+        """
+        Re-emit records in load_sales_data shape, e.g. for prompt construction.
+
+        Args:
+            rows (Iterable[int], optional): Rows to include; defaults to all
+
+        Returns:
+            Dict: {'sales_records': [...]} for the selected rows
+        """
+        selected = range(len(self)) if rows is None else rows
+        return {"sales_records": [self.record(row) for row in selected]}
@@ -0,0 +1,345 @@
+"""
+Approximate-match cache for near-duplicate prompts.
+
+Prompts are reduced to word shingles and fingerprinted with MinHash; an LSH
+(banded) index finds previously cached prompts whose estimated Jaccard
+similarity clears a threshold without scanning every entry. Close matches
+can be served from the cache, and weaker ones flagged as candidates.
+"""
+
+import re
+import time
+import zlib
+import threading
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+# Mersenne prime for the universal hash family; 32-bit inputs keep a*x + b in uint64
+_PRIME = np.uint64((1 << 31) - 1)
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+# Shingles hashed at once; bounds the num_perm x chunk working array (4 MB at 128 x 4096)
+_SIGNATURE_CHUNK = 4096
+
+
+def shingle(text: str, size: int = 3) -> Set[str]:
+    """
+    Split text into overlapping word n-grams.
+
+    Case and whitespace are normalized, so formatting edits don't change the set.
+
+    Args:
+        text (str): Prompt text
+        size (int): Words per shingle
+
+    Returns:
+        Set[str]: Distinct shingles (the whole text if it is shorter than one shingle)
+    """
+    tokens = _TOKEN_PATTERN.findall(text.lower())
+    if len(tokens) <= size:
+        return {" ".join(tokens)}
+    return {" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    """Exact Jaccard similarity of two shingle sets."""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def choose_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """
+    Pick (bands, rows) so the LSH collision curve turns at the threshold.
+
+    Two signatures share a bucket in at least one band with probability
+    1 - (1 - s^rows)^bands; its steepest point is near (1/bands)^(1/rows).
+
+    Args:
+        num_perm (int): Signature length
+        threshold (float): Target similarity
+
+    Returns:
+        Tuple[int, int]: Bands and rows per band, with bands * rows <= num_perm
+    """
+    best = (num_perm, 1)
+    best_error = float("inf")
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        # Bias slightly low so pairs just above the threshold are rarely missed
+        error = abs((1.0 / bands) ** (1.0 / rows) - (threshold - 0.05))
+        if error < best_error:
+            best, best_error = (bands, rows), error
+    return best
+
+
+class SimilarityMatch:
+    __slots__ = ("key", "completion", "similarity", "accepted")
+
+    def __init__(self, key: str, completion: str, similarity: float, accepted: bool):
+        """
+        Result of a similarity lookup.
+
+        Args:
+            key (str): Identifier of the cached entry that matched
+            completion (str): Cached completion text
+            similarity (float): Estimated Jaccard similarity to the cached prompt
+            accepted (bool): True if similarity cleared the serving threshold;
+                False for a candidate that only cleared candidate_threshold
+        """
+        self.key = key
+        self.completion = completion
+        self.similarity = similarity
+        self.accepted = accepted
+
+    def __repr__(self) -> str:
+        return f"SimilarityMatch(key={self.key!r}, similarity={self.similarity:.3f}, accepted={self.accepted})"
+
+
+class SimilarityCache:
+    def __init__(
+        self,
+        threshold: float = 0.9,
+        candidate_threshold: Optional[float] = None,
+        num_perm: int = 128,
+        shingle_size: int = 3,
+        max_entries: int = 100000,
+        ttl_seconds: Optional[float] = 7 * 24 * 3600,
+        cache_nonzero_temperature: bool = False,
+        seed: int = 1
+    ):
+        """
+        Initialize the similarity cache.
+
+        Args:
+            threshold (float): Estimated similarity at or above which a cached
+                completion is served
+            candidate_threshold (float, optional): Lower similarity at which a match
+                is only flagged as a candidate; defaults to threshold (no flagging)
+            num_perm (int): MinHash signature length; longer is more accurate but slower
+            shingle_size (int): Words per shingle
+            max_entries (int): Maximum cached prompts; least recently used are evicted
+            ttl_seconds (float, optional): Entry lifetime; None disables expiry
+            cache_nonzero_temperature (bool): Also serve sampled (temperature > 0) calls
+            seed (int): Seed for the hash permutations
+        """
+        self.threshold = threshold
+        self.candidate_threshold = threshold if candidate_threshold is None else min(candidate_threshold, threshold)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.cache_nonzero_temperature = cache_nonzero_temperature
+        self.bands, self.rows = choose_bands(num_perm, self.candidate_threshold)
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, int(_PRIME), size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, int(_PRIME), size=num_perm, dtype=np.uint64)
+
+        # key -> (namespace, signature, completion, created_at), in LRU order
+        self._entries: "OrderedDict[str, Tuple[str, np.ndarray, str, float]]" = OrderedDict()
+        # (namespace, band, band bytes) -> keys sharing that band
+        self._buckets: Dict[Tuple[str, int, bytes], Set[str]] = {}
+        self._candidates: Deque[Dict] = deque(maxlen=100)
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "candidates": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "expired": 0,
+            "lsh_candidates": 0,
+            "lsh_false_positives": 0,
+            "confirmed": 0,
+            "rejected": 0
+        }
+
+    def is_cacheable(self, temperature: float) -> bool:
+        """Return True if a request with this temperature may be served from the cache."""
+        return self.cache_nonzero_temperature or temperature == 0
+
+    def signature(self, text: str) -> np.ndarray:
+        """
+        Compute the MinHash signature of a text.
+
+        Args:
+            text (str): Prompt text
+
+        Returns:
+            np.ndarray: num_perm uint64 minimum hash values
+        """
+        hashes = np.fromiter(
+            (zlib.crc32(s.encode("utf-8")) for s in shingle(text, self.shingle_size)),
+            dtype=np.uint64
+        ) % _PRIME
+        # Hash values are below _PRIME, so it works as the initial minimum
+        signature = np.full(self.num_perm, _PRIME, dtype=np.uint64)
+        for start in range(0, len(hashes), _SIGNATURE_CHUNK):
+            chunk = hashes[start:start + _SIGNATURE_CHUNK]
+            np.minimum(signature, ((np.outer(self._a, chunk) + self._b[:, None]) % _PRIME).min(axis=1), out=signature)
+        return signature
+
+    def _band_keys(self, namespace: str, signature: np.ndarray) -> List[Tuple[str, int, bytes]]:
+        rows = self.rows
+        return [(namespace, band, signature[band * rows:(band + 1) * rows].tobytes()) for band in range(self.bands)]
+
+    def _is_expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - created_at > self.ttl_seconds
+
+    def lookup(self, prompt: str, namespace: str = "", signature: Optional[np.ndarray] = None) -> Optional[SimilarityMatch]:
+        """
+        Find the most similar cached prompt.
+
+        Args:
+            prompt (str): Prompt text (template and data payload)
+            namespace (str): Exact-match context such as model, system message and
+                generation settings; only entries with the same namespace match
+            signature (np.ndarray, optional): Precomputed signature of prompt
+
+        Returns:
+            SimilarityMatch, optional: Best match at or above candidate_threshold,
+                or None. Check .accepted before using the completion.
+        """
+        if signature is None:
+            signature = self.signature(prompt)
+        now = time.time()
+        with self._lock:
+            keys: Set[str] = set()
+            for band_key in self._band_keys(namespace, signature):
+                bucket = self._buckets.get(band_key)
+                if bucket:
+                    keys |= bucket
+
+            best_key, best_similarity = None, -1.0
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                if self._is_expired(entry[3], now):
+                    self._remove(key)
+                    self._stats["expired"] += 1
+                    continue
+                similarity = float(np.count_nonzero(entry[1] == signature)) / self.num_perm
+                if similarity > best_similarity:
+                    best_key, best_similarity = key, similarity
+            self._stats["lsh_candidates"] += len(keys)
+
+            if best_key is None or best_similarity < self.candidate_threshold:
+                if best_key is not None:
+                    self._stats["lsh_false_positives"] += 1
+                self._stats["misses"] += 1
+                return None
+
+            self._entries.move_to_end(best_key)
+            accepted = best_similarity >= self.threshold
+            match = SimilarityMatch(best_key, self._entries[best_key][2], best_similarity, accepted)
+            if accepted:
+                self._stats["hits"] += 1
+            else:
+                self._stats["candidates"] += 1
+                self._candidates.append({
+                    "key": best_key,
+                    "similarity": round(best_similarity, 4),
+                    "prompt_preview": prompt[:200],
+                    "flagged_at": now
+                })
+            return match
+
+    def add(self, key: str, prompt: str, completion: str, namespace: str = "", signature: Optional[np.ndarray] = None) -> None:
+        """
+        Cache a completion under its prompt's fingerprint.
+
+        Args:
+            key (str): Unique identifier, e.g. the exact-match cache key
+            prompt (str): Prompt text
+            completion (str): Completion to serve for similar prompts
+            namespace (str): Exact-match context (see lookup)
+            signature (np.ndarray, optional): Precomputed signature of prompt
+        """
+        if signature is None:
+            signature = self.signature(prompt)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (namespace, signature, completion, time.time())
+            for band_key in self._band_keys(namespace, signature):
+                self._buckets.setdefault(band_key, set()).add(key)
+            self._stats["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+
+    def _remove(self, key: str) -> None:
+        namespace, signature, _, _ = self._entries.pop(key)
+        for band_key in self._band_keys(namespace, signature):
+            bucket = self._buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band_key]
+
+    def report_outcome(self, match: SimilarityMatch, correct: bool) -> None:
+        """
+        Record whether a served or flagged match was actually an acceptable answer.
+
+        Args:
+            match (SimilarityMatch): Match returned by lookup
+            correct (bool): True if the cached completion was right for the new prompt
+        """
+        with self._lock:
+            self._stats["confirmed" if correct else "rejected"] += 1
+
+    def check_candidate(self, match: SimilarityMatch, completion: str) -> bool:
+        """
+        Compare a candidate match that was not served with the completion fetched instead.
+
+        Candidates sit just below the serving threshold; how often their cached
+        completion agrees with the real one shows whether the threshold could be
+        lowered. The outcome is recorded with report_outcome.
+
+        Args:
+            match (SimilarityMatch): Candidate returned by lookup
+            completion (str): Completion the API returned for the new prompt
+
+        Returns:
+            bool: True if the completions are at least threshold similar
+        """
+        correct = jaccard(
+            shingle(match.completion, self.shingle_size),
+            shingle(completion, self.shingle_size)
+        ) >= self.threshold
+        self.report_outcome(match, correct)
+        return correct
+
+    def candidates(self) -> List[Dict]:
+        """Return the most recently flagged candidate matches, oldest first."""
+        with self._lock:
+            return list(self._candidates)
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+            self._candidates.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Get cache counters.
+
+        Returns:
+            Dict: Hit/candidate/miss/store/eviction counters, LSH candidate and
+                false-positive counts, the hit rate, and the accuracy of
+                matches whose outcome was reported (candidates are checked
+                against the live completion)
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["candidates"] + stats["misses"]
+        reported = stats["confirmed"] + stats["rejected"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["accuracy"] = stats["confirmed"] / reported if reported else None
+        return stats
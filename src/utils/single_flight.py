@@ -0,0 +1,164 @@
+"""
+In-flight request coalescing ("single-flight").
+
+Concurrent calls with the same key share one underlying call: the first
+caller starts it and everyone who arrives while it is running awaits the
+same result or error. Streams are shared too; late joiners first receive
+the chunks already produced. Nothing is kept once the call finishes, so
+this is independent of (and complementary to) response caching.
+"""
+
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class _Flight:
+    """One shared call and the callers waiting on it."""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class _StreamFlight:
+    """One shared stream: chunks produced so far and a signal for new ones."""
+
+    def __init__(self):
+        self.items: List = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.changed = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.subscribers = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        """Initialize an empty set of in-flight calls and the collapse counters."""
+        self._calls: Dict[str, _Flight] = {}
+        self._streams: Dict[str, _StreamFlight] = {}
+        self._stats = {"calls": 0, "executed": 0, "collapsed": 0, "errors": 0}
+
+    async def do(self, key: str, call: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run call(), or join an identical call already in flight.
+
+        The shared call runs as its own task, so one caller being cancelled
+        doesn't cancel it for the others; it is only cancelled when every
+        caller has gone.
+
+        Args:
+            key (str): Canonical request key
+            call (Callable): Starts the underlying request
+
+        Returns:
+            The shared result; the shared error is raised to every caller
+        """
+        self._stats["calls"] += 1
+        loop = asyncio.get_running_loop()
+        flight = self._calls.get(key)
+        if flight is None or flight.task.get_loop() is not loop:
+            flight = _Flight(loop.create_task(self._execute(key, call)))
+            self._calls[key] = flight
+        else:
+            self._stats["collapsed"] += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Forget the flight first, so a caller arriving while the task
+                # unwinds starts a new call instead of joining a cancelled one
+                if self._calls.get(key) is flight:
+                    del self._calls[key]
+                flight.task.cancel()
+
+    async def _execute(self, key: str, call: Callable[[], Awaitable[T]]) -> T:
+        self._stats["executed"] += 1
+        try:
+            return await call()
+        except Exception:
+            self._stats["errors"] += 1
+            raise
+        finally:
+            flight = self._calls.get(key)
+            if flight is not None and flight.task is asyncio.current_task():
+                del self._calls[key]
+
+    async def stream(self, key: str, open_stream: Callable[[], AsyncIterator[T]]) -> AsyncIterator[T]:
+        """
+        Iterate over a stream, sharing it with identical concurrent streams.
+
+        Args:
+            key (str): Canonical request key
+            open_stream (Callable): Starts the underlying stream
+
+        Yields:
+            Every item of the shared stream from the beginning; the shared
+            error, if any, is raised after the items produced before it
+        """
+        self._stats["calls"] += 1
+        loop = asyncio.get_running_loop()
+        flight = self._streams.get(key)
+        if flight is None or flight.task.get_loop() is not loop:
+            flight = _StreamFlight()
+            flight.task = loop.create_task(self._pump(key, flight, open_stream))
+            self._streams[key] = flight
+        else:
+            self._stats["collapsed"] += 1
+
+        flight.subscribers += 1
+        try:
+            index = 0
+            while True:
+                while index < len(flight.items):
+                    yield flight.items[index]
+                    index += 1
+                if flight.done:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+                flight.changed.clear()
+                await flight.changed.wait()
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.done:
+                if self._streams.get(key) is flight:
+                    del self._streams[key]
+                flight.task.cancel()
+
+    async def _pump(self, key: str, flight: _StreamFlight, open_stream: Callable[[], AsyncIterator[T]]) -> None:
+        self._stats["executed"] += 1
+        items = open_stream()
+        try:
+            async for item in items:
+                flight.items.append(item)
+                flight.changed.set()
+        except Exception as e:
+            self._stats["errors"] += 1
+            flight.error = e
+        finally:
+            # Release the underlying stream even if every subscriber left early
+            await items.aclose()
+            flight.done = True
+            flight.changed.set()
+            if self._streams.get(key) is flight:
+                del self._streams[key]
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Get coalescing counters.
+
+        Returns:
+            Dict: 'calls' made, underlying calls 'executed', calls 'collapsed'
+                into one already in flight, shared 'errors', the 'collapse_rate'
+                and calls currently 'in_flight'
+        """
+        stats = dict(self._stats)
+        stats["collapse_rate"] = stats["collapsed"] / stats["calls"] if stats["calls"] else 0.0
+        stats["in_flight"] = len(self._calls) + len(self._streams)
+        return stats
@@ -1,20 +1,44 @@
 """
 Setup validation script for Azure OpenAI workshop.
+
+Independent checks run concurrently, each under a timeout. Connectivity is
+checked with a cheap models listing (or, with --full, a test completion),
+and a successful result is reused for VALIDATE_SETUP_CACHE_TTL seconds so
+repeated pre-flight runs return almost immediately. colorama, the openai
+SDK and the .env file are loaded only when a check needs them.
 """
 
 import os
 import sys
-from typing import List, Tuple
+import time
+import asyncio
+import hashlib
+import argparse
+import tempfile
+from functools import lru_cache
+from typing import Awaitable, Callable, List, Tuple
 import json
-from dotenv import load_dotenv
-import openai
-from colorama import init, Fore, Style
 
-# Initialize colorama for cross-platform colored output
-init()
+# Add the repository root to the Python path so we can import the utils modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from src.utils.sales_loader import validate_sales_file
+from src.utils.openai_client import (
+    DEFAULT_API_VERSION, ClientSettings, close_async_clients, create_async_client, load_environment
+)
+
+# Seconds a successful connection check is reused
+DEFAULT_CACHE_TTL = 900.0
+
+@lru_cache(maxsize=1)
+def _colors() -> Tuple:
+    """Initialize colorama for cross-platform colored output on first use."""
+    from colorama import init, Fore, Style
+    init()
+    return Fore, Style
 
 def print_status(message: str, success: bool = True) -> None:
     """Print a status message with color."""
+    Fore, Style = _colors()
     if success:
         print(f"{Fore.GREEN}✓{Style.RESET_ALL} {message}")
     else:
@@ -32,7 +56,7 @@ def check_python_version() -> Tuple[bool, str]:
 
 def check_environment_variables() -> Tuple[bool, List[str]]:
     """Check if all required environment variables are set."""
-    load_dotenv()
+    load_environment()
     
     required_vars = [
         "AZURE_OPENAI_API_KEY",
@@ -50,74 +74,201 @@ def check_sales_data() -> Tuple[bool, str]:
     if not os.path.exists(data_path):
         return False, "Sample sales data file not found"
     
+    # Stream through the records so large exports are checked in constant memory
+    return validate_sales_file(data_path)
+
+def _connection_cache_path(full_completion: bool) -> str:
+    """Cache file for the current endpoint, key, deployment and probe type."""
+    identity = "|".join([
+        os.getenv("AZURE_OPENAI_ENDPOINT", ""),
+        os.getenv("AZURE_OPENAI_API_KEY", ""),
+        os.getenv("AZURE_OPENAI_MODEL", ""),
+        os.getenv("AZURE_OPENAI_API_VERSION", DEFAULT_API_VERSION),
+        "completion" if full_completion else "models"
+    ])
+    digest = hashlib.sha256(identity.encode("utf-8")).hexdigest()[:16]
+    # A per-user directory: in the shared temp dir another user could plant a
+    # "validated" result
+    cache_dir = os.path.join(os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "workshop")
+    return os.path.join(cache_dir, f"azure-openai-validated-{digest}.json")
+
+def _owned_by_user(path: str) -> bool:
+    """True if the file belongs to the current user and nobody else can write it."""
+    if not hasattr(os, "getuid"):
+        return True
+    status = os.stat(path)
+    return status.st_uid == os.getuid() and not status.st_mode & 0o022
+
+def _cached_connection_ok(path: str, ttl: float) -> bool:
+    """Return True if this configuration passed the connection check within ttl seconds."""
+    if ttl <= 0:
+        return False
     try:
-        with open(data_path, 'r') as f:
-            json.load(f)
-        return True, "Sample sales data file is valid"
-    except json.JSONDecodeError:
-        return False, "Sample sales data file contains invalid JSON"
-    except Exception as e:
-        return False, f"Error reading sample sales data: {str(e)}"
+        if not _owned_by_user(path):
+            return False
+        with open(path, "r") as f:
+            validated_at = json.load(f)["validated_at"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return False
+    return 0 <= time.time() - validated_at <= ttl
+
+def _store_connection_ok(path: str) -> None:
+    temp_path = None
+    try:
+        cache_dir = os.path.dirname(path)
+        os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+        # mkstemp creates the file readable and writable by the current user only
+        fd, temp_path = tempfile.mkstemp(dir=cache_dir, prefix=f"{os.path.basename(path)}.", suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump({"validated_at": time.time()}, f)
+        os.replace(temp_path, path)
+    except OSError:
+        # The cache only saves time; failing to write it is not an error
+        if temp_path is not None and os.path.exists(temp_path):
+            os.remove(temp_path)
+
+async def check_azure_openai_connection(
+    full_completion: bool = False,
+    timeout: float = 10.0,
+    cache_ttl: float = DEFAULT_CACHE_TTL
+) -> Tuple[bool, str]:
+    """
+    Check that Azure OpenAI is reachable with the configured credentials.
 
-def test_azure_openai_connection() -> Tuple[bool, str]:
-    """Test connection to Azure OpenAI service."""
+    Args:
+        full_completion (bool): Send a test chat completion to the deployment
+            instead of the cheaper models listing, which only checks the
+            endpoint and key
+        timeout (float): Request timeout in seconds
+        cache_ttl (float): Reuse a successful result for this many seconds; 0
+            always probes
+
+    Returns:
+        Tuple[bool, str]: Success and a status message
+    """
+    cache_path = _connection_cache_path(full_completion)
+    if _cached_connection_ok(cache_path, cache_ttl):
+        return True, "Connected to Azure OpenAI (cached result)"
+
+    settings = ClientSettings(read_timeout=timeout, connect_timeout=timeout, max_retries=0)
+    # Importing the SDK takes a while; do it off the event loop so other checks proceed
+    client = await asyncio.to_thread(create_async_client, settings)
     try:
-        openai.api_type = "azure"
-        openai.api_version = "2023-05-15"
-        openai.api_key = os.getenv("AZURE_OPENAI_API_KEY")
-        openai.api_base = os.getenv("AZURE_OPENAI_ENDPOINT")
-        
-        # Simple test completion
-        response = openai.ChatCompletion.create(
-            engine=os.getenv("AZURE_OPENAI_MODEL"),
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant."},
-                {"role": "user", "content": "Say 'Connection successful' if you can read this."}
-            ],
-            max_tokens=50
-        )
-        
-        if "Connection successful" in response.choices[0].message.content.lower():
-            return True, "Successfully connected to Azure OpenAI"
+        if full_completion:
+            response = await client.chat.completions.create(
+                model=os.getenv("AZURE_OPENAI_MODEL"),
+                messages=[
+                    {"role": "system", "content": "You are a helpful assistant."},
+                    {"role": "user", "content": "Say 'Connection successful' if you can read this."}
+                ],
+                max_tokens=50
+            )
+            content = response.choices[0].message.content or ""
+            if "connection successful" not in content.lower():
+                return False, "Connected to Azure OpenAI but received unexpected response"
         else:
-            return False, "Connected to Azure OpenAI but received unexpected response"
-            
+            await client.models.list()
     except Exception as e:
         return False, f"Failed to connect to Azure OpenAI: {str(e)}"
+    finally:
+        await client.close()
 
-def main():
-    """Run all validation checks."""
-    print(f"\n{Fore.CYAN}🔍 Running setup validation...{Style.RESET_ALL}\n")
-    
-    # Check Python version
-    python_success, python_message = check_python_version()
-    print_status(python_message, python_success)
-    
-    # Check environment variables
+    _store_connection_ok(cache_path)
+    return True, "Successfully connected to Azure OpenAI"
+
+def test_azure_openai_connection(full_completion: bool = True) -> Tuple[bool, str]:
+    """Test connection to Azure OpenAI service, bypassing the result cache."""
+    return asyncio.run(check_azure_openai_connection(full_completion, cache_ttl=0))
+
+async def _timed_check(name: str, check: Callable[[], Awaitable[Tuple[bool, str]]], timeout: float) -> Tuple[bool, str, float]:
+    """Run one check under a timeout, turning errors into a failed result."""
+    label = name.replace("_", " ").capitalize()
+    start = time.perf_counter()
+    try:
+        success, message = await asyncio.wait_for(check(), timeout)
+    except asyncio.TimeoutError:
+        success, message = False, f"{label} check timed out after {timeout:g}s"
+    except Exception as e:
+        success, message = False, f"{label} check failed: {str(e)}"
+    return success, message, time.perf_counter() - start
+
+async def run_checks(
+    full_completion: bool = False,
+    timeout: float = 10.0,
+    cache_ttl: float = DEFAULT_CACHE_TTL
+) -> List[Tuple[str, bool, str, float]]:
+    """
+    Run the validation checks, independent ones concurrently.
+
+    The environment check runs first because the connection check needs its
+    variables; the others run at the same time, each under its own timeout.
+
+    Args:
+        full_completion (bool): Use a test completion as the connection check
+        timeout (float): Per-check timeout in seconds
+        cache_ttl (float): Seconds a successful connection check is reused
+
+    Returns:
+        List[Tuple]: (check name, success, message, seconds) in display order
+    """
+    start = time.perf_counter()
     env_success, missing_vars = check_environment_variables()
     if env_success:
-        print_status("All required environment variables are set")
+        env_message = "All required environment variables are set"
     else:
-        print_status(f"Missing environment variables: {', '.join(missing_vars)}", False)
-    
-    # Check sample data
-    data_success, data_message = check_sales_data()
-    print_status(data_message, data_success)
-    
-    # Test Azure OpenAI connection
+        env_message = f"Missing environment variables: {', '.join(missing_vars)}"
+    env_result = ("environment", env_success, env_message, time.perf_counter() - start)
+
+    checks = {
+        "python": lambda: asyncio.to_thread(check_python_version),
+        "sales_data": lambda: asyncio.to_thread(check_sales_data),
+    }
     if env_success:
-        connection_success, connection_message = test_azure_openai_connection()
-        print_status(connection_message, connection_success)
-    
+        checks["connection"] = lambda: check_azure_openai_connection(full_completion, timeout, cache_ttl)
+    try:
+        results = await asyncio.gather(*(_timed_check(name, check, timeout) for name, check in checks.items()))
+    finally:
+        # Close any shared clients the checks created before the loop ends
+        await close_async_clients()
+    by_name = {name: (name, *result) for name, result in zip(checks, results)}
+
+    ordered = [by_name["python"], env_result, by_name["sales_data"]]
+    if "connection" in by_name:
+        ordered.append(by_name["connection"])
+    return ordered
+
+def main():
+    """Run all validation checks."""
+    parser = argparse.ArgumentParser(description="Validate the workshop setup")
+    parser.add_argument("--full", action="store_true",
+                        help="Check the deployment with a test completion instead of listing models")
+    parser.add_argument("--timeout", type=float, default=10.0, help="Per-check timeout in seconds")
+    parser.add_argument("--cache-ttl", type=float, default=None,
+                        help=f"Seconds a successful connection check is reused "
+                             f"(VALIDATE_SETUP_CACHE_TTL, default {DEFAULT_CACHE_TTL:g})")
+    parser.add_argument("--no-cache", action="store_true", help="Always contact Azure OpenAI")
+    parser.add_argument("--verbose", action="store_true", help="Show how long each check took")
+    args = parser.parse_args()
+
+    if args.no_cache:
+        cache_ttl = 0.0
+    elif args.cache_ttl is not None:
+        cache_ttl = args.cache_ttl
+    else:
+        load_environment()
+        cache_ttl = float(os.getenv("VALIDATE_SETUP_CACHE_TTL", DEFAULT_CACHE_TTL))
+
+    Fore, Style = _colors()
+    print(f"\n{Fore.CYAN}🔍 Running setup validation...{Style.RESET_ALL}\n")
+
+    results = asyncio.run(run_checks(args.full, args.timeout, cache_ttl))
+    for name, success, message, seconds in results:
+        print_status(f"{message} ({seconds * 1000:.0f} ms)" if args.verbose else message, success)
+
     # Overall status
     print(f"\n{Fore.CYAN}📋 Validation Summary:{Style.RESET_ALL}")
-    all_checks_passed = all([
-        python_success,
-        env_success,
-        data_success,
-        env_success and connection_success
-    ])
-    
+    all_checks_passed = len(results) == 4 and all(success for _, success, _, _ in results)
+
     if all_checks_passed:
         print(f"\n{Fore.GREEN}✅ All checks passed! You're ready to start the workshop!{Style.RESET_ALL}")
     else:
@@ -0,0 +1,11 @@
+"""
+Pytest configuration for the unit tests.
+
+    python -m pytest tests
+"""
+
+import os
+import sys
+
+# Add the repository root to the Python path so we can import the utils modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,112 @@
+"""
+Unit tests for the adaptive (AIMD) concurrency limiter.
+"""
+
+import time
+import asyncio
+import threading
+
+import pytest
+
+from src.utils.adaptive_limiter import AdaptiveConcurrencyLimiter
+
+
+async def contend(limiter, tasks=6, hold=0.01):
+    peak = 0
+
+    async def worker():
+        nonlocal peak
+        async with limiter.slot():
+            peak = max(peak, limiter.stats()["in_flight"])
+            await asyncio.sleep(hold)
+
+    await asyncio.gather(*(worker() for _ in range(tasks)))
+    return peak
+
+
+def test_window_caps_in_flight_requests():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=2)
+    assert asyncio.run(contend(limiter)) == 2
+    assert limiter.stats()["in_flight"] == 0
+
+
+def test_growing_window_admits_a_waiter():
+    async def scenario():
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=1)
+        held = asyncio.Event()
+        release = asyncio.Event()
+
+        async def holder():
+            async with limiter.slot():
+                held.set()
+                await release.wait()
+
+        async def waiter():
+            async with limiter.slot():
+                return True
+
+        holding = asyncio.ensure_future(holder())
+        await held.wait()
+        waiting = asyncio.ensure_future(waiter())
+        await asyncio.sleep(0.01)
+        assert not waiting.done()
+
+        # Enough successes to grow the window from 1 to 2
+        limiter.on_success()
+        admitted = await asyncio.wait_for(waiting, timeout=1)
+        release.set()
+        await holding
+        return admitted
+
+    assert asyncio.run(scenario())
+
+
+def test_limiter_is_reusable_across_event_loops():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=1)
+    assert asyncio.run(contend(limiter)) == 1
+    assert asyncio.run(contend(limiter)) == 1
+
+
+def test_release_on_another_loop_wakes_waiter():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=1)
+    held = threading.Event()
+
+    async def hold_in_thread():
+        async with limiter.slot():
+            held.set()
+            await asyncio.sleep(0.1)
+
+    thread = threading.Thread(target=lambda: asyncio.run(hold_in_thread()))
+    thread.start()
+    held.wait()
+
+    async def acquire():
+        start = time.monotonic()
+        async with limiter.slot():
+            return time.monotonic() - start
+
+    waited = asyncio.run(asyncio.wait_for(acquire(), timeout=2))
+    thread.join()
+    assert 0.0 < waited < 1.0
+
+
+def test_cancelled_waiter_is_forgotten():
+    async def scenario():
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=1)
+        async with limiter.slot():
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(limiter.slot().__aenter__(), timeout=0.01)
+            assert limiter._waiters == []
+        assert limiter.stats()["in_flight"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_throttle_halves_window_once_per_burst():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=8)
+    sent_at = time.monotonic()
+    limiter.on_throttle(sent_at)
+    # A second 429 from a request sent before the first decrease is ignored
+    limiter.on_throttle(sent_at)
+    assert limiter.limit == 4
+    assert limiter.stats()["throttles"] == 2
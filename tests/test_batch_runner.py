@@ -0,0 +1,112 @@
+"""
+Unit tests for the resumable batch runner.
+"""
+
+import io
+import json
+import asyncio
+
+import pytest
+
+from src.utils.batch_runner import BatchProgress, Checkpoint, run_batch
+
+
+class FakeHelper:
+    """Stands in for AzureOpenAIHelper; prompts listed in failing raise once."""
+
+    def __init__(self, failing=(), delay=0.0):
+        self.failing = set(failing)
+        self.delay = delay
+        self.prompts = []
+
+    async def generate_completion(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        await asyncio.sleep(self.delay)
+        if prompt in self.failing:
+            self.failing.discard(prompt)
+            raise RuntimeError("throttled")
+        return prompt.upper()
+
+
+def write_requests(path, ids):
+    with open(path, "w", encoding="utf-8") as f:
+        for request_id in ids:
+            f.write(json.dumps({"id": request_id, "prompt": f"p{request_id}"}) + "\n")
+
+
+def latest_results(path):
+    results = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            result = json.loads(line)
+            results[result["id"]] = result
+    return results
+
+
+def run(helper, input_path, output_path, **kwargs):
+    return asyncio.run(run_batch(
+        helper, str(input_path), str(output_path), concurrency=4, out=io.StringIO(), **kwargs
+    ))
+
+
+def test_failed_requests_rerun_and_completed_are_skipped(tmp_path):
+    input_path, output_path = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    write_requests(input_path, range(20))
+
+    first = FakeHelper(failing={"p3", "p17"})
+    summary = run(first, input_path, output_path)
+    assert summary == {"succeeded": 18, "failed": 2, "skipped": 0, "total": 20}
+
+    second = FakeHelper()
+    summary = run(second, input_path, output_path)
+    assert sorted(second.prompts) == ["p17", "p3"]
+    assert summary == {"succeeded": 2, "failed": 0, "skipped": 18, "total": 20}
+
+    results = latest_results(output_path)
+    assert len(results) == 20
+    assert all(result["error"] is None for result in results.values())
+
+
+def test_interrupted_run_resumes_without_repeating(tmp_path):
+    input_path, output_path = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    write_requests(input_path, range(40))
+
+    async def interrupted():
+        task = asyncio.ensure_future(run_batch(
+            FakeHelper(delay=0.01), str(input_path), str(output_path),
+            concurrency=4, out=io.StringIO()
+        ))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(interrupted())
+    checkpoint = Checkpoint(str(output_path) + ".done")
+    completed = len(checkpoint)
+    checkpoint.close()
+    assert 0 < completed < 40
+
+    helper = FakeHelper()
+    summary = run(helper, input_path, output_path)
+    assert summary["succeeded"] == 40 - completed
+    assert len(helper.prompts) == 40 - completed
+    assert len(latest_results(output_path)) == 40
+
+
+def test_duplicate_ids_run_once(tmp_path):
+    input_path, output_path = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    write_requests(input_path, [1, 2, 1, 3, 2])
+
+    helper = FakeHelper()
+    summary = run(helper, input_path, output_path)
+    assert sorted(helper.prompts) == ["p1", "p2", "p3"]
+    assert summary["skipped"] == 2
+
+
+def test_total_is_estimated_from_bytes_read():
+    progress = BatchProgress(None, 0, io.StringIO(), size=10_000)
+    assert progress.estimated_total() is None
+    progress.requests_read, progress.bytes_read = 50, 1_000
+    assert progress.estimated_total() == 500
+    assert BatchProgress(42, 0, io.StringIO(), size=10_000).estimated_total() == 42
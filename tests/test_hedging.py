@@ -0,0 +1,69 @@
+"""
+Unit tests for request hedging.
+"""
+
+import asyncio
+
+import pytest
+
+from src.utils.hedging import HedgingPolicy, mark_attempt
+
+
+def test_cancelled_caller_cancels_pending_attempt():
+    async def scenario():
+        policy = HedgingPolicy(initial_delay=10.0)
+        cancelled = asyncio.Event()
+
+        async def call():
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        # Time out while the policy is still waiting on the hedging threshold
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(policy.run("completion", call), timeout=0.05)
+        return cancelled.is_set(), policy.stats()
+
+    attempt_cancelled, stats = asyncio.run(scenario())
+    assert attempt_cancelled
+    assert stats["cancelled"] == 1
+
+
+def test_hedge_wins_and_loser_is_discarded():
+    async def scenario():
+        policy = HedgingPolicy(max_extra_ratio=1.0, initial_delay=0.01)
+        delays = [0.5, 0.0]
+        discarded = []
+
+        async def call():
+            delay = delays.pop(0)
+            await asyncio.sleep(delay)
+            return delay
+
+        async def discard(result):
+            discarded.append(result)
+
+        return await policy.run("completion", call, discard=discard), discarded, policy.stats()
+
+    result, discarded, stats = asyncio.run(scenario())
+    assert result == 0.0
+    assert discarded == []
+    assert stats["hedged"] == 1 and stats["hedge_wins"] == 1 and stats["cancelled"] == 1
+
+
+def test_latency_excludes_waits_before_last_attempt():
+    async def scenario():
+        policy = HedgingPolicy(min_samples=1)
+
+        async def call():
+            # Backoff before a retry, then the attempt itself
+            await asyncio.sleep(0.2)
+            mark_attempt()
+            await asyncio.sleep(0.01)
+
+        await policy.run("completion", call)
+        return policy.delay("completion")
+
+    assert asyncio.run(scenario()) < 0.1
@@ -0,0 +1,40 @@
+"""
+Unit tests for the load test report.
+"""
+
+from src.utils.load_test import LoadTestConfig, LoadTestReport, histogram
+
+
+def sample(latency_ms, ttft_ms, tokens_per_second, error=None):
+    return {
+        "phase": "measure",
+        "error": error,
+        "latency_ms": latency_ms,
+        "ttft_ms": ttft_ms,
+        "tokens_per_second": tokens_per_second,
+    }
+
+
+def test_histogram_buckets_are_inclusive_with_overflow():
+    assert histogram([1, 2, 3, 10], [2, 5]) == {"<=2": 2, "<=5": 1, ">5": 1}
+
+
+def test_report_has_latency_ttft_and_throughput_histograms():
+    report = LoadTestReport(LoadTestConfig())
+    report.measure_started_at, report.finished_at = 0.0, 10.0
+    report.record(sample(80, 40, 4))
+    report.record(sample(900, 300, 50))
+    report.record(sample(40000, None, None))
+    report.record(sample(0, None, None, error="timeout"))
+
+    summary = report.to_dict()["summary"]
+    assert summary["latency_histogram_ms"]["<=100"] == 1
+    assert summary["latency_histogram_ms"][">30000"] == 1
+    # Requests without a first token or a token rate are left out, not bucketed as zero
+    assert sum(summary["ttft_histogram_ms"].values()) == 2
+    assert summary["ttft_histogram_ms"]["<=50"] == 1
+    assert sum(summary["tokens_per_second_histogram"].values()) == 2
+    assert summary["tokens_per_second_histogram"]["<=60"] == 1
+
+    console = report.format_console()
+    assert "TTFT (ms)" in console and "<=50:1" in console
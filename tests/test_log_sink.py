@@ -0,0 +1,47 @@
+"""
+Unit tests for the background completion log sink.
+"""
+
+import json
+import threading
+
+import pytest
+
+from src.utils.log_sink import CompletionLogSink
+
+
+def test_every_write_is_written_or_counted_as_dropped(tmp_path):
+    path = tmp_path / "completions.jsonl"
+    sink = CompletionLogSink(str(path), flush_interval=0.01, max_queue=50)
+    writers, per_writer = 8, 500
+
+    def write_many(writer):
+        for i in range(per_writer):
+            sink.write({"writer": writer, "i": i})
+
+    threads = [threading.Thread(target=write_many, args=(writer,)) for writer in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    sink.close()
+
+    stats = sink.stats()
+    with open(path) as f:
+        lines = [json.loads(line) for line in f]
+    assert stats["written"] == len(lines)
+    assert stats["written"] + stats["dropped"] == writers * per_writer
+
+
+def test_unserializable_entry_is_dropped_not_fatal(tmp_path):
+    path = tmp_path / "completions.jsonl"
+    sink = CompletionLogSink(str(path), flush_interval=0.01)
+    sink.write({"bad": object()})
+    sink.write({"good": 1})
+    assert sink.flush(timeout=5)
+    sink.close()
+
+    assert sink.stats()["dropped"] == 1
+    assert path.read_text().strip() == '{"good": 1}'
+    with pytest.raises(RuntimeError):
+        sink.write({"late": True})
@@ -0,0 +1,79 @@
+"""
+Unit tests for token-bounded chunking and map-reduce prompt budgets.
+"""
+
+import asyncio
+
+import pytest
+
+from src.utils.azure_openai_utils import AzureOpenAIHelper
+from src.utils.chunking import group_texts, partition_records
+from src.utils.prompt_serializers import count_tokens
+
+MAP_PROMPT = "Summarize these sales:\n{sales_data}"
+
+
+def make_records(count):
+    return [
+        {
+            "transaction_id": f"T{i:05d}",
+            "date": f"2024-{i % 12 + 1:02d}-01",
+            "customer": {"id": f"C{i % 7}", "name": f"Customer {i % 7}", "segment": "Enterprise"},
+            "product": {"id": f"P{i % 5}", "name": f"Product {i % 5}", "category": "Software"},
+            "quantity": i % 9 + 1,
+            "unit_price": 99.5,
+        }
+        for i in range(count)
+    ]
+
+
+def make_helper():
+    helper = AzureOpenAIHelper(
+        endpoint="https://example.openai.azure.com/", api_key="test", model="gpt-4", env_layers=False
+    )
+    prompts = []
+
+    async def generate_completion(prompt, **kwargs):
+        prompts.append(prompt)
+        return "partial"
+
+    helper.generate_completion = generate_completion
+    return helper, prompts
+
+
+def test_partitions_never_mix_keys_and_keep_every_record():
+    records = make_records(60)
+    chunks = partition_records(records, max_tokens=400, partition_by="date")
+    assert sum(len(chunk) for _, chunk in chunks) == 60
+    for _, chunk in chunks:
+        assert len({record["date"][:7] for record in chunk}) == 1
+
+
+def test_group_texts_always_shrinks():
+    groups = group_texts(["x" * 400] * 5, max_tokens=10)
+    assert all(len(group) >= 2 for group in groups)
+    assert len(groups) < 5
+
+
+@pytest.mark.parametrize("mode", ["raw", "pretty", "minified", "csv", "auto"])
+def test_map_prompts_fit_the_budget_in_every_mode(mode):
+    helper, prompts = make_helper()
+    max_prompt_tokens = 1500
+    result = asyncio.run(helper.generate_map_reduce(
+        MAP_PROMPT, {"sales_records": make_records(200)}, max_prompt_tokens=max_prompt_tokens, mode=mode
+    ))
+    assert result == "partial"
+    map_prompts = [prompt for prompt in prompts if "Summarize these sales" in prompt]
+    assert map_prompts
+    assert all(count_tokens(prompt, helper.model) <= max_prompt_tokens for prompt in map_prompts)
+
+
+def test_reduce_prompt_over_budget_is_rejected_before_any_call():
+    helper, prompts = make_helper()
+    with pytest.raises(ValueError, match="reduce prompt"):
+        asyncio.run(helper.generate_map_reduce(
+            MAP_PROMPT, {"sales_records": make_records(10)},
+            reduce_prompt="Combine: " + "word " * 400 + "{partial_results}",
+            max_prompt_tokens=200
+        ))
+    assert prompts == []
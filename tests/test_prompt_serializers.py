@@ -0,0 +1,57 @@
+"""
+Unit tests for the prompt serializers.
+"""
+
+import json
+
+import pytest
+
+from src.utils.prompt_serializers import (
+    RECORDS_KEY,
+    SERIALIZERS,
+    select_serialization,
+    serialize_csv,
+)
+
+# Both rows rendered as "1,,1" before None and typed cells were told apart
+AMBIGUOUS_RECORDS = [
+    {"transaction_id": "1", "note": None, "q": 1},
+    {"transaction_id": 1, "note": "", "q": "1"},
+]
+
+
+@pytest.mark.parametrize("record", AMBIGUOUS_RECORDS)
+def test_ambiguous_tables_fall_back_to_json(record):
+    sales_data = {RECORDS_KEY: [record]}
+    for mode in ("csv", "tsv", "normalized"):
+        assert not SERIALIZERS[mode][1](sales_data)
+
+    mode, text = select_serialization(sales_data)
+    assert mode in ("pretty", "minified")
+    assert json.loads(text) == sales_data
+
+
+def test_none_and_missing_render_differently():
+    first = serialize_csv({RECORDS_KEY: [AMBIGUOUS_RECORDS[0]]})
+    second = serialize_csv({RECORDS_KEY: [AMBIGUOUS_RECORDS[1]]})
+    assert first != second
+    assert "1,null,1" in first
+
+    partial = serialize_csv({RECORDS_KEY: [{"a": 1, "b": None}, {"a": 2}]})
+    assert partial.splitlines()[-2:] == ["1,null", "2,"]
+
+
+def test_consistent_columns_use_a_table():
+    sales_data = {RECORDS_KEY: [
+        {"transaction_id": f"T{i:03d}", "quantity": i, "note": None if i % 2 else "gift",
+         "customer": {"id": "C1", "name": "Ada"}}
+        for i in range(20)
+    ]}
+    assert SERIALIZERS["csv"][1](sales_data)
+    mode, _ = select_serialization(sales_data)
+    assert mode not in ("pretty", "minified")
+
+
+def test_mixed_column_types_are_not_faithful():
+    sales_data = {RECORDS_KEY: [{"transaction_id": "T1", "q": 1}, {"transaction_id": "T2", "q": 1.5}]}
+    assert not SERIALIZERS["csv"][1](sales_data)
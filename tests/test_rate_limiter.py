@@ -0,0 +1,82 @@
+"""
+Unit tests for the token bucket rate limiter and its use by the helper.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import openai
+
+from src.utils import azure_openai_utils
+from src.utils.azure_openai_utils import AzureOpenAIHelper
+from src.utils.hedging import HedgingPolicy
+from src.utils.rate_limiter import TokenBucketRateLimiter
+
+# 10 tokens/s refill and a 10,000-token bucket, so refill barely moves the numbers
+TOKENS_PER_MINUTE = 600
+BURST_SECONDS = 1000
+CAPACITY = 10_000
+USED_TOKENS = 10
+
+
+class FakeCompletions:
+    """Plays back one outcome per call: "ok", "429" or "slow"."""
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+
+    async def create(self, **request):
+        outcome = self.outcomes.pop(0)
+        if outcome == "429":
+            raise openai.RateLimitError(
+                "throttled",
+                response=httpx.Response(429, request=httpx.Request("POST", "https://example.test")),
+                body=None
+            )
+        if outcome == "slow":
+            await asyncio.sleep(60)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))],
+            usage=SimpleNamespace(prompt_tokens=5, total_tokens=USED_TOKENS, prompt_tokens_details=None)
+        )
+
+
+def make_helper(outcomes, **kwargs):
+    client = SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions(outcomes)))
+    limiter = TokenBucketRateLimiter(tokens_per_minute=TOKENS_PER_MINUTE, burst_seconds=BURST_SECONDS)
+    helper = AzureOpenAIHelper(
+        endpoint="https://example.openai.azure.com/", api_key="test", model="gpt-4",
+        client=client, rate_limiter=limiter, env_layers=False, **kwargs
+    )
+    return helper, limiter
+
+
+def test_refund_is_capped_at_capacity():
+    limiter = TokenBucketRateLimiter(tokens_per_minute=TOKENS_PER_MINUTE, burst_seconds=BURST_SECONDS)
+    asyncio.run(limiter.acquire(1000))
+    assert limiter.remaining()["tokens"] < CAPACITY - 900
+    limiter.refund(5000)
+    assert limiter.remaining()["tokens"] == CAPACITY
+
+
+def test_failed_attempts_give_their_tokens_back(monkeypatch):
+    monkeypatch.setattr(azure_openai_utils, "backoff_delay", lambda *args, **kwargs: 0)
+    helper, limiter = make_helper(["429", "429", "ok"])
+
+    completion = asyncio.run(helper.generate_completion("hello", max_tokens=1000, temperature=0))
+    assert completion == "ok"
+    # Only the successful attempt's actual usage is charged
+    assert limiter.remaining()["tokens"] >= CAPACITY - USED_TOKENS
+    assert limiter.stats()["requests"] == 3
+
+
+def test_cancelled_hedge_gives_its_tokens_back():
+    helper, limiter = make_helper(
+        ["slow", "ok"], hedging=HedgingPolicy(max_extra_ratio=1.0, initial_delay=0.01)
+    )
+
+    completion = asyncio.run(helper.generate_completion("hello", max_tokens=1000, temperature=0))
+    assert completion == "ok"
+    assert helper.hedging_stats()["hedge_wins"] == 1
+    assert limiter.remaining()["tokens"] >= CAPACITY - USED_TOKENS
@@ -0,0 +1,80 @@
+"""
+Unit tests for the two-tier response cache.
+"""
+
+import time
+import asyncio
+
+from src.utils.response_cache import ResponseCache, make_cache_key
+
+MESSAGES = [{"role": "user", "content": "Summarize Q1 sales"}]
+
+
+def test_key_depends_on_every_request_field():
+    base = make_cache_key("gpt-4", MESSAGES, 0, 100, "https://eastus.openai.azure.com/")
+    assert base == make_cache_key("gpt-4", MESSAGES, 0.0, 100, "https://eastus.openai.azure.com/")
+    variants = [
+        make_cache_key("gpt-4", MESSAGES, 0, 100, "https://westeurope.openai.azure.com/"),
+        make_cache_key("gpt-4", MESSAGES, 0, 100),
+        make_cache_key("gpt-35", MESSAGES, 0, 100, "https://eastus.openai.azure.com/"),
+        make_cache_key("gpt-4", MESSAGES, 0.5, 100, "https://eastus.openai.azure.com/"),
+        make_cache_key("gpt-4", MESSAGES, 0, 200, "https://eastus.openai.azure.com/"),
+    ]
+    assert base not in variants
+    assert len(set(variants)) == len(variants)
+
+
+def test_disk_tier_survives_a_new_instance(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = ResponseCache(path)
+    cache.set("k", "cached answer")
+    cache.close()
+
+    reopened = ResponseCache(path)
+    assert reopened.get("k") == "cached answer"
+    assert reopened.get("k") == "cached answer"
+    stats = reopened.stats()
+    assert (stats["disk_hits"], stats["memory_hits"]) == (1, 1)
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = ResponseCache(path=None, max_memory_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")
+    cache.set("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1" and cache.get("c") == "3"
+
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), ttl_seconds=0.05)
+    cache.set("k", "v")
+    time.sleep(0.1)
+    assert cache.get("k") is None
+    assert cache.stats()["expired"] >= 1
+
+
+def test_disk_tier_stays_under_its_size_limit(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), max_memory_entries=1, max_disk_bytes=250)
+    for i in range(5):
+        cache.set(f"k{i}", "x" * 100)
+    assert cache.get("k4") == "x" * 100
+    assert cache.get("k0") is None
+    assert cache.stats()["evictions"] > 0
+
+
+def test_async_access_matches_sync(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+
+    async def scenario():
+        await cache.set_async("k", "v")
+        return await cache.get_async("k"), await cache.get_async("missing")
+
+    assert asyncio.run(scenario()) == ("v", None)
+
+
+def test_only_deterministic_requests_are_cacheable_by_default():
+    assert ResponseCache(path=None).is_cacheable(0)
+    assert not ResponseCache(path=None).is_cacheable(0.7)
+    assert ResponseCache(path=None, cache_nonzero_temperature=True).is_cacheable(0.7)
@@ -0,0 +1,167 @@
+"""
+Unit tests for the multi-backend endpoint router.
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+from src.utils import router as router_module
+from src.utils.adaptive_limiter import ThrottledError
+from src.utils.router import Backend, EndpointRouter
+
+
+def status_error(error_class, status_code):
+    response = httpx.Response(status_code, request=httpx.Request("POST", "https://example.test"))
+    return error_class("failed", response=response, body=None)
+
+
+class FakeStream:
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+        self.closed = False
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            await asyncio.sleep(0)
+            yield chunk
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeCompletions:
+    """Plays back one outcome per call: a response, a stream or an exception."""
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.models = []
+
+    async def create(self, **request):
+        self.models.append(request["model"])
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+@pytest.fixture
+def clients(monkeypatch):
+    """Endpoint -> fake completions; the router's client lookup is redirected here."""
+    by_endpoint = {}
+
+    def get_async_client(settings):
+        return SimpleNamespace(chat=SimpleNamespace(completions=by_endpoint[settings.endpoint]))
+
+    monkeypatch.setattr(router_module, "get_async_client", get_async_client)
+    return by_endpoint
+
+
+def make_router(clients, outcomes_by_backend, **kwargs):
+    backends = []
+    for i, outcomes in enumerate(outcomes_by_backend):
+        endpoint = f"https://backend{i}.openai.azure.com/"
+        clients[endpoint] = FakeCompletions(outcomes)
+        backends.append(Backend(endpoint, f"deployment{i}", api_key="test"))
+    kwargs.setdefault("health_check_interval", None)
+    return EndpointRouter(backends, **kwargs)
+
+
+def test_throttled_backend_fails_over_and_cools_down(clients):
+    router = make_router(clients, [[status_error(openai.RateLimitError, 429)], ["ok"]])
+    # Make backend0 the first choice
+    router.backends[1].outstanding = 5
+
+    assert asyncio.run(router.create(model="ignored", messages=[])) == "ok"
+    first, second = router.backends
+    assert clients[first.endpoint].models == ["deployment0"]
+    assert clients[second.endpoint].models == ["deployment1"]
+    assert first.cooldown_until > time.monotonic()
+    assert second._stats["failovers"] == 1
+    assert first.outstanding == 0 and second.outstanding == 5
+
+
+def test_client_errors_are_not_failed_over(clients):
+    router = make_router(clients, [[status_error(openai.BadRequestError, 400)], ["ok"]])
+    router.backends[1].outstanding = 5
+    with pytest.raises(openai.BadRequestError):
+        asyncio.run(router.create(model="ignored", messages=[]))
+    assert clients[router.backends[1].endpoint].models == []
+
+
+def test_repeated_server_errors_eject_a_backend(clients):
+    errors = [status_error(openai.InternalServerError, 500) for _ in range(2)]
+    router = make_router(clients, [errors], eject_after=2)
+    backend = router.backends[0]
+    for _ in range(2):
+        with pytest.raises(openai.InternalServerError):
+            asyncio.run(router.create(model="ignored", messages=[]))
+    assert not backend.available(time.monotonic())
+    assert backend.stats()["ejections"] == 1
+
+
+def test_stream_stays_outstanding_until_consumed(clients):
+    stream = FakeStream(["a", "b"])
+    router = make_router(clients, [[stream]])
+    backend = router.backends[0]
+
+    async def scenario():
+        response = await router.create(model="ignored", messages=[], stream=True)
+        assert backend.outstanding == 1
+        chunks = [chunk async for chunk in response]
+        return chunks
+
+    assert asyncio.run(scenario()) == ["a", "b"]
+    assert backend.outstanding == 0
+
+
+def test_closed_stream_is_released_once(clients):
+    stream = FakeStream(["a"])
+    router = make_router(clients, [[stream]])
+    backend = router.backends[0]
+
+    async def scenario():
+        response = await router.create(model="ignored", messages=[], stream=True)
+        await response.close()
+        await response.close()
+
+    asyncio.run(scenario())
+    assert stream.closed
+    assert backend.outstanding == 0
+
+
+def test_long_outage_raises_throttled_instead_of_waiting(clients):
+    router = make_router(clients, [["ok"], ["ok"]], max_unavailable_wait=0.1)
+    for backend in router.backends:
+        backend.cooldown_until = time.monotonic() + 30
+
+    start = time.monotonic()
+    with pytest.raises(ThrottledError) as error:
+        asyncio.run(router.create(model="ignored", messages=[]))
+    assert time.monotonic() - start < 1
+    assert error.value.retry_after > 20
+
+
+def test_short_outage_waits_for_the_first_backend(clients):
+    router = make_router(clients, [["ok"]], max_unavailable_wait=1.0)
+    router.backends[0].cooldown_until = time.monotonic() + 0.05
+    assert asyncio.run(router.create(model="ignored", messages=[])) == "ok"
+
+
+def test_aclose_stops_health_checks(clients):
+    router = make_router(clients, [["ok"]], health_check_interval=60)
+
+    async def scenario():
+        await router.create(model="ignored", messages=[])
+        task = router._health_task
+        assert task is not None and not task.done()
+        await router.aclose()
+        return task
+
+    task = asyncio.run(scenario())
+    assert task.cancelled()
+    assert router._health_task is None
@@ -0,0 +1,64 @@
+"""
+Unit tests for the compact sales store.
+"""
+
+import pytest
+
+from src.utils.sales_store import SalesStore
+
+
+def make_record(transaction_id, day, customer_id="C1", quantity=2, **fields):
+    record = {
+        "transaction_id": transaction_id,
+        "date": f"2024-03-{day:02d}" if day else None,
+        "customer": {"id": customer_id, "name": f"Customer {customer_id}", "segment": "SMB"},
+        "product": {"id": "P1", "name": "Widget", "category": "Hardware"},
+        "quantity": quantity,
+        "total_amount": 250.0,
+        "sales_rep": "Alice",
+        "interaction_history": [{"date": "2024-02-01", "type": "call", "notes": "intro"}],
+    }
+    record.update(fields)
+    return record
+
+
+def test_records_round_trip_exactly():
+    records = [
+        make_record("T1", 1),
+        make_record("T2", 2, customer_id="C2"),
+        # Same id, different nested fields: kept per row, not deduplicated
+        make_record("T3", 3, customer={"id": "C1", "name": "Renamed", "segment": "SMB"}),
+        make_record("T4", 4, customer=None, extra_field="kept"),
+    ]
+    del records[1]["sales_rep"]
+    store = SalesStore.from_records(records)
+    assert [store.record(row) for row in range(len(store))] == records
+
+
+def test_missing_and_null_dates_are_kept_and_never_in_range():
+    with_null = make_record("T1", None)
+    without = make_record("T2", 5)
+    del without["date"]
+    store = SalesStore.from_records([with_null, without, make_record("T3", 10)])
+
+    assert store.record(0)["date"] is None
+    assert "date" not in store.record(1)
+    assert store.view(1).date is None
+    assert store.rows_in_date_range() == [2]
+    assert store.rows_where(end_date="2024-03-31") == [2]
+    assert store.rows_where(customer_id="C1") == [0, 1, 2]
+
+
+@pytest.mark.parametrize("quantity", [1.5, "3", None, True])
+def test_non_whole_quantity_is_rejected_without_a_partial_row(quantity):
+    store = SalesStore.from_records([make_record("T1", 1)])
+    with pytest.raises(ValueError, match="whole number"):
+        store.add(make_record("T2", 2, quantity=quantity))
+    assert len(store) == 1
+    assert store.record(0) == make_record("T1", 1)
+
+
+def test_integral_float_quantity_is_accepted():
+    store = SalesStore.from_records([make_record("T1", 1, quantity=3.0)])
+    assert store.view(0).quantity == 3
+    assert store.group_by("customer_id", measure="quantity") == {"C1": 3}
@@ -0,0 +1,57 @@
+"""
+Unit tests for the MinHash similarity cache.
+"""
+
+import numpy as np
+
+from src.utils import similarity_cache as similarity_module
+from src.utils.similarity_cache import SimilarityCache
+
+REPORT = " ".join(f"Region {i} sold {i * 7} units of product {i % 5} in March." for i in range(40))
+
+
+def test_near_duplicate_is_served_and_unrelated_prompt_is_not():
+    cache = SimilarityCache(threshold=0.8)
+    cache.add("k1", REPORT, "cached analysis")
+
+    match = cache.lookup(REPORT.replace("March.", "March!", 1))
+    assert match is not None and match.accepted
+    assert match.completion == "cached analysis"
+    assert cache.lookup("Completely different text about customer churn in Europe.") is None
+
+
+def test_namespaces_never_match_each_other():
+    cache = SimilarityCache(threshold=0.8)
+    cache.add("k1", REPORT, "cached analysis", namespace="gpt-4|temp0")
+    assert cache.lookup(REPORT, namespace="gpt-35|temp0") is None
+    assert cache.lookup(REPORT, namespace="gpt-4|temp0").accepted
+
+
+def test_chunked_signature_matches_a_single_pass(monkeypatch):
+    cache = SimilarityCache(num_perm=64)
+    expected = cache.signature(REPORT)
+    monkeypatch.setattr(similarity_module, "_SIGNATURE_CHUNK", 7)
+    assert np.array_equal(cache.signature(REPORT), expected)
+
+
+def test_unserved_candidate_is_checked_against_the_live_completion():
+    cache = SimilarityCache(threshold=0.95, candidate_threshold=0.3)
+    cache.add("k1", REPORT, "revenue grew in every region")
+    edited = REPORT + " " + " ".join(f"extra{i}" for i in range(30))
+
+    match = cache.lookup(edited)
+    assert match is not None and not match.accepted
+    assert cache.check_candidate(match, "revenue grew in every region")
+    assert not cache.check_candidate(match, "sales collapsed everywhere this quarter")
+    stats = cache.stats()
+    assert (stats["confirmed"], stats["rejected"]) == (1, 1)
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = SimilarityCache(threshold=0.8, max_entries=2)
+    prompts = [f"{REPORT} Variant {n} " + " ".join([f"v{n}w{i}" for i in range(200)]) for n in range(3)]
+    for n, prompt in enumerate(prompts):
+        cache.add(f"k{n}", prompt, f"answer {n}")
+    assert cache.stats()["entries"] == 2
+    assert cache.stats()["evictions"] == 1
+    assert cache.lookup(prompts[2]).completion == "answer 2"
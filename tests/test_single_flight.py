@@ -0,0 +1,147 @@
+"""
+Unit tests for in-flight request coalescing.
+"""
+
+import asyncio
+
+import pytest
+
+from src.utils.single_flight import SingleFlight
+
+
+class Calls:
+    """Counts underlying calls and blocks each one until released."""
+
+    def __init__(self):
+        self.started = 0
+        self.release = asyncio.Event()
+
+    async def call(self):
+        self.started += 1
+        started = self.started
+        try:
+            await self.release.wait()
+        finally:
+            # Cleanup that takes a while, e.g. closing a connection
+            await asyncio.sleep(0.01)
+        return f"result {started}"
+
+    async def stream(self):
+        self.started += 1
+        try:
+            yield "a"
+            await self.release.wait()
+            yield "b"
+        finally:
+            await asyncio.sleep(0.01)
+
+
+def test_do_joins_call_in_flight():
+    async def scenario():
+        flight, calls = SingleFlight(), Calls()
+        tasks = [asyncio.ensure_future(flight.do("key", calls.call)) for _ in range(3)]
+        await asyncio.sleep(0)
+        calls.release.set()
+        return await asyncio.gather(*tasks), calls.started, flight.stats()
+
+    results, started, stats = asyncio.run(scenario())
+    assert results == ["result 1"] * 3
+    assert started == 1
+    assert stats["collapsed"] == 2
+    assert stats["in_flight"] == 0
+
+
+def test_do_shares_error():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0)
+            raise ValueError("boom")
+
+        return await asyncio.gather(flight.do("key", fail), flight.do("key", fail), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert [type(result) for result in results] == [ValueError, ValueError]
+
+
+def test_do_cancelling_one_waiter_keeps_call_for_others():
+    async def scenario():
+        flight, calls = SingleFlight(), Calls()
+        first = asyncio.ensure_future(flight.do("key", calls.call))
+        second = asyncio.ensure_future(flight.do("key", calls.call))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        calls.release.set()
+        return await second, calls.started
+
+    assert asyncio.run(scenario()) == ("result 1", 1)
+
+
+def test_do_cancelling_last_waiter_cancels_call():
+    async def scenario():
+        flight, calls = SingleFlight(), Calls()
+        cancelled = asyncio.Event()
+
+        async def call():
+            try:
+                return await calls.call()
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        waiter = asyncio.ensure_future(flight.do("key", call))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+        return flight.stats()
+
+    assert asyncio.run(scenario())["in_flight"] == 0
+
+
+def test_do_late_joiner_starts_new_call_after_cancellation():
+    async def scenario():
+        flight, calls = SingleFlight(), Calls()
+        waiter = asyncio.ensure_future(flight.do("key", calls.call))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        # Join before the cancelled call has unwound
+        await asyncio.sleep(0)
+        late = asyncio.ensure_future(flight.do("key", calls.call))
+        await asyncio.sleep(0)
+        calls.release.set()
+        return await late, calls.started
+
+    assert asyncio.run(scenario()) == ("result 2", 2)
+
+
+def test_stream_late_joiner_replays_items():
+    async def scenario():
+        flight, calls = SingleFlight(), Calls()
+        first = flight.stream("key", calls.stream)
+        received = [await first.__anext__()]
+        second = flight.stream("key", calls.stream)
+        joined = [await second.__anext__()]
+        calls.release.set()
+        received += [item async for item in first]
+        joined += [item async for item in second]
+        return received, joined, calls.started
+
+    assert asyncio.run(scenario()) == (["a", "b"], ["a", "b"], 1)
+
+
+def test_stream_late_joiner_starts_new_stream_after_cancellation():
+    async def scenario():
+        flight, calls = SingleFlight(), Calls()
+        first = flight.stream("key", calls.stream)
+        await first.__anext__()
+        # The last subscriber leaving cancels the shared stream
+        await first.aclose()
+        late = flight.stream("key", calls.stream)
+        calls.release.set()
+        return [item async for item in late], calls.started
+
+    assert asyncio.run(scenario()) == (["a", "b"], 2)
@@ -0,0 +1,40 @@
+"""
+Unit tests for the cached connection check in validate_setup.
+"""
+
+import os
+import json
+import stat
+import tempfile
+
+import pytest
+
+from src.utils import validate_setup
+
+
+@pytest.fixture
+def cache_path(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    return validate_setup._connection_cache_path(full_completion=False)
+
+
+def test_cache_lives_in_the_user_cache_dir(cache_path, tmp_path):
+    assert cache_path.startswith(str(tmp_path))
+    assert not cache_path.startswith(tempfile.gettempdir() + os.sep + "azure-openai-validated")
+
+
+def test_stored_result_is_private_and_reused(cache_path):
+    validate_setup._store_connection_ok(cache_path)
+    assert stat.S_IMODE(os.stat(cache_path).st_mode) == 0o600
+    assert os.listdir(os.path.dirname(cache_path)) == [os.path.basename(cache_path)]
+    assert validate_setup._cached_connection_ok(cache_path, ttl=60)
+    assert not validate_setup._cached_connection_ok(cache_path, ttl=0)
+
+
+@pytest.mark.skipif(not hasattr(os, "getuid"), reason="POSIX permissions")
+def test_result_writable_by_others_is_not_trusted(cache_path):
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    with open(cache_path, "w") as f:
+        json.dump({"validated_at": 0}, f)
+    os.chmod(cache_path, 0o666)
+    assert not validate_setup._cached_connection_ok(cache_path, ttl=float("inf"))